@@ -1,10 +1,22 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, File, HTTPException, Request, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response
 from pydantic import BaseModel
 import pandas as pd
 import numpy as np
 import uvicorn
-from typing import List
+import argparse
+import os
+import sys
+import time
+from typing import Dict, List
+import scoring
+from scoring import rule_engine, score_batch_json, score_customer, score_upload_json, scorer_info
+from scoring_executor import Saturated, ScoringExecutor
+
+# Shared metrics module lives in the repository's common/ directory
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'common'))
+from metrics import BATCH_SIZE, CONTENT_TYPE, REGISTRY, REQUESTS, REQUEST_LATENCY, stage_observer
 
 app = FastAPI(
     title="Customer Churn Predictor API",
@@ -21,6 +33,59 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Bulk scoring runs on a bounded executor so the event loop stays free for
+# health checks and single predictions; beyond CHURN_MAX_IN_FLIGHT
+# concurrent scoring requests new ones get a 429. Worker processes avoid
+# GIL contention from JSON parsing; CHURN_EXECUTOR=thread keeps scoring
+# in-process. Either way the stage timings come back with each result and
+# are recorded here, so /metrics has them
+scoring_executor = ScoringExecutor(
+    kind=os.environ.get('CHURN_EXECUTOR', 'process'),
+    max_workers=int(os.environ.get('CHURN_SCORING_WORKERS', 0)) or None,
+    max_in_flight=int(os.environ.get('CHURN_MAX_IN_FLIGHT', 32))
+)
+
+# Per-stage timings (parse, score, postprocess) for /metrics
+scoring.stage_observer = stage_observer('churn')
+
+def collect_churn_metrics():
+    """Scrape-time scorer and rule-engine metrics"""
+    info = scorer_info()
+    rules = rule_engine.info()
+    yield 'model_info', 'gauge', 'Currently served model (value is always 1)', [({
+        'service': 'churn',
+        'version': rules['version'] if info['scorer'] == 'rules' else (info['model_metadata'] or {}).get('trained_at', 'unknown'),
+        'scorer': info['scorer'],
+        'rules_version': rules['version']
+    }, 1)]
+    executor = scoring_executor.stats()
+    yield 'churn_scoring_in_flight', 'gauge', 'Bulk scoring requests running on the executor', [
+        ({'service': 'churn'}, executor['in_flight'])
+    ]
+    yield 'churn_scoring_rejected_total', 'counter', 'Bulk scoring requests rejected with 429', [
+        ({'service': 'churn'}, executor['rejected'])
+    ]
+    yield 'churn_rules_reload_error', 'gauge', 'Whether the last rule reload failed', [
+        ({'service': 'churn'}, 1 if rules['last_error'] else 0)
+    ]
+
+REGISTRY.register_collector(collect_churn_metrics)
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # Route templates keep label cardinality bounded
+        route = request.scope.get('route')
+        endpoint = route.path if route is not None else 'unmatched'
+        REQUESTS.labels('churn', endpoint, request.method, status).inc()
+        REQUEST_LATENCY.labels('churn', endpoint).observe(time.perf_counter() - start)
+
 class CustomerInput(BaseModel):
     gender: str
     age: int
@@ -40,6 +105,28 @@ class PredictionResponse(BaseModel):
     confidence: float
     recommendations: List[str]
 
+class CustomerBatchInput(BaseModel):
+    """Columnar batch: one array per CustomerInput field, all the same length"""
+    gender: List[str]
+    age: List[int]
+    tenure: List[int]
+    monthly_charges: List[float]
+    total_charges: List[float]
+    internet_service: List[str]
+    contract: List[str]
+    payment_method: List[str]
+    paperless_billing: List[str]
+    tech_support: List[str]
+    online_backup: List[str]
+
+class BatchPredictionResponse(BaseModel):
+    count: int
+    churn_probability: List[float]
+    risk_level: List[str]
+    confidence: List[float]
+    recommendation_tier: List[str]
+    recommendations: Dict[str, List[str]]
+
 @app.get("/")
 async def root():
     return {
@@ -48,6 +135,11 @@ async def root():
         "project": "OutriX ML Internship - Task 3",
         "endpoints": {
             "predict": "/predict",
+            "predict_batch": "/predict/batch",
+            "predict_batch_file": "/predict/batch/file",
+            "rules": "/rules",
+            "model": "/model",
+            "metrics": "/metrics",
             "health": "/health",
             "docs": "/docs"
         }
@@ -57,82 +149,79 @@ async def root():
 async def health_check():
     return {"status": "healthy", "service": "churn-predictor"}
 
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics for this process"""
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
+
+@app.get("/rules")
+async def rules_info():
+    """Currently loaded churn rules; the config file is reloaded on change"""
+    return rule_engine.info()
+
+@app.get("/model")
+async def model_info():
+    """Which scorer is serving predictions, and the trained model's metadata"""
+    return scorer_info()
+
+# Single predictions take microseconds, less than an executor round trip,
+# so they are scored directly on the event loop
 @app.post("/predict", response_model=PredictionResponse)
 async def predict_churn(customer: CustomerInput):
     try:
-        # Smart rule-based prediction algorithm
-        risk_score = 0
+        # Trained model, or the rule-based fallback configured in rules.json
+        result = score_customer(customer.model_dump())
         
-        # Age factor
-        if customer.age < 30 or customer.age > 65:
-            risk_score += 0.2
-        
-        # Tenure factor (new customers more likely to churn)
-        if customer.tenure < 12:
-            risk_score += 0.3
-        elif customer.tenure < 24:
-            risk_score += 0.1
-            
-        # Contract factor
-        if customer.contract == "Month-to-month":
-            risk_score += 0.4
-        elif customer.contract == "One year":
-            risk_score += 0.1
-            
-        # Payment method factor
-        if customer.payment_method == "Electronic check":
-            risk_score += 0.2
-            
-        # Monthly charges factor
-        if customer.monthly_charges > 80:
-            risk_score += 0.15
-        elif customer.monthly_charges < 30:
-            risk_score += 0.1
-            
-        # Tech support factor
-        if customer.tech_support == "No":
-            risk_score += 0.1
-            
-        # Cap the risk score
-        churn_probability = min(risk_score, 0.95)
-        
-        # Determine risk level and recommendations
-        if churn_probability >= 0.7:
-            risk_level = "HIGH"
-            recommendations = [
-                "🚨 Immediate retention call required",
-                "💰 Offer loyalty discount (15-25%)",
-                "📞 Assign dedicated account manager",
-                "🎁 Consider contract upgrade incentives"
-            ]
-        elif churn_probability >= 0.4:
-            risk_level = "MEDIUM" 
-            recommendations = [
-                "📞 Schedule proactive customer check-in",
-                "📋 Send satisfaction survey",
-                "🎯 Consider service upgrade offers",
-                "💡 Provide usage optimization tips"
-            ]
-        else:
-            risk_level = "LOW"
-            recommendations = [
-                "✅ Continue regular service",
-                "📈 Consider upselling opportunities", 
-                "👀 Monitor for usage pattern changes",
-                "🎉 Maintain excellent service quality"
-            ]
-        
-        confidence = abs(churn_probability - 0.5) * 2
-        
-        return PredictionResponse(
-            churn_probability=round(churn_probability, 4),
-            risk_level=risk_level,
-            confidence=round(confidence, 4),
-            recommendations=recommendations
-        )
+        return PredictionResponse(**result)
         
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Prediction error: {str(e)}")
 
+def saturated_error(e):
+    return HTTPException(status_code=429, detail=f"Scoring capacity exceeded: {str(e)}",
+                         headers={"Retry-After": "1"})
+
+async def run_batch_scoring(endpoint, func, *args):
+    """Score on the executor and return the prebuilt JSON response"""
+    try:
+        count, body, timings = await scoring_executor.run(func, *args)
+    except Saturated as e:
+        raise saturated_error(e)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Prediction error: {str(e)}")
+    BATCH_SIZE.labels('churn', endpoint).observe(count)
+    for stage, seconds in timings:
+        scoring.stage_observer(stage, seconds)
+    return Response(body, media_type="application/json")
+
+# The batch body is read raw and validated on the executor, so a large
+# payload is never parsed on the event loop; the schema is still documented
+@app.post("/predict/batch", response_model=BatchPredictionResponse, openapi_extra={
+    "requestBody": {
+        "required": True,
+        "content": {"application/json": {"schema": CustomerBatchInput.model_json_schema()}}
+    }
+})
+async def predict_churn_batch(request: Request):
+    body = await request.body()
+    return await run_batch_scoring('/predict/batch', score_batch_json, body)
+
+@app.post("/predict/batch/file", response_model=BatchPredictionResponse)
+async def predict_churn_batch_file(file: UploadFile = File(...)):
+    """Score a CSV or Parquet upload with one column per CustomerInput field"""
+    data = await file.read()
+    return await run_batch_scoring('/predict/batch/file', score_upload_json, data, file.filename)
+
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    parser = argparse.ArgumentParser(description="Customer Churn Predictor API")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("CHURN_WORKERS", 1)),
+                        help="uvicorn worker processes, each with its own event loop and scoring executor")
+    args = parser.parse_args()
+    
+    if args.workers > 1:
+        # Multiple workers need the app as an import string
+        uvicorn.run("app:app", host=args.host, port=args.port, workers=args.workers)
+    else:
+        uvicorn.run(app, host=args.host, port=args.port)
@@ -0,0 +1,286 @@
+from bisect import bisect_right
+import argparse
+import json
+import math
+import os
+import time
+
+import numpy as np
+
+MODEL_FORMAT_VERSION = 2
+
+NUMERIC_FEATURES = ['age', 'tenure', 'monthly_charges', 'total_charges']
+CATEGORICAL_FEATURES = ['gender', 'internet_service', 'contract', 'payment_method',
+                        'paperless_billing', 'tech_support', 'online_backup']
+# Engineered from the numeric inputs, as in the notebook
+DERIVED_FEATURES = ['charges_per_tenure']
+# Band lower bounds for the notebook's step-shaped risk factors; each band
+# gets its own logit contribution, which a single linear weight can't express
+BANDS = {
+    'age': [25, 36, 65],
+    'tenure': [7, 13, 25],
+    'monthly_charges': [35, 80]
+}
+# Risk tiers are cut at these quantiles of the training predictions
+RISK_LEVELS = ['LOW', 'MEDIUM', 'HIGH']
+RISK_TIER_QUANTILES = [0.5, 0.8]
+
+def create_customer_data(n=5000, seed=42):
+    """Synthetic telecom dataset from Task3_Customer_Churn_Prediction.ipynb"""
+    # RandomState draws the same sequence the notebook gets from np.random.seed
+    rng = np.random.RandomState(seed)
+    data = {}
+
+    # Basic demographics
+    data['customer_id'] = [f'CUST_{i:05d}' for i in range(1, n + 1)]
+    data['gender'] = rng.choice(['Male', 'Female'], n, p=[0.52, 0.48])
+    data['age'] = np.clip(rng.normal(45, 18, n).astype(int), 18, 80)
+
+    # Tenure (months with company) - exponential distribution
+    data['tenure'] = np.clip(rng.exponential(24, n).astype(int), 0, 72)
+
+    # Services
+    data['internet_service'] = rng.choice(['DSL', 'Fiber optic', 'No'], n, p=[0.35, 0.45, 0.20])
+    data['contract'] = rng.choice(['Month-to-month', 'One year', 'Two year'], n, p=[0.55, 0.25, 0.20])
+    data['payment_method'] = rng.choice(['Electronic check', 'Mailed check', 'Bank transfer (automatic)',
+                                         'Credit card (automatic)'], n)
+    data['paperless_billing'] = rng.choice(['Yes', 'No'], n, p=[0.6, 0.4])
+    data['tech_support'] = rng.choice(['Yes', 'No'], n, p=[0.3, 0.7])
+    data['online_backup'] = rng.choice(['Yes', 'No'], n, p=[0.35, 0.65])
+
+    # Financial data (correlated with services)
+    internet_charges = np.where(data['internet_service'] == 'Fiber optic', 25,
+                                np.where(data['internet_service'] == 'DSL', 15, 0))
+    tech_charges = np.where(data['tech_support'] == 'Yes', 10, 0)
+    data['monthly_charges'] = np.clip(30 + internet_charges + tech_charges + rng.normal(0, 8, n), 20, 120)
+
+    # Total charges (tenure * monthly + some variation)
+    data['total_charges'] = np.maximum(data['tenure'] * data['monthly_charges'] + rng.normal(0, 200, n),
+                                       data['monthly_charges'])
+
+    # Churn labels from the notebook's risk factors plus noise
+    churn_prob = (
+        np.where((data['age'] >= 25) & (data['age'] <= 35), 0.15, np.where(data['age'] >= 65, 0.10, 0.05))
+        + np.where(data['tenure'] <= 6, 0.30, np.where(data['tenure'] <= 12, 0.20,
+                   np.where(data['tenure'] <= 24, 0.10, 0.05)))
+        + np.where(data['contract'] == 'Month-to-month', 0.25, 0.08)
+        + np.where(data['payment_method'] == 'Electronic check', 0.15, 0.08)
+        + np.where(data['monthly_charges'] > 80, 0.12, np.where(data['monthly_charges'] < 35, 0.10, 0.05))
+        + np.where(data['tech_support'] == 'No', 0.08, 0.03)
+    )
+    # Noise-free risk, kept to measure how much signal the labels carry
+    data['churn_risk'] = churn_prob
+    churn_prob = np.clip(churn_prob + rng.normal(0, 0.05, n), 0.05, 0.70)
+    data['churn'] = rng.binomial(1, churn_prob, n)
+    return data
+
+def numeric_matrix(columns):
+    """Numeric and derived feature columns as one float64 matrix"""
+    age = np.asarray(columns['age'], dtype=np.float64)
+    tenure = np.asarray(columns['tenure'], dtype=np.float64)
+    monthly_charges = np.asarray(columns['monthly_charges'], dtype=np.float64)
+    total_charges = np.asarray(columns['total_charges'], dtype=np.float64)
+    charges_per_tenure = total_charges / (tenure + 1)
+    return np.column_stack([age, tenure, monthly_charges, total_charges, charges_per_tenure])
+
+def band_index(values, bounds):
+    """Band of every value given the bands' lower bounds (0 is below the first)"""
+    return np.searchsorted(np.asarray(bounds, dtype=np.float64), np.asarray(values, dtype=np.float64), side='right')
+
+class ChurnModel:
+    """Logistic regression churn model folded into lookup tables for serving
+
+    Standardization is folded into the numeric weights, and every one-hot
+    column becomes a per-category contribution to the logit, so scoring a
+    customer is a handful of dict lookups plus a short dot product. Unseen
+    categories contribute nothing, like an all-zero one-hot row. Numeric
+    bands work the same way, indexed by band.
+
+    risk_levels are the model's own tier cut points, in rules.json's
+    [{'name', 'min'}] layout; risk_tier_index() mirrors CompiledRules.
+    """
+
+    def __init__(self, bias, numeric_weights, category_weights, band_weights, risk_levels, metadata=None):
+        self.bias = float(bias)
+        self.numeric_weights = np.asarray(numeric_weights, dtype=np.float64)
+        self.category_weights = {
+            feature: {str(value): float(weight) for value, weight in table.items()}
+            for feature, table in category_weights.items()
+        }
+        self.band_weights = {
+            feature: {'bounds': [float(bound) for bound in band['bounds']],
+                      'weights': [float(weight) for weight in band['weights']]}
+            for feature, band in band_weights.items()
+        }
+        if any(len(band['weights']) != len(band['bounds']) + 1 for band in self.band_weights.values()):
+            raise ValueError("Each band table needs one weight more than it has bounds")
+        levels = sorted(risk_levels, key=lambda level: level['min'])
+        self.risk_levels = [level['name'] for level in levels]
+        self.risk_thresholds = np.array([level['min'] for level in levels[1:]], dtype=np.float64)
+        self.metadata = metadata or {}
+        self._numeric_weight_list = self.numeric_weights.tolist()
+        self._band_list = [(feature, band['bounds'], band['weights']) for feature, band in self.band_weights.items()]
+
+    def risk_tier_index(self, churn_probability):
+        """Index into self.risk_levels for every probability"""
+        return np.searchsorted(self.risk_thresholds, churn_probability, side='right')
+
+    def predict_one(self, customer):
+        """Churn probability for one customer dict, in pure Python"""
+        w_age, w_tenure, w_monthly, w_total, w_per_tenure = self._numeric_weight_list
+        tenure = customer['tenure']
+        total_charges = customer['total_charges']
+        logit = (self.bias
+                 + w_age * customer['age']
+                 + w_tenure * tenure
+                 + w_monthly * customer['monthly_charges']
+                 + w_total * total_charges
+                 + w_per_tenure * (total_charges / (tenure + 1)))
+        for feature, table in self.category_weights.items():
+            logit += table.get(customer[feature], 0.0)
+        for feature, bounds, weights in self._band_list:
+            logit += weights[bisect_right(bounds, customer[feature])]
+        return 1.0 / (1.0 + math.exp(-logit))
+
+    def predict_proba(self, columns):
+        """Churn probability for every row of a mapping of field -> values"""
+        logit = self.bias + numeric_matrix(columns) @ self.numeric_weights
+        for feature, table in self.category_weights.items():
+            # Each distinct category is looked up once
+            unique_values, inverse = np.unique(np.asarray(columns[feature]).astype(str), return_inverse=True)
+            weights = np.array([table.get(value, 0.0) for value in unique_values], dtype=np.float64)
+            logit += weights[inverse.reshape(-1)]
+        for feature, bounds, weights in self._band_list:
+            logit += np.asarray(weights)[band_index(columns[feature], bounds)]
+        return 1.0 / (1.0 + np.exp(-logit))
+
+    def save(self, path):
+        """Write the model as JSON, atomically"""
+        artifact = {
+            'format_version': MODEL_FORMAT_VERSION,
+            'model_type': 'logistic_regression',
+            'numeric_features': NUMERIC_FEATURES + DERIVED_FEATURES,
+            'bias': self.bias,
+            'numeric_weights': self._numeric_weight_list,
+            'category_weights': self.category_weights,
+            'band_weights': self.band_weights,
+            'risk_levels': [{'name': name, 'min': float(threshold)} for name, threshold
+                            in zip(self.risk_levels, [0.0] + self.risk_thresholds.tolist())],
+            'metadata': self.metadata
+        }
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(artifact, f, indent=2)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            artifact = json.load(f)
+        if artifact.get('format_version') != MODEL_FORMAT_VERSION:
+            raise ValueError(f"Unsupported churn model format: {artifact.get('format_version')}")
+        if artifact['numeric_features'] != NUMERIC_FEATURES + DERIVED_FEATURES:
+            raise ValueError("Churn model was trained on different numeric features")
+        return cls(artifact['bias'], artifact['numeric_weights'], artifact['category_weights'],
+                   artifact['band_weights'], artifact['risk_levels'], artifact.get('metadata'))
+
+def train_churn_model(data=None, test_size=0.2, seed=42):
+    """Train a logistic regression on the notebook dataset and return a ChurnModel"""
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.metrics import accuracy_score, roc_auc_score
+    from sklearn.model_selection import train_test_split
+
+    if data is None:
+        data = create_customer_data(seed=seed)
+    labels = np.asarray(data['churn'])
+    train_index, test_index = train_test_split(
+        np.arange(len(labels)), test_size=test_size, random_state=seed, stratify=labels
+    )
+
+    # Encoding tables come from the training split only
+    categories = {feature: sorted({str(value) for value in np.asarray(data[feature])[train_index]})
+                  for feature in CATEGORICAL_FEATURES}
+
+    def design_matrix(index):
+        blocks = [numeric_matrix({feature: np.asarray(data[feature])[index] for feature in NUMERIC_FEATURES})]
+        for feature in CATEGORICAL_FEATURES:
+            values = np.asarray(data[feature]).astype(str)[index]
+            blocks.append((values[:, None] == np.array(categories[feature])[None, :]).astype(np.float64))
+        for feature, bounds in BANDS.items():
+            bands = band_index(np.asarray(data[feature])[index], bounds)
+            blocks.append((bands[:, None] == np.arange(len(bounds) + 1)[None, :]).astype(np.float64))
+        return np.hstack(blocks)
+
+    X_train = design_matrix(train_index)
+    X_test = design_matrix(test_index)
+
+    # Standardize the numeric block; one-hot columns stay 0/1
+    n_numeric = len(NUMERIC_FEATURES) + len(DERIVED_FEATURES)
+    mean = X_train[:, :n_numeric].mean(axis=0)
+    scale = X_train[:, :n_numeric].std(axis=0)
+    scale[scale == 0] = 1.0
+    X_train[:, :n_numeric] = (X_train[:, :n_numeric] - mean) / scale
+    X_test[:, :n_numeric] = (X_test[:, :n_numeric] - mean) / scale
+
+    print("Training Logistic Regression churn model...")
+    classifier = LogisticRegression(max_iter=1000, random_state=seed)
+    classifier.fit(X_train, labels[train_index])
+    probabilities = classifier.predict_proba(X_test)[:, 1]
+    accuracy = accuracy_score(labels[test_index], probabilities >= 0.5)
+    auc = roc_auc_score(labels[test_index], probabilities)
+    base_rate = float(labels[train_index].mean())
+    print(f"Accuracy: {accuracy:.4f} (majority class {max(base_rate, 1 - base_rate):.4f})  ROC AUC: {auc:.4f}")
+
+    # Fold standardization into the weights: w * (x - mean) / scale
+    coef = classifier.coef_[0]
+    numeric_weights = coef[:n_numeric] / scale
+    bias = classifier.intercept_[0] - float(np.sum(numeric_weights * mean))
+
+    category_weights = {}
+    column = n_numeric
+    for feature in CATEGORICAL_FEATURES:
+        category_weights[feature] = {}
+        for value in categories[feature]:
+            category_weights[feature][value] = float(coef[column])
+            column += 1
+    band_weights = {}
+    for feature, bounds in BANDS.items():
+        band_weights[feature] = {'bounds': bounds, 'weights': coef[column:column + len(bounds) + 1].tolist()}
+        column += len(bounds) + 1
+
+    # Tiers are cut from this model's own score distribution, not the rules'
+    thresholds = np.quantile(classifier.predict_proba(X_train)[:, 1], RISK_TIER_QUANTILES)
+    risk_levels = [{'name': name, 'min': float(threshold)}
+                   for name, threshold in zip(RISK_LEVELS, [0.0] + thresholds.tolist())]
+    test_tiers = np.searchsorted(thresholds, probabilities, side='right')
+    tier_churn_rate = {name: float(labels[test_index][test_tiers == i].mean())
+                       for i, name in enumerate(RISK_LEVELS) if np.any(test_tiers == i)}
+    print("Test churn rate per tier: " + ", ".join(f"{name} {rate:.3f}" for name, rate in tier_churn_rate.items()))
+
+    metadata = {
+        'trained_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'dataset_size': int(len(labels)),
+        'test_accuracy': float(accuracy),
+        'test_roc_auc': float(auc),
+        'churn_rate': float(labels.mean()),
+        'majority_class_accuracy': float(max(base_rate, 1 - base_rate)),
+        'test_tier_churn_rate': tier_churn_rate
+    }
+    if 'churn_risk' in data:
+        # Best AUC any model can reach: the generator's own noise-free risk
+        metadata['oracle_test_roc_auc'] = float(roc_auc_score(labels[test_index],
+                                                              np.asarray(data['churn_risk'])[test_index]))
+        print(f"Oracle ROC AUC on the same split: {metadata['oracle_test_roc_auc']:.4f}")
+    return ChurnModel(bias, numeric_weights, category_weights, band_weights, risk_levels, metadata)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the churn model and save it as JSON")
+    parser.add_argument('--output', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'churn_model.json'))
+    parser.add_argument('--customers', type=int, default=20000,
+                        help='synthetic customers to generate (more than the notebook, for stable tier estimates)')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    model = train_churn_model(create_customer_data(args.customers, args.seed), seed=args.seed)
+    model.save(args.output)
+    print(f"Model saved to: {args.output}")
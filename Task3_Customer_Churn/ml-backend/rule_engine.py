@@ -0,0 +1,279 @@
+from bisect import bisect_left
+import hashlib
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+NUMERIC_OPS = {
+    '<': lambda x, value: x < value,
+    '<=': lambda x, value: x <= value,
+    '>': lambda x, value: x > value,
+    '>=': lambda x, value: x >= value,
+    '==': lambda x, value: x == value,
+    '!=': lambda x, value: x != value
+}
+CATEGORICAL_OPS = {
+    '==': lambda x, value: x == value,
+    '!=': lambda x, value: x != value,
+    'in': lambda x, values: x in values,
+    'not in': lambda x, values: x not in values
+}
+
+class _Unlisted:
+    """Stands in for any category value the rule does not mention"""
+
+    def __eq__(self, other):
+        return False
+
+    def __ne__(self, other):
+        return True
+
+    __hash__ = object.__hash__
+
+def _first_match(cases, ops, x, default):
+    for op, value, weight in cases:
+        if ops[op](x, value):
+            return weight
+    return default
+
+class NumericRule:
+    """Threshold rule compiled to a breakpoint array and a weight per bucket
+
+    With n sorted breakpoints a value falls in one of 2n + 2 buckets: the
+    open interval below each breakpoint (2k), the breakpoint itself (2k + 1),
+    the interval above the last one (2n) and NaN (2n + 1). Every value in a
+    bucket matches the same cases, so one representative decides its weight.
+    """
+
+    def __init__(self, name, feature, cases, default):
+        self.name = name
+        self.feature = feature
+        self.points = np.unique(np.array([value for _, value, _ in cases], dtype=np.float64))
+
+        n = len(self.points)
+        weights = []
+        for k in range(n + 1):
+            if k == 0:
+                below = np.nextafter(self.points[0], -np.inf)
+            else:
+                below = np.nextafter(self.points[k - 1], np.inf)
+            weights.append(_first_match(cases, NUMERIC_OPS, float(below), default))
+            if k < n:
+                weights.append(_first_match(cases, NUMERIC_OPS, float(self.points[k]), default))
+        weights.append(default)
+        self.weights = np.array(weights, dtype=np.float64)
+        self._point_list = self.points.tolist()
+
+    def bucket_index(self, values):
+        """Bucket of every value, as an index into self.weights"""
+        values = np.asarray(values, dtype=np.float64)
+        n = len(self.points)
+        position = np.searchsorted(self.points, values, side='left')
+        on_point = self.points[np.minimum(position, n - 1)] == values
+        index = 2 * position + on_point
+        return np.where(np.isnan(values), 2 * n + 1, index)
+
+    def bucket_of(self, value):
+        """Bucket of a single value, without numpy"""
+        if value != value:
+            return len(self.weights) - 1
+        position = bisect_left(self._point_list, value)
+        on_point = position < len(self._point_list) and self._point_list[position] == value
+        return 2 * position + on_point
+
+    def evaluate(self, values):
+        return self.weights[self.bucket_index(values)]
+
+class CategoricalRule:
+    """Equality/membership rule compiled to a lookup table of listed values
+
+    Each listed value is its own bucket and every other value shares the
+    last one, so weights[bucket_index(values)] gives the matched weights.
+    """
+
+    def __init__(self, name, feature, cases, default):
+        self.name = name
+        self.feature = feature
+
+        listed = []
+        for op, value, _ in cases:
+            listed.extend(value if op in ('in', 'not in') else [value])
+        self.buckets = {value: index for index, value in enumerate(dict.fromkeys(listed))}
+        weights = [_first_match(cases, CATEGORICAL_OPS, value, default) for value in self.buckets]
+        weights.append(_first_match(cases, CATEGORICAL_OPS, _Unlisted(), default))
+        self.weights = np.array(weights, dtype=np.float64)
+
+    def bucket_index(self, values):
+        """Bucket of every value, as an index into self.weights"""
+        values = np.asarray(values)
+        if values.dtype.kind != 'U':
+            values = values.astype(str)
+        # One vectorized comparison per listed value; far cheaper than
+        # sorting the strings when only a few values are listed
+        index = np.full(len(values), len(self.buckets), dtype=np.intp)
+        for value, bucket in self.buckets.items():
+            index[values == value] = bucket
+        return index
+
+    def bucket_of(self, value):
+        """Bucket of a single value"""
+        return self.buckets.get(str(value), len(self.buckets))
+
+    def evaluate(self, values):
+        return self.weights[self.bucket_index(values)]
+
+def _compile_rule(rule, known_features):
+    name = rule.get('name', rule.get('feature'))
+    feature = rule.get('feature')
+    if not feature:
+        raise ValueError(f"Rule {name!r} has no feature")
+    if known_features is not None and feature not in known_features:
+        raise ValueError(f"Rule {name!r} uses unknown feature {feature!r}")
+    if not rule.get('cases'):
+        raise ValueError(f"Rule {name!r} has no cases")
+    default = float(rule.get('default', 0.0))
+
+    cases = []
+    numeric = set()
+    for case in rule['cases']:
+        op = case.get('op')
+        if op in ('in', 'not in'):
+            value = [str(item) for item in case['values']]
+            numeric.add(False)
+        elif op in CATEGORICAL_OPS or op in NUMERIC_OPS:
+            value = case['value']
+            is_number = isinstance(value, (int, float)) and not isinstance(value, bool)
+            if op not in CATEGORICAL_OPS and not is_number:
+                raise ValueError(f"Rule {name!r}: {op} needs a numeric value")
+            numeric.add(is_number)
+            value = float(value) if is_number else str(value)
+        else:
+            raise ValueError(f"Rule {name!r}: unsupported op {op!r}")
+        cases.append((op, value, float(case['weight'])))
+
+    if len(numeric) > 1:
+        raise ValueError(f"Rule {name!r} mixes numeric and categorical cases")
+    if numeric.pop():
+        return NumericRule(name, feature, cases, default)
+    return CategoricalRule(name, feature, cases, default)
+
+class CompiledRules:
+    """An immutable, compiled rule set; safe to share between requests"""
+
+    def __init__(self, config, known_features=None, version=None):
+        self.version = version
+        self.rules = [_compile_rule(rule, known_features) for rule in config['rules']]
+        self.features = sorted({rule.feature for rule in self.rules})
+        self.cap = float(config.get('cap', 1.0))
+
+        levels = sorted(config['risk_levels'], key=lambda level: level['min'])
+        self.risk_levels = [level['name'] for level in levels]
+        # The lowest level catches everything below the next threshold
+        self.risk_thresholds = np.array([level['min'] for level in levels[1:]], dtype=np.float64)
+
+        self.recommendations = config.get('recommendations', {})
+        missing = [level for level in self.risk_levels if level not in self.recommendations]
+        if missing:
+            raise ValueError(f"No recommendations for risk levels: {', '.join(missing)}")
+
+    def risk_scores(self, columns):
+        """Sum of rule weights for every row, uncapped"""
+        # Rules are added in config order so every row's floating point sum
+        # matches evaluating the same rules one customer at a time
+        risk_score = np.zeros(len(next(iter(columns.values()))))
+        for rule in self.rules:
+            risk_score += rule.evaluate(columns[rule.feature])
+        return risk_score
+
+    def churn_probability(self, columns):
+        return np.minimum(self.risk_scores(columns), self.cap)
+
+    def risk_tier_index(self, churn_probability):
+        """Index into self.risk_levels for every probability"""
+        return np.searchsorted(self.risk_thresholds, churn_probability, side='right')
+
+class RuleEngine:
+    """Loads a rule config file and hot-reloads it when the file changes
+
+    current() returns the compiled rule set to use for one request. A reload
+    compiles the new file first and then swaps the reference, so in-flight
+    requests finish on the rules they started with, and a config that fails
+    to load or compile leaves the previous rules in place.
+    """
+
+    def __init__(self, path, known_features=None, check_interval=1.0):
+        self.path = path
+        self.known_features = known_features
+        self.check_interval = check_interval
+        self.loaded_at = None
+        self.last_error = None
+        self._lock = threading.Lock()
+        self._signature = None
+        self._next_check = 0.0
+        self._rules = self._load()
+
+    def _file_signature(self):
+        stat = os.stat(self.path)
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _load(self):
+        signature = self._file_signature()
+        with open(self.path, 'rb') as f:
+            raw = f.read()
+        rules = CompiledRules(json.loads(raw), self.known_features,
+                              version=hashlib.sha256(raw).hexdigest()[:12])
+        self._signature = signature
+        self.loaded_at = time.time()
+        self.last_error = None
+        return rules
+
+    def current(self):
+        """Compiled rules to use now, reloading first if the file changed"""
+        now = time.monotonic()
+        if now >= self._next_check and self._lock.acquire(blocking=False):
+            # Only one request checks; the others keep using the current rules
+            try:
+                self._next_check = now + self.check_interval
+                self._maybe_reload()
+            finally:
+                self._lock.release()
+        return self._rules
+
+    def _maybe_reload(self):
+        try:
+            signature = self._file_signature()
+        except OSError as e:
+            self.last_error = f"Cannot stat rule file: {e}"
+            return
+        if signature == self._signature:
+            return
+        try:
+            self._rules = self._load()
+            print(f"Loaded churn rules version {self._rules.version} from {self.path}")
+        except Exception as e:
+            # Don't retry the same broken file on every check
+            self._signature = signature
+            self.last_error = str(e)
+            print(f"Keeping churn rules version {self._rules.version}: {e}")
+
+    def reload(self):
+        """Force a reload; raises if the new config is invalid"""
+        with self._lock:
+            self._rules = self._load()
+        return self._rules
+
+    def info(self):
+        rules = self._rules
+        return {
+            'path': self.path,
+            'version': rules.version,
+            'loaded_at': self.loaded_at,
+            'last_error': self.last_error,
+            'rules': [rule.name for rule in rules.rules],
+            'cap': rules.cap,
+            'risk_levels': rules.risk_levels,
+            'risk_thresholds': rules.risk_thresholds.tolist()
+        }
@@ -0,0 +1,59 @@
+import numpy as np
+
+# Refuse to precompute rule sets whose bucket product gets larger than this
+MAX_TABLE_CELLS = 2_000_000
+
+class ScoreTable:
+    """Every possible rule-based result, precomputed for one compiled rule set
+
+    Each rule splits its feature into a few buckets (threshold intervals and
+    points, or listed categories plus "everything else"), and the score only
+    depends on which bucket each rule lands in. The table enumerates the
+    product of all rule buckets once, so scoring is bucketization plus a
+    single lookup into dense result arrays.
+    """
+
+    def __init__(self, rules, summarize, max_cells=MAX_TABLE_CELLS):
+        self.rules = rules
+        sizes = [len(rule.weights) for rule in rules.rules]
+        self.cells = int(np.prod(sizes, dtype=np.int64)) if sizes else 1
+        if self.cells > max_cells:
+            raise ValueError(f"Rule set has {self.cells} bucket combinations (max {max_cells})")
+
+        # Broadcasting one rule at a time adds the weights in config order,
+        # the same floating point sums as evaluating the rules row by row
+        scores = np.zeros(())
+        for rule in rules.rules:
+            scores = scores[..., None] + rule.weights
+        churn_probability = np.minimum(scores.reshape(-1), rules.cap)
+
+        # C-order strides of the flattened table
+        self.strides = [int(np.prod(sizes[i + 1:], dtype=np.int64)) for i in range(len(sizes))]
+
+        # summarize(churn_probability, rules) -> columnar results, as in score_batch
+        self.results = summarize(churn_probability, rules)
+        self._probability_list = self.results['churn_probability'].tolist()
+        self._risk_level_list = self.results['risk_level'].tolist()
+        self._confidence_list = self.results['confidence'].tolist()
+
+    def index(self, columns):
+        """Flat table index for every row of validated numpy columns"""
+        index = np.zeros(len(next(iter(columns.values()))), dtype=np.intp)
+        for rule, stride in zip(self.rules.rules, self.strides):
+            index += rule.bucket_index(columns[rule.feature]) * stride
+        return index
+
+    def lookup(self, columns):
+        """Columnar results for validated numpy columns"""
+        index = self.index(columns)
+        result = {key: value[index] for key, value in self.results.items() if isinstance(value, np.ndarray)}
+        result['recommendations'] = self.rules.recommendations
+        result['rules_version'] = self.rules.version
+        return result
+
+    def lookup_one(self, customer):
+        """(churn_probability, risk_level, confidence) for one customer dict"""
+        index = 0
+        for rule, stride in zip(self.rules.rules, self.strides):
+            index += rule.bucket_of(customer[rule.feature]) * stride
+        return self._probability_list[index], self._risk_level_list[index], self._confidence_list[index]
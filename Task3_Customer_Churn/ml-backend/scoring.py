@@ -0,0 +1,263 @@
+import io
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+from model import ChurnModel
+from rule_engine import RuleEngine
+from score_table import ScoreTable
+
+# Input fields shared by the single-customer and bulk scoring paths
+NUMERIC_FIELDS = ['age', 'tenure', 'monthly_charges', 'total_charges']
+CATEGORICAL_FIELDS = ['gender', 'internet_service', 'contract', 'payment_method',
+                      'paperless_billing', 'tech_support', 'online_backup']
+FEATURE_FIELDS = ['gender', 'age', 'tenure', 'monthly_charges', 'total_charges',
+                  'internet_service', 'contract', 'payment_method', 'paperless_billing',
+                  'tech_support', 'online_backup']
+
+# Rule definitions live in a config file that is reloaded when it changes
+RULES_PATH = os.environ.get('CHURN_RULES_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'rules.json'))
+rule_engine = RuleEngine(RULES_PATH, known_features=FEATURE_FIELDS)
+
+# 'model' (the default) serves the trained churn model, with risk tiers cut
+# from its own score distribution, and falls back to the rules if the
+# artifact is missing or invalid; 'rules' always serves the rule-based
+# scorer. Recommendations come from the rule config either way.
+SCORER = os.environ.get('CHURN_SCORER', 'model')
+MODEL_PATH = os.environ.get('CHURN_MODEL_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'churn_model.json'))
+
+def load_churn_model():
+    """Load the trained model for SCORER=model, or None to serve the rules"""
+    if SCORER not in ('model', 'rules'):
+        raise ValueError(f"CHURN_SCORER must be 'model' or 'rules', not {SCORER!r}")
+    if SCORER == 'rules':
+        return None
+    try:
+        model = ChurnModel.load(MODEL_PATH)
+        missing = [level for level in model.risk_levels if level not in rule_engine.current().recommendations]
+        if missing:
+            raise ValueError(f"no recommendations for risk levels {missing}")
+        print(f"Loaded churn model from {MODEL_PATH}")
+        return model
+    except Exception as e:
+        print(f"Churn model unavailable ({e}); serving rule-based scores")
+        return None
+
+churn_model = load_churn_model()
+
+# With CHURN_SCORE_TABLE=1 the rule-based scorer (CHURN_SCORER=rules, or the
+# fallback when no model loads) precomputes every result for the current
+# rules and answers from the table; a rules reload builds a new table on
+# first use
+SCORE_TABLE_ENABLED = os.environ.get('CHURN_SCORE_TABLE', '0') == '1'
+# (compiled rules, table or None if the rules can't be tabulated)
+_score_table = (None, None)
+
+# Optional observe(stage, seconds) hook for per-stage serving latency
+stage_observer = None
+# Per-call observer set by _collect_timings; takes precedence over stage_observer
+_local = threading.local()
+
+def _timed(stage, func, *args):
+    """Call func(*args), reporting its duration to stage_observer if one is set"""
+    observe = getattr(_local, 'observe', None) or stage_observer
+    if observe is None:
+        return func(*args)
+    start = time.perf_counter()
+    result = func(*args)
+    observe(stage, time.perf_counter() - start)
+    return result
+
+def to_columns(columns):
+    """Validate a mapping of field -> values and convert it to numpy arrays"""
+    missing = [field for field in FEATURE_FIELDS if field not in columns]
+    if missing:
+        raise ValueError(f"Missing columns: {', '.join(missing)}")
+
+    arrays = {}
+    for field in NUMERIC_FIELDS:
+        try:
+            values = np.asarray(columns[field], dtype=np.float64)
+        except (TypeError, ValueError):
+            raise ValueError(f"Column {field} must contain only numbers")
+        # None and empty CSV cells become NaN, which would score silently
+        if values.ndim != 1 or not np.isfinite(values).all():
+            raise ValueError(f"Column {field} must be a list of finite numbers")
+        arrays[field] = values
+    for field in CATEGORICAL_FIELDS:
+        values = np.asarray(columns[field])
+        if values.ndim != 1:
+            raise ValueError(f"Column {field} must be a list of strings")
+        if values.dtype.kind != 'U':
+            # Object arrays from JSON or pandas may hold None/NaN for missing values
+            if values.dtype.kind != 'O' or not all(isinstance(value, str) for value in values):
+                raise ValueError(f"Column {field} must contain only strings")
+            values = values.astype(str)
+        arrays[field] = values
+
+    lengths = {len(values) for values in arrays.values()}
+    if len(lengths) > 1:
+        raise ValueError("All columns must have the same length")
+    return arrays
+
+def _round_like_python(values, ndigits):
+    """Round an array exactly as Python's round() does, one unique value at a time"""
+    # np.round scales by 10**ndigits and can differ from round() in the last
+    # digit; rule-based scores take only a handful of distinct values anyway
+    unique_values, inverse = np.unique(values, return_inverse=True)
+    rounded = np.array([round(float(value), ndigits) for value in unique_values])
+    return rounded[inverse.reshape(-1)]
+
+def _summarize(churn_probability, rules, tiers=None):
+    # tiers (the rules, or the trained model's own cut points) map the
+    # unrounded probability to a risk level, as in the single-row path
+    tiers = tiers or rules
+    tier_index = tiers.risk_tier_index(churn_probability)
+    risk_level = np.array(tiers.risk_levels, dtype=object)[tier_index]
+
+    confidence = np.abs(churn_probability - 0.5) * 2
+
+    return {
+        'churn_probability': _round_like_python(churn_probability, 4),
+        'risk_level': risk_level,
+        'confidence': _round_like_python(confidence, 4),
+        'recommendations': rules.recommendations,
+        'rules_version': rules.version
+    }
+
+def get_score_table(rules):
+    """Precomputed table for rules, or None when the table mode is off or unusable"""
+    global _score_table
+    if not SCORE_TABLE_ENABLED or churn_model is not None:
+        return None
+    table_rules, table = _score_table
+    if table_rules is not rules:
+        try:
+            table = ScoreTable(rules, _summarize)
+            print(f"Built churn score table with {table.cells} cells for rules version {rules.version}")
+        except ValueError as e:
+            table = None
+            print(f"Scoring without a score table: {e}")
+        # Concurrent first requests may each build one; the last one wins
+        _score_table = (rules, table)
+    return table
+
+# Build the table at startup rather than on the first request
+get_score_table(rule_engine.current())
+
+def score_batch(columns, rules=None):
+    """Score many customers at once; returns columnar results"""
+    # Take one snapshot so a concurrent reload can't mix two rule versions
+    rules = rules or rule_engine.current()
+    columns = _timed('parse', to_columns, columns)
+    table = get_score_table(rules)
+    if table is not None:
+        return _timed('table_lookup', table.lookup, columns)
+    if churn_model is not None:
+        churn_probability = _timed('score', churn_model.predict_proba, columns)
+        return _timed('postprocess', _summarize, churn_probability, rules, churn_model)
+    churn_probability = _timed('score', rules.churn_probability, columns)
+    return _timed('postprocess', _summarize, churn_probability, rules)
+
+def _score_customer_with_model(customer, rules):
+    # Pure-Python path: a single row doesn't pay for building numpy columns
+    churn_probability = _timed('score', churn_model.predict_one, customer)
+    risk_level = churn_model.risk_levels[int(churn_model.risk_tier_index(churn_probability))]
+    return {
+        'churn_probability': round(churn_probability, 4),
+        'risk_level': risk_level,
+        'confidence': round(abs(churn_probability - 0.5) * 2, 4),
+        'recommendations': list(rules.recommendations[risk_level])
+    }
+
+def score_customer(customer, rules=None):
+    """Score a single customer given as a dict of field values"""
+    if churn_model is not None:
+        return _score_customer_with_model(customer, rules or rule_engine.current())
+    rules = rules or rule_engine.current()
+    table = get_score_table(rules)
+    if table is not None:
+        churn_probability, risk_level, confidence = _timed('table_lookup', table.lookup_one, customer)
+        return {
+            'churn_probability': churn_probability,
+            'risk_level': risk_level,
+            'confidence': confidence,
+            'recommendations': list(rules.recommendations[risk_level])
+        }
+    result = score_batch({field: [value] for field, value in customer.items()}, rules)
+    risk_level = result['risk_level'][0]
+    return {
+        'churn_probability': float(result['churn_probability'][0]),
+        'risk_level': risk_level,
+        'confidence': float(result['confidence'][0]),
+        'recommendations': list(result['recommendations'][risk_level])
+    }
+
+def batch_payload(result):
+    """Plain-Python BatchPredictionResponse fields for a score_batch result"""
+    risk_level = result['risk_level'].tolist()
+    return {
+        'count': len(risk_level),
+        'churn_probability': result['churn_probability'].tolist(),
+        'risk_level': risk_level,
+        'confidence': result['confidence'].tolist(),
+        'recommendation_tier': risk_level,
+        'recommendations': result['recommendations']
+    }
+
+def _collect_timings(func, *args):
+    """Call func(*args) and return (result, [(stage, seconds), ...]) for its stages"""
+    timings = []
+    _local.observe = lambda stage, seconds: timings.append((stage, seconds))
+    try:
+        return func(*args), timings
+    finally:
+        _local.observe = None
+
+# The *_json helpers run on the scoring executor: request parsing, scoring
+# and response encoding all stay off the event loop, and they are plain
+# module-level functions so a process pool can pickle them. Stage timings
+# are returned with the response, because a worker process can't record
+# them in the parent's metrics registry.
+def score_batch_json(body):
+    """Score a columnar JSON request body; returns (row count, response JSON, stage timings)"""
+    (count, response), timings = _collect_timings(_score_batch_json, body)
+    return count, response, timings
+
+def _score_batch_json(body):
+    columns = json.loads(body)
+    if not isinstance(columns, dict):
+        raise ValueError("Request body must be a JSON object of columns")
+    payload = batch_payload(score_batch(columns))
+    return payload['count'], json.dumps(payload, allow_nan=False)
+
+def score_upload_json(data, filename):
+    """Score an uploaded CSV or Parquet file; returns (row count, response JSON, stage timings)"""
+    (count, response), timings = _collect_timings(_score_upload_json, data, filename)
+    return count, response, timings
+
+def _score_upload_json(data, filename):
+    import pandas as pd
+
+    filename = (filename or '').lower()
+    if filename.endswith('.parquet'):
+        df = pd.read_parquet(io.BytesIO(data), columns=FEATURE_FIELDS)
+    elif filename.endswith('.csv'):
+        df = pd.read_csv(io.BytesIO(data), usecols=FEATURE_FIELDS)
+    else:
+        raise ValueError("Upload must be a .csv or .parquet file")
+    payload = batch_payload(score_batch({field: df[field].to_numpy() for field in FEATURE_FIELDS}))
+    return payload['count'], json.dumps(payload, allow_nan=False)
+
+def scorer_info():
+    """Which scorer is active, for the /model endpoint"""
+    return {
+        'scorer': 'model' if churn_model is not None else 'rules',
+        'requested_scorer': SCORER,
+        'model_path': MODEL_PATH if churn_model is not None else None,
+        'model_metadata': churn_model.metadata if churn_model is not None else None,
+        'score_table_cells': _score_table[1].cells if _score_table[1] is not None else None
+    }
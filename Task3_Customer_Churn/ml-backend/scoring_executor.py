@@ -0,0 +1,53 @@
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import asyncio
+import os
+
+class Saturated(Exception):
+    """Raised when the executor already has max_in_flight requests"""
+
+class ScoringExecutor:
+    """Runs CPU-bound scoring off the event loop with a cap on in-flight work
+
+    Work goes to a bounded thread pool (numpy releases the GIL for most of
+    the vectorized scoring) or a process pool. Requests beyond max_in_flight
+    are rejected immediately instead of queueing, so a burst of bulk requests
+    can't build an unbounded backlog behind the event loop.
+    """
+
+    def __init__(self, kind='process', max_workers=None, max_in_flight=32):
+        max_workers = max_workers or os.cpu_count() or 1
+        if kind == 'process':
+            self._executor = ProcessPoolExecutor(max_workers=max_workers)
+        elif kind == 'thread':
+            self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='churn-scoring')
+        else:
+            raise ValueError(f"Executor kind must be 'thread' or 'process', not {kind!r}")
+        self.kind = kind
+        self.max_workers = max_workers
+        self.max_in_flight = max_in_flight
+        # Only touched from the event loop thread, so no lock is needed
+        self.in_flight = 0
+        self.rejected = 0
+
+    async def run(self, func, *args):
+        """Run func(*args) on the pool; raises Saturated when at capacity"""
+        if self.in_flight >= self.max_in_flight:
+            self.rejected += 1
+            raise Saturated(f"{self.in_flight} scoring requests already in flight")
+        self.in_flight += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+        finally:
+            self.in_flight -= 1
+
+    def stats(self):
+        return {
+            'kind': self.kind,
+            'max_workers': self.max_workers,
+            'max_in_flight': self.max_in_flight,
+            'in_flight': self.in_flight,
+            'rejected': self.rejected
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
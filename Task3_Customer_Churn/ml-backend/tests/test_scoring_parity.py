@@ -0,0 +1,151 @@
+"""Single, batch and file scoring must agree row for row.
+
+Run from ml-backend/ with: python -m pytest -q tests
+"""
+import io
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+# Thread executor: scoring runs in this process, so the scorer can be switched per test
+os.environ['CHURN_EXECUTOR'] = 'thread'
+
+from fastapi.testclient import TestClient
+
+import app
+import scoring
+from model import ChurnModel
+from scoring_executor import ScoringExecutor
+
+CUSTOMERS = [
+    dict(gender='Male', age=25, tenure=3, monthly_charges=95.5, total_charges=286.5,
+         internet_service='Fiber optic', contract='Month-to-month', payment_method='Electronic check',
+         paperless_billing='Yes', tech_support='No', online_backup='No'),
+    dict(gender='Female', age=45, tenure=30, monthly_charges=55.0, total_charges=1650.0,
+         internet_service='DSL', contract='One year', payment_method='Mailed check',
+         paperless_billing='No', tech_support='Yes', online_backup='Yes'),
+    dict(gender='Female', age=70, tenure=72, monthly_charges=20.0, total_charges=1440.0,
+         internet_service='No', contract='Two year', payment_method='Bank transfer (automatic)',
+         paperless_billing='No', tech_support='No internet service', online_backup='No internet service'),
+    dict(gender='Male', age=18, tenure=0, monthly_charges=80.0, total_charges=0.0,
+         internet_service='Fiber optic', contract='Month-to-month', payment_method='Credit card (automatic)',
+         paperless_billing='Yes', tech_support='No', online_backup='Yes'),
+    dict(gender='Male', age=66, tenure=12, monthly_charges=29.99, total_charges=359.88,
+         internet_service='DSL', contract='One year', payment_method='Electronic check',
+         paperless_billing='Yes', tech_support='No', online_backup='No'),
+]
+
+RESULT_FIELDS = ['churn_probability', 'risk_level', 'confidence']
+
+@pytest.fixture(params=['rules', 'score_table', 'model'])
+def client(request, monkeypatch):
+    if request.param == 'model':
+        monkeypatch.setattr(scoring, 'churn_model', ChurnModel.load(scoring.MODEL_PATH))
+    else:
+        monkeypatch.setattr(scoring, 'churn_model', None)
+    monkeypatch.setattr(scoring, 'SCORE_TABLE_ENABLED', request.param == 'score_table')
+    monkeypatch.setattr(scoring, '_score_table', (None, None))
+    return TestClient(app.app)
+
+def columns(customers):
+    return {field: [customer[field] for customer in customers] for field in scoring.FEATURE_FIELDS}
+
+def upload(client, df, filename):
+    buffer = io.BytesIO()
+    if filename.endswith('.parquet'):
+        df.to_parquet(buffer)
+    else:
+        df.to_csv(buffer, index=False)
+    return client.post('/predict/batch/file', files={'file': (filename, buffer.getvalue())})
+
+def test_single_batch_and_file_scores_match(client):
+    singles = []
+    for customer in CUSTOMERS:
+        response = client.post('/predict', json=customer)
+        assert response.status_code == 200
+        singles.append(response.json())
+
+    batch = client.post('/predict/batch', json=columns(CUSTOMERS))
+    assert batch.status_code == 200
+    batch = batch.json()
+    assert batch['count'] == len(CUSTOMERS)
+
+    df = pd.DataFrame(CUSTOMERS)
+    for filename in ('customers.csv', 'customers.parquet'):
+        response = upload(client, df, filename)
+        assert response.status_code == 200
+        assert response.json() == batch
+
+    for i, single in enumerate(singles):
+        for field in RESULT_FIELDS:
+            assert batch[field][i] == single[field]
+        assert batch['recommendation_tier'][i] == single['risk_level']
+        assert batch['recommendations'][single['risk_level']] == single['recommendations']
+
+@pytest.mark.parametrize('field,value', [
+    ('age', None),
+    ('monthly_charges', 'abc'),
+    ('total_charges', None),
+    ('contract', None),
+])
+def test_invalid_values_are_rejected(client, field, value):
+    customer = dict(CUSTOMERS[0], **{field: value})
+    assert 400 <= client.post('/predict', json=customer).status_code < 500
+
+    batch = columns(CUSTOMERS)
+    batch[field][1] = value
+    assert 400 <= client.post('/predict/batch', json=batch).status_code < 500
+
+    df = pd.DataFrame(CUSTOMERS)
+    df[field] = df[field].astype(object)
+    df.loc[1, field] = value
+    assert 400 <= upload(client, df, 'customers.csv').status_code < 500
+
+def test_missing_column_is_rejected(client):
+    batch = columns(CUSTOMERS)
+    del batch['tenure']
+    assert client.post('/predict/batch', json=batch).status_code == 400
+
+def test_trained_model_is_the_default_scorer():
+    assert scoring.SCORER == 'model'
+    assert isinstance(scoring.load_churn_model(), ChurnModel)
+
+@pytest.mark.parametrize('contents', [None, '{"format_version": 1}', 'not json'])
+def test_missing_or_invalid_model_falls_back_to_rules(monkeypatch, tmp_path, contents):
+    path = tmp_path / 'churn_model.json'
+    if contents is not None:
+        path.write_text(contents)
+    monkeypatch.setattr(scoring, 'MODEL_PATH', str(path))
+    assert scoring.load_churn_model() is None
+
+def test_model_tiers_come_from_the_model(monkeypatch):
+    model = ChurnModel.load(scoring.MODEL_PATH)
+    monkeypatch.setattr(scoring, 'churn_model', model)
+    result = scoring.score_batch(columns(CUSTOMERS))
+    probabilities = model.predict_proba(columns(CUSTOMERS))
+    expected = [model.risk_levels[i] for i in model.risk_tier_index(probabilities)]
+    assert list(result['risk_level']) == expected
+    for customer, level in zip(CUSTOMERS, expected):
+        assert scoring.score_customer(customer)['risk_level'] == level
+
+def stage_count(client, stage):
+    prefix = f'inference_stage_duration_seconds_count{{service="churn",stage="{stage}"}} '
+    for line in client.get('/metrics').text.splitlines():
+        if line.startswith(prefix):
+            return float(line[len(prefix):])
+    return 0.0
+
+@pytest.mark.parametrize('kind', ['thread', 'process'])
+def test_batch_stage_timings_reach_metrics(client, monkeypatch, kind):
+    executor = ScoringExecutor(kind=kind, max_workers=1)
+    monkeypatch.setattr(app, 'scoring_executor', executor)
+    try:
+        before = stage_count(client, 'parse')
+        assert client.post('/predict/batch', json=columns(CUSTOMERS)).status_code == 200
+        # Recorded exactly once, in this process, whichever executor scored it
+        assert stage_count(client, 'parse') == before + 1
+    finally:
+        executor.shutdown()
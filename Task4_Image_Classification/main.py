@@ -1,22 +1,80 @@
+import argparse
 import sys
 import os
 
 # Add src directory to Python path
 sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
 
-from src.train import Trainer
-from src.data_preprocessing import DataPreprocessor
+def parse_args():
+    parser = argparse.ArgumentParser(description="Train and evaluate the CIFAR-10 CNN")
+    parser.add_argument('--headless', action='store_true',
+                        help='never open plot windows; plots, logs and checkpoints are written in the background')
+    parser.add_argument('--epochs', type=int, default=25)
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--input-mode', choices=('numpy', 'tfdata', 'shards'), default='numpy',
+                        help='data source (see Trainer.train_model)')
+    parser.add_argument('--shard-dir', help='shard directory written by src/dataset_shards.py (--input-mode shards)')
+    parser.add_argument('--output-dir', help='where models, checkpoints, logs and plots go (default: data/models)')
+    parser.add_argument('--augment', action='store_true')
+    parser.add_argument('--resume', action='store_true', help='continue from the latest checkpoint in the output dir')
+    parser.add_argument('--mixed-precision', action='store_true')
+    parser.add_argument('--jit-compile', action='store_true')
+    return parser.parse_args()
 
 def main():
+    args = parse_args()
+    if args.headless:
+        # Select a non-interactive backend before anything imports pyplot
+        import matplotlib
+        matplotlib.use('Agg')
+    
+    from src.train import Trainer
+    from src.artifacts import ArtifactWriter
+    from src.distributed import is_chief
+    
     print("=== CNN Image Classification Project - Task 4 ===")
     print("OutriX ML Internship\n")
     
     # Initialize trainer
-    trainer = Trainer()
+    writer = ArtifactWriter() if args.headless else None
+    show = not args.headless
+    trainer = Trainer(model_dir=args.output_dir, writer=writer, show_plots=show)
+    
+    # Every worker of a multi-worker run shares the output dir; only the
+    # chief writes plots and reports into it
+    chief = is_chief()
+    if args.input_mode == 'shards':
+        run_training(trainer, args)
+    else:
+        run_cifar10(trainer, args, show, writer, chief)
     
-    # Load and display basic dataset info
+    if writer is not None:
+        print(f"\nWaiting for {writer.pending()} background writes...")
+        writer.close()
+        if writer.failed:
+            print(f"{writer.failed} artifact writes failed")
+    
+    print("\n=== Task 4 Complete! ===")
+    if not chief:
+        print("Models, plots and logs are written by the chief worker")
+        return
+    if os.path.exists(trainer.best_model_path):
+        print(f"Model saved to: {trainer.best_model_path}")
+    else:
+        print(f"No model was saved to: {trainer.best_model_path}")
+    print(f"Training plots saved to: {os.path.join(trainer.model_dir, 'training_history.png')}")
+    print(f"Training log saved to: {os.path.join(trainer.model_dir, 'training_log.jsonl')}")
+
+def run_cifar10(trainer, args, show, writer, chief=True):
+    show_dataset_info(trainer, show, writer, chief)
+    run_training(trainer, args)
+
+def show_dataset_info(trainer, show, writer, chief):
+    # uint8 images with sparse labels are enough for the summary and plots;
+    # train_model builds float32/one-hot copies only for input_mode='numpy'.
+    # The arrays go out of scope before training loads its own.
     print("Loading dataset and showing sample information...")
-    (x_train, y_train), (x_test, y_test) = trainer.preprocessor.load_data()
+    (x_train, y_train), (x_test, y_test) = trainer.preprocessor.load_raw_data()
     
     print(f"\nDataset Summary:")
     print(f"Number of classes: {trainer.preprocessor.num_classes}")
@@ -26,29 +84,38 @@ def main():
     print(f"Image dimensions: {x_train.shape[1:3]}")
     print(f"Color channels: {x_train.shape[3]}")
     
-    # Show sample images
-    print("\nDisplaying sample images from dataset...")
-    trainer.preprocessor.visualize_samples(x_train, y_train, 16)
-    
-    # Show class distribution
-    print("\nDisplaying class distribution...")
-    trainer.preprocessor.get_class_distribution(y_train)
-    
+    if chief:
+        # Show sample images
+        print("\nDisplaying sample images from dataset...")
+        trainer.preprocessor.visualize_samples(x_train, y_train, 16, show=show, writer=writer,
+                                               save_path=os.path.join(trainer.model_dir, 'sample_images.png'))
+        
+        # Show class distribution
+        print("\nDisplaying class distribution...")
+        trainer.preprocessor.get_class_distribution(y_train, show=show, writer=writer,
+                                                    save_path=os.path.join(trainer.model_dir, 'class_distribution.png'))
+
+def run_training(trainer, args):
     # Train the model
     print("\nStarting CNN model training...")
-    history = trainer.train_model(epochs=25, batch_size=32)
+    trainer.train_model(
+        epochs=args.epochs, batch_size=args.batch_size, input_mode=args.input_mode, augment=args.augment,
+        shard_dir=args.shard_dir, mixed_precision=args.mixed_precision, jit_compile=args.jit_compile,
+        resume=args.resume
+    )
     
     # Evaluate final model
     print("\nEvaluating trained model...")
-    trainer.evaluate_model(x_test, y_test)
+    if args.input_mode == 'numpy':
+        trainer.evaluate_model(*trainer.validation_data)
+    elif trainer.validation_data is not None:
+        trainer.evaluate_model(trainer.validation_data)
+    else:
+        print("No validation split to evaluate on")
     
     # Plot training results
     print("\nDisplaying training history...")
     trainer.plot_training_history()
-    
-    print("\n=== Task 4 Complete! ===")
-    print("Model saved to: data/models/best_cnn_model.h5")
-    print("Training plots saved to: data/models/training_history.png")
 
 if __name__ == "__main__":
     main()
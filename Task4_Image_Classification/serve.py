@@ -0,0 +1,148 @@
+import sys
+import os
+import time
+
+# Add src directory to Python path
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+# Shared metrics module lives in the repository's common/ directory
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'common'))
+
+from flask import Flask, Response, g, request, jsonify
+from inference import ImageClassifierService
+from metrics import BATCH_SIZE, CONTENT_TYPE, REGISTRY, REQUESTS, REQUEST_LATENCY, stage_observer
+
+app = Flask(__name__)
+
+MODEL_PATH = os.environ.get(
+    'CNN_MODEL_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'models', 'best_cnn_model.h5')
+)
+# Comma-separated class names for models not trained on CIFAR-10
+CLASS_NAMES = [name.strip() for name in os.environ['CNN_CLASS_NAMES'].split(',')] if os.environ.get('CNN_CLASS_NAMES') else None
+
+# Decode threads (0 means one per CPU core) and micro-batching limits
+DECODE_WORKERS = int(os.environ.get('CNN_DECODE_WORKERS', 0))
+MAX_BATCH_SIZE = int(os.environ.get('CNN_MAX_BATCH_SIZE', 64))
+MAX_WAIT_MS = float(os.environ.get('CNN_MAX_WAIT_MS', 5.0))
+# Seconds a request waits for its predictions before returning 503
+RESULT_TIMEOUT_S = float(os.environ.get('CNN_RESULT_TIMEOUT_S', 30.0))
+
+# Request limits
+MAX_IMAGES = int(os.environ.get('CNN_MAX_IMAGES', 64))
+DEFAULT_TOP_K = int(os.environ.get('CNN_TOP_K', 5))
+app.config['MAX_CONTENT_LENGTH'] = int(os.environ.get('CNN_MAX_UPLOAD_MB', 32)) * 1024 * 1024
+
+service = ImageClassifierService(
+    MODEL_PATH,
+    class_names=CLASS_NAMES,
+    decode_workers=DECODE_WORKERS or None,
+    max_batch_size=MAX_BATCH_SIZE,
+    max_wait_ms=MAX_WAIT_MS,
+    result_timeout=RESULT_TIMEOUT_S
+)
+service.stage_observer = stage_observer('cnn')
+service.batcher.batch_observer = BATCH_SIZE.labels('cnn', 'micro_batch').observe
+
+def collect_cnn_metrics():
+    """Scrape-time model and micro-batching metrics"""
+    labels = {'service': 'cnn'}
+    yield 'model_info', 'gauge', 'Currently served model (value is always 1)', [({
+        'service': 'cnn',
+        'version': os.path.basename(service.model_path)
+    }, 1)]
+    yield 'micro_batch_queue_depth', 'gauge', 'Predictions waiting for a micro-batch', [(labels, service.batcher.stats()['queue_depth'])]
+
+REGISTRY.register_collector(collect_cnn_metrics)
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+    REQUESTS.labels('cnn', endpoint, request.method, response.status_code).inc()
+    start = g.get('request_start')
+    if start is not None:
+        REQUEST_LATENCY.labels('cnn', endpoint).observe(time.perf_counter() - start)
+    return response
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    return Response(REGISTRY.render(), content_type=CONTENT_TYPE)
+
+@app.route('/')
+def home():
+    return jsonify({
+        "message": "OutriX Task 4 - CNN Image Classification API",
+        "status": "running",
+        "endpoints": [
+            "/predict - POST: Classify one or more uploaded images (multipart 'image'/'images' or a raw image body)",
+            "/model_info - GET: Get model information",
+            "/metrics - GET: Prometheus metrics"
+        ]
+    })
+
+@app.route('/predict', methods=['POST'])
+def predict_images():
+    try:
+        uploads = request.files.getlist('images') + request.files.getlist('image')
+        images = [upload.read() for upload in uploads]
+        if not images and request.data:
+            # A raw image body, e.g. curl --data-binary @cat.png
+            images = [request.data]
+
+        if not images:
+            return jsonify({
+                "status": "error",
+                "message": "At least one image is required"
+            }), 400
+
+        if len(images) > MAX_IMAGES:
+            return jsonify({
+                "status": "error",
+                "message": f"At most {MAX_IMAGES} images per request"
+            }), 400
+
+        top_k = int(request.args.get('top_k', request.form.get('top_k', DEFAULT_TOP_K)))
+        predictions = service.classify(images, top_k)
+        BATCH_SIZE.labels('cnn', '/predict').observe(len(images))
+
+        return jsonify({
+            "status": "success",
+            "predictions": [
+                {"filename": uploads[i].filename if i < len(uploads) else None, "top_k": top}
+                for i, top in enumerate(predictions)
+            ]
+        })
+    except ValueError as e:
+        return jsonify({
+            "status": "error",
+            "message": str(e)
+        }), 400
+    except TimeoutError as e:
+        return jsonify({
+            "status": "error",
+            "message": str(e)
+        }), 503
+    except Exception as e:
+        return jsonify({
+            "status": "error",
+            "message": str(e)
+        }), 500
+
+@app.route('/model_info', methods=['GET'])
+def get_model_info():
+    return jsonify({
+        "status": "success",
+        "info": service.info()
+    })
+
+if __name__ == '__main__':
+    print("Starting OutriX Task 4 - CNN Image Classification API...")
+    print("Available endpoints:")
+    print("- POST /predict - Classify uploaded images")
+    print("- GET /model_info - Get model information")
+    print("- GET /metrics - Prometheus metrics")
+
+    app.run(host='0.0.0.0', port=int(os.environ.get('CNN_PORT', 5001)), threaded=True)
@@ -0,0 +1,244 @@
+"""Background artifact writing and structured training logs.
+
+ArtifactWriter owns one daemon thread that writes JSON files, JSON-lines
+records and rendered plots. Training code only enqueues the work, so an
+epoch never waits on the disk or on matplotlib. Plots are drawn on a
+standalone matplotlib Figure (no pyplot state), which is safe to render off
+the main thread.
+
+BackgroundModelCheckpoint keeps the best model file like ModelCheckpoint,
+but only snapshots the weights on the training thread; the .h5 file is
+written by the ArtifactWriter.
+
+ThroughputLogger is a Keras callback that appends one JSON line per epoch,
+with throughput and step timings, to a structured log:
+
+    {"event": "epoch", "epoch": 3, "seconds": 44.0, "train_seconds": 41.2, "steps": 1563,
+     "images": 50000, "images_per_sec": 1213.6, "step_ms": {"mean": 26.1, "p50": 25.8, "p95": 29.4, "max": 61.0},
+     "first_step_ms": 61.0, "metrics": {"loss": 0.93, "accuracy": 0.67, ...}}
+"""
+import json
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+import keras
+
+def _write_atomic(path, text):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+def _append_line(path, record):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'a') as f:
+        f.write(json.dumps(record) + '\n')
+
+def render_figure(draw, path, figsize, dpi=300):
+    """Draw onto a new standalone Figure with draw(fig) and save it to path"""
+    from matplotlib.figure import Figure
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    fig = Figure(figsize=figsize)
+    draw(fig)
+    fig.savefig(path, dpi=dpi, bbox_inches='tight')
+
+def output_figure(draw, figsize, save_path=None, show=True, writer=None):
+    """Save and/or display a plot drawn by draw(fig)
+
+    The file is written before the window opens (closing a pyplot window
+    empties its figure). Without show, the plot is only rendered to
+    save_path, on writer's thread when a writer is given.
+    """
+    if not show:
+        if save_path is None:
+            return
+        if writer is not None:
+            writer.save_figure(draw, save_path, figsize)
+        else:
+            render_figure(draw, save_path, figsize)
+        return
+
+    import matplotlib.pyplot as plt
+
+    fig = plt.figure(figsize=figsize)
+    draw(fig)
+    if save_path:
+        os.makedirs(os.path.dirname(os.path.abspath(save_path)), exist_ok=True)
+        fig.savefig(save_path, dpi=300, bbox_inches='tight')
+    plt.show()
+
+class ArtifactWriter:
+    """Writes files on a background thread in submission order
+
+    Callers hand over data they no longer mutate. Failures are printed and
+    counted instead of raised, so a full disk can't kill a training run.
+    """
+
+    def __init__(self):
+        self._queue = queue.Queue()
+        self.written = 0
+        self.failed = 0
+        self._worker = threading.Thread(target=self._run, name='artifact-writer', daemon=True)
+        self._worker.start()
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            try:
+                if job is None:
+                    return
+                description, func, args = job
+                try:
+                    func(*args)
+                    self.written += 1
+                except Exception as e:
+                    self.failed += 1
+                    print(f"Failed to write {description}: {e}")
+            finally:
+                self._queue.task_done()
+
+    def submit(self, description, func, *args):
+        """Run func(*args) on the writer thread"""
+        self._queue.put((description, func, args))
+
+    def write_json(self, path, data):
+        self.submit(path, lambda: _write_atomic(path, json.dumps(data, indent=2)))
+
+    def append_line(self, path, record):
+        self.submit(path, _append_line, path, record)
+
+    def save_figure(self, draw, path, figsize, dpi=300):
+        self.submit(path, render_figure, draw, path, figsize, dpi)
+
+    def pending(self):
+        return self._queue.qsize()
+
+    def flush(self):
+        """Block until everything submitted so far has been written"""
+        self._queue.join()
+
+    def close(self):
+        """Write everything still queued and stop the thread"""
+        self._queue.put(None)
+        self._worker.join()
+
+class BackgroundModelCheckpoint(keras.callbacks.Callback):
+    """Saves the model whenever the monitored metric improves, on writer's thread
+
+    The callback copies the weights to numpy at the end of an improving
+    epoch; the writer loads them into a clone of the model (built once, so
+    training keeps using its own variables) and saves that atomically. The
+    file has no optimizer state, which only resuming needs, and that lives
+    in TrainingCheckpoint.
+    """
+
+    def __init__(self, path, writer, monitor='val_accuracy', mode='max', verbose=1):
+        super().__init__()
+        if mode not in ('max', 'min'):
+            raise ValueError(f"mode must be 'max' or 'min', not {mode!r}")
+        self.path = path
+        self.writer = writer
+        self.monitor = monitor
+        self.mode = mode
+        self.verbose = verbose
+        self.best = -np.inf if mode == 'max' else np.inf
+        self._snapshot = None
+
+    def _improved(self, current):
+        return current > self.best if self.mode == 'max' else current < self.best
+
+    def on_train_begin(self, logs=None):
+        if self._snapshot is None:
+            self._snapshot = keras.models.clone_model(self.model)
+
+    def on_epoch_end(self, epoch, logs=None):
+        current = (logs or {}).get(self.monitor)
+        if current is None:
+            print(f"Can't save the best model: {self.monitor} is not in the epoch logs")
+            return
+        current = float(current)
+        if not self._improved(current):
+            return
+        if self.verbose:
+            print(f"\nEpoch {epoch + 1}: {self.monitor} improved from {self.best:.5f} to {current:.5f}, "
+                  f"saving model to {self.path}")
+        self.best = current
+        self.writer.submit(self.path, self._save, self.model.get_weights())
+
+    def _save(self, weights):
+        self._snapshot.set_weights(weights)
+        # Keras picks the format from the extension, so keep it on the temp file
+        root, extension = os.path.splitext(self.path)
+        tmp_path = root + '.tmp' + extension
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._snapshot.save(tmp_path)
+        os.replace(tmp_path, self.path)
+
+class ThroughputLogger(keras.callbacks.Callback):
+    """Appends per-epoch throughput and step timing records to a JSON-lines log"""
+
+    def __init__(self, path, batch_size, samples_per_epoch=None, writer=None, run_info=None):
+        super().__init__()
+        self.path = path
+        self.batch_size = batch_size
+        self.samples_per_epoch = samples_per_epoch
+        self.writer = writer
+        self.run_info = run_info or {}
+
+    def _log(self, record):
+        record['time'] = time.time()
+        if self.writer is not None:
+            self.writer.append_line(self.path, record)
+        else:
+            _append_line(self.path, record)
+
+    def on_train_begin(self, logs=None):
+        self._log(dict(self.run_info, event='train_begin'))
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self._step_times = []
+        self._epoch_start = time.perf_counter()
+
+    def on_train_batch_begin(self, batch, logs=None):
+        self._step_start = time.perf_counter()
+
+    def on_train_batch_end(self, batch, logs=None):
+        self._train_end = time.perf_counter()
+        self._step_times.append(self._train_end - self._step_start)
+
+    def on_epoch_end(self, epoch, logs=None):
+        seconds = time.perf_counter() - self._epoch_start
+        # Throughput covers the training steps only, not the validation pass
+        train_seconds = (self._train_end - self._epoch_start) if self._step_times else 0.0
+        steps = np.array(self._step_times) * 1000
+        # The last batch of an epoch can be partial, so cap at the epoch size when known
+        images = len(steps) * self.batch_size
+        if self.samples_per_epoch:
+            images = min(images, self.samples_per_epoch)
+        record = {
+            'event': 'epoch',
+            'epoch': epoch + 1,
+            'seconds': seconds,
+            'train_seconds': train_seconds,
+            'steps': len(steps),
+            'images': images,
+            'images_per_sec': images / train_seconds if train_seconds > 0 else None,
+            'metrics': {key: float(value) for key, value in (logs or {}).items()}
+        }
+        if len(steps):
+            record['step_ms'] = {
+                'mean': float(steps.mean()),
+                'p50': float(np.percentile(steps, 50)),
+                'p95': float(np.percentile(steps, 95)),
+                'max': float(steps.max())
+            }
+            record['first_step_ms'] = float(steps[0])
+        self._log(record)
+
+    def on_train_end(self, logs=None):
+        self._log({'event': 'train_end'})
@@ -0,0 +1,179 @@
+"""Resumable training state for the CNN trainer.
+
+TrainingCheckpoint saves everything needed to continue a killed run at the
+end of every epoch:
+
+    <model_dir>/checkpoints/ckpt-N.*      tf.train.Checkpoint: model weights, optimizer
+                                          slots and learning rate, TF global RNG
+    <model_dir>/checkpoints/state.json    epochs completed, callback state
+                                          (ReduceLROnPlateau, EarlyStopping,
+                                          best-model checkpoint), numpy/python RNG state
+                                          and the history of the epochs so far
+
+state.json is written after its checkpoint, so it always points at a
+complete one. Given an ArtifactWriter, checkpoints are saved asynchronously
+and state.json is written on the writer thread once the save has finished.
+Under MultiWorkerMirroredStrategy every worker has to take part in the save;
+only the chief writes to model_dir, the others write to a scratch directory
+that is deleted straight away. Resuming a multi-machine
+job needs model_dir on storage every worker can read.
+"""
+import json
+import os
+import random
+import shutil
+
+import numpy as np
+import tensorflow as tf
+import keras
+
+STATE_FILENAME = 'state.json'
+
+# Callback attributes that decide future behaviour; each is reset in on_train_begin
+CALLBACK_STATE = {
+    'ReduceLROnPlateau': ('wait', 'best', 'cooldown_counter'),
+    'EarlyStopping': ('wait', 'best', 'best_epoch'),
+    'ModelCheckpoint': ('best',),
+    'BackgroundModelCheckpoint': ('best',)
+}
+
+def _to_json(value):
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, (np.floating, np.integer)):
+        return value.item()
+    if isinstance(value, tuple):
+        return [_to_json(item) for item in value]
+    return value
+
+def _python_rng_state(state):
+    # random.setstate() wants (version, tuple of ints, gauss_next)
+    return (state[0], tuple(state[1]), state[2])
+
+class TrainingCheckpoint(keras.callbacks.Callback):
+    """Saves and restores full training state so fit() can resume mid-run
+
+    Restore with restore() after the model is compiled and before fit();
+    it returns the epoch to pass as fit(initial_epoch=...). Put this callback
+    after the callbacks it tracks: their state is re-applied in
+    on_train_begin, after they have reset themselves.
+    """
+
+    def __init__(self, model_dir, callbacks=(), max_to_keep=3, write_checkpoints=True, writer=None):
+        super().__init__()
+        self.checkpoint_dir = os.path.join(model_dir, 'checkpoints')
+        self.tracked_callbacks = [cb for cb in callbacks if type(cb).__name__ in CALLBACK_STATE]
+        self.max_to_keep = max_to_keep
+        self.write_checkpoints = write_checkpoints
+        # With an ArtifactWriter, checkpoint files are written asynchronously
+        # and state.json follows on the writer thread once they are complete
+        self.writer = writer
+        self.epoch = tf.Variable(0, dtype=tf.int64, trainable=False, name='epoch')
+        self.history = {}
+        self._restored_state = None
+        self._checkpoint = None
+        self._manager = None
+
+    def _ensure_checkpoint(self, model):
+        if self._checkpoint is None:
+            self._checkpoint = tf.train.Checkpoint(
+                model=model, optimizer=model.optimizer, epoch=self.epoch,
+                rng=tf.random.get_global_generator()
+            )
+        return self._checkpoint
+
+    def _write_dir(self):
+        if self.write_checkpoints:
+            return self.checkpoint_dir
+        # Non-chief workers must still run the save for its collective ops
+        return os.path.join(self.checkpoint_dir, f'.worker-{os.getpid()}')
+
+    def restore(self, model):
+        """Load the latest saved state into model; returns the number of completed epochs"""
+        state_path = os.path.join(self.checkpoint_dir, STATE_FILENAME)
+        if not os.path.exists(state_path):
+            return 0
+        with open(state_path) as f:
+            state = json.load(f)
+
+        checkpoint = self._ensure_checkpoint(model)
+        # Create the optimizer's slot variables so they are restored immediately
+        if hasattr(model.optimizer, 'build'):
+            model.optimizer.build(model.trainable_variables)
+        checkpoint.restore(os.path.join(self.checkpoint_dir, state['checkpoint'])).assert_existing_objects_matched()
+
+        np.random.set_state(tuple(state['numpy_rng']))
+        random.setstate(_python_rng_state(state['python_rng']))
+        self.history = state.get('history', {})
+        self._restored_state = state
+        print(f"Resumed from {state['checkpoint']} after epoch {state['epoch']} "
+              f"(learning rate {float(np.asarray(model.optimizer.learning_rate)):.2e})")
+        return state['epoch']
+
+    def on_train_begin(self, logs=None):
+        if self._restored_state is None:
+            return
+        saved = self._restored_state.get('callbacks', {})
+        for callback in self.tracked_callbacks:
+            for name, value in saved.get(type(callback).__name__, {}).items():
+                setattr(callback, name, value)
+
+    def on_epoch_end(self, epoch, logs=None):
+        for key, value in (logs or {}).items():
+            self.history.setdefault(key, []).append(float(value))
+        self.epoch.assign(epoch + 1)
+
+        write_dir = self._write_dir()
+        if self._manager is None or self._manager.directory != write_dir:
+            self._manager = tf.train.CheckpointManager(
+                self._ensure_checkpoint(self.model), write_dir, max_to_keep=self.max_to_keep
+            )
+        path = self._manager.save(checkpoint_number=epoch + 1, options=self._save_options())
+        if not self.write_checkpoints:
+            shutil.rmtree(write_dir, ignore_errors=True)
+            return
+
+        state = {
+            'checkpoint': os.path.basename(path),
+            'epoch': epoch + 1,
+            'callbacks': {
+                type(callback).__name__: {name: _to_json(getattr(callback, name))
+                                          for name in CALLBACK_STATE[type(callback).__name__]
+                                          if hasattr(callback, name)}
+                for callback in self.tracked_callbacks
+            },
+            'numpy_rng': _to_json(np.random.get_state()),
+            'python_rng': _to_json(random.getstate()),
+            'history': {key: list(values) for key, values in self.history.items()}
+        }
+        if self.writer is not None:
+            self.writer.submit(STATE_FILENAME, self._write_state_when_saved, state)
+        else:
+            self._write_state(state)
+
+    def on_train_end(self, logs=None):
+        self._sync()
+
+    def _save_options(self):
+        # Non-chief saves are deleted right away, so they have to be synchronous
+        if self.writer is None or not self.write_checkpoints:
+            return None
+        try:
+            return tf.train.CheckpointOptions(experimental_enable_async_checkpoint=True)
+        except TypeError:
+            # TensorFlow without async checkpointing; saves stay synchronous
+            return None
+
+    def _sync(self):
+        if self._checkpoint is not None and hasattr(self._checkpoint, 'sync'):
+            self._checkpoint.sync()
+
+    def _write_state_when_saved(self, state):
+        self._sync()
+        self._write_state(state)
+
+    def _write_state(self, state):
+        tmp_path = os.path.join(self.checkpoint_dir, STATE_FILENAME + '.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, os.path.join(self.checkpoint_dir, STATE_FILENAME))
@@ -1,18 +1,26 @@
 import tensorflow as tf
 import numpy as np
-import matplotlib.pyplot as plt
+from dataset_shards import load_index, open_shards
+from artifacts import output_figure
+
+AUTOTUNE = tf.data.AUTOTUNE
 
 class DataPreprocessor:
     def __init__(self):
         self.num_classes = 10
+        self.image_shape = (32, 32, 3)
         self.class_names = ['airplane', 'automobile', 'bird', 'cat', 'deer',
                            'dog', 'frog', 'horse', 'ship', 'truck']
+        # Size of the training split of the last loaded dataset, for throughput logs
+        self.train_samples = None
     
     def load_data(self):
         """Load and preprocess CIFAR-10 dataset"""
         print("Loading CIFAR-10 dataset...")
         (x_train, y_train), (x_test, y_test) = tf.keras.datasets.cifar10.load_data() # type: ignore
         
+        self.train_samples = len(x_train)
+        
         # Normalize pixel values to 0-1 range
         x_train = x_train.astype('float32') / 255.0
         x_test = x_test.astype('float32') / 255.0
@@ -28,28 +36,194 @@ class DataPreprocessor:
         
         return (x_train, y_train), (x_test, y_test)
     
-    def visualize_samples(self, x_data, y_data, num_samples=25):
-        """Visualize sample images from dataset"""
-        plt.figure(figsize=(10, 10))
-        for i in range(num_samples):
-            plt.subplot(5, 5, i + 1)
-            plt.imshow(x_data[i])
-            plt.title(self.class_names[np.argmax(y_data[i])])
-            plt.axis('off')
-        plt.tight_layout()
-        plt.show()
-        
-    def get_class_distribution(self, y_data):
-        """Display class distribution in dataset"""
-        class_counts = np.sum(y_data, axis=0)
-        
-        plt.figure(figsize=(10, 6))
-        plt.bar(self.class_names, class_counts)
-        plt.title('Class Distribution in Dataset')
-        plt.xlabel('Classes')
-        plt.ylabel('Number of Samples')
-        plt.xticks(rotation=45)
-        plt.tight_layout()
-        plt.show()
+    def load_raw_data(self):
+        """Load CIFAR-10 as uint8 images with sparse integer labels"""
+        print("Loading CIFAR-10 dataset (uint8)...")
+        (x_train, y_train), (x_test, y_test) = tf.keras.datasets.cifar10.load_data() # type: ignore
+        
+        # Keep pixels as uint8 (4x smaller than float32) and labels as class
+        # indices; normalization happens per batch inside the tf.data pipeline
+        y_train = y_train.reshape(-1).astype('int32')
+        y_test = y_test.reshape(-1).astype('int32')
+        
+        print(f"Training data shape: {x_train.shape} ({x_train.dtype})")
+        print(f"Test data shape: {x_test.shape} ({x_test.dtype})")
+        
+        return (x_train, y_train), (x_test, y_test)
+    
+    def _augment(self, image, label):
+        """Random horizontal flip and a random 32x32 crop of the 4-pixel padded image"""
+        height, width, channels = self.image_shape
+        image = tf.image.random_flip_left_right(image)
+        image = tf.image.resize_with_crop_or_pad(image, height + 8, width + 8)
+        image = tf.image.random_crop(image, size=[height, width, channels])
+        return image, label
+    
+    def _normalize(self, image, label):
+        """Scale uint8 pixels to the 0-1 range"""
+        return tf.cast(image, tf.float32) / 255.0, label
+    
+    def make_dataset(self, images, labels, batch_size=32, training=False, augment=False,
+                     shuffle_buffer=10000, cache=False, seed=None):
+        """Build a batched tf.data pipeline over uint8 images and sparse labels
+        
+        images/labels may be numpy arrays or an existing tf.data.Dataset of
+        (image, label) pairs. cache=True caches the decoded uint8 elements in
+        memory, a string caches them to that file path (for datasets larger
+        than RAM), and False disables caching. Numpy input is already in
+        memory, so cache=True is ignored for it rather than keeping a second
+        full copy; caching only pays off for file-backed or decoded sources.
+        """
+        in_memory = not isinstance(images, tf.data.Dataset)
+        if in_memory:
+            dataset = tf.data.Dataset.from_tensor_slices((images, labels))
+        else:
+            dataset = images
+        
+        # Cache before any random op so every epoch still gets fresh
+        # shuffles and augmentations
+        if cache is True and in_memory:
+            print("Skipping the in-memory cache: the dataset is built from arrays already in memory")
+        elif cache is True:
+            dataset = dataset.cache()
+        elif cache:
+            dataset = dataset.cache(cache)
+        
+        if training:
+            dataset = dataset.shuffle(shuffle_buffer, seed=seed, reshuffle_each_iteration=True)
+            if augment:
+                dataset = dataset.map(self._augment, num_parallel_calls=AUTOTUNE)
+        
+        # Normalizing whole batches is one vectorized op instead of one per image
+        dataset = dataset.batch(batch_size)
+        dataset = dataset.map(self._normalize, num_parallel_calls=AUTOTUNE)
+        return dataset.prefetch(AUTOTUNE)
+    
+    def load_datasets(self, batch_size=32, augment=False, shuffle_buffer=10000, cache=False):
+        """Return (train_dataset, test_dataset) streaming CIFAR-10 with sparse labels"""
+        (x_train, y_train), (x_test, y_test) = self.load_raw_data()
+        self.train_samples = len(x_train)
+        
+        train_dataset = self.make_dataset(
+            x_train, y_train, batch_size=batch_size, training=True, augment=augment,
+            shuffle_buffer=shuffle_buffer, cache=cache
+        )
+        test_dataset = self.make_dataset(x_test, y_test, batch_size=batch_size, cache=cache)
+        
+        return train_dataset, test_dataset
+
+    def make_shard_dataset(self, shard_dir, split='train', batch_size=32, training=False, augment=False,
+                           shuffle_buffer=10000, cache=False, read_chunk=256, seed=None):
+        """Stream a split written by dataset_shards.py from memory-mapped shards
+
+        Shards are opened with mmap_mode='r', so nothing is read up front and
+        epoch startup is only the index lookup. Each element of the outer
+        dataset is a (shard, offset) chunk of read_chunk images; chunks are
+        read in parallel and, when training, in a shuffled order, so reads
+        spread over every shard and core. Also sets num_classes, image_shape
+        and class_names from the shard index.
+        """
+        index = load_index(shard_dir)
+        self.class_names = index['class_names']
+        self.num_classes = len(self.class_names)
+        self.image_shape = tuple(index['image_shape'])
+        shards = open_shards(shard_dir, split)
+        if not shards:
+            raise ValueError(f"Split {split!r} in {shard_dir} has no images")
+
+        chunks = np.array([(shard_id, start)
+                           for shard_id, (images, _) in enumerate(shards)
+                           for start in range(0, len(images), read_chunk)], dtype=np.int64)
+
+        def read_chunk_fn(shard_id, start):
+            images, labels = shards[shard_id]
+            # Slicing a memmap only touches the pages of this chunk
+            return (np.ascontiguousarray(images[start:start + read_chunk]),
+                    np.ascontiguousarray(labels[start:start + read_chunk]))
+
+        def load_chunk(chunk):
+            images, labels = tf.numpy_function(read_chunk_fn, [chunk[0], chunk[1]], [tf.uint8, tf.int32])
+            images.set_shape((None,) + self.image_shape)
+            labels.set_shape((None,))
+            return images, labels
+
+        dataset = tf.data.Dataset.from_tensor_slices(chunks)
+        if training:
+            dataset = dataset.shuffle(len(chunks), seed=seed, reshuffle_each_iteration=True)
+        dataset = dataset.map(load_chunk, num_parallel_calls=AUTOTUNE, deterministic=not training)
+        dataset = dataset.unbatch()
+
+        # The element shuffle then mixes images across neighbouring chunks
+        return self.make_dataset(
+            dataset, None, batch_size=batch_size, training=training, augment=augment,
+            shuffle_buffer=shuffle_buffer, cache=cache, seed=seed
+        )
+
+    def load_shard_datasets(self, shard_dir, batch_size=32, augment=False, shuffle_buffer=10000,
+                            cache=False):
+        """Return (train_dataset, validation_dataset) from a shard directory
+
+        validation_dataset is None when the shards were built without a
+        validation split or it holds no images.
+        """
+        index = load_index(shard_dir)
+        self.train_samples = index['splits']['train']['count']
+        train_dataset = self.make_shard_dataset(
+            shard_dir, 'train', batch_size=batch_size, training=True, augment=augment,
+            shuffle_buffer=shuffle_buffer, cache=cache
+        )
+        validation_dataset = None
+        if index['splits'].get('validation', {}).get('count'):
+            validation_dataset = self.make_shard_dataset(
+                shard_dir, 'validation', batch_size=batch_size, cache=cache
+            )
+
+        return train_dataset, validation_dataset
+
+    def visualize_samples(self, x_data, y_data, num_samples=25, show=True, save_path=None, writer=None):
+        """Visualize sample images from dataset
+        
+        show=False skips the window (for headless runs); the plot is then
+        only rendered to save_path, on writer's thread when one is given.
+        """
+        images = np.array(x_data[:num_samples])
+        titles = []
+        for label in y_data[:num_samples]:
+            label = np.asarray(label).reshape(-1)
+            titles.append(self.class_names[int(np.argmax(label)) if label.size > 1 else int(label[0])])
+        
+        def draw(fig):
+            for i, (image, title) in enumerate(zip(images, titles)):
+                ax = fig.add_subplot(5, 5, i + 1)
+                ax.imshow(image)
+                ax.set_title(title)
+                ax.axis('off')
+            fig.tight_layout()
+        
+        output_figure(draw, (10, 10), save_path, show, writer)
+        
+    def get_class_distribution(self, y_data, show=True, save_path=None, writer=None):
+        """Display class distribution in dataset
+        
+        y_data may be one-hot or sparse labels; sparse labels are counted
+        with bincount instead of materializing a one-hot matrix.
+        """
+        y_data = np.asarray(y_data)
+        if y_data.ndim == 2 and y_data.shape[1] > 1:
+            class_counts = np.sum(y_data, axis=0)
+        else:
+            class_counts = np.bincount(y_data.reshape(-1).astype(np.int64), minlength=self.num_classes)
+        class_names = list(self.class_names)
+        
+        def draw(fig):
+            ax = fig.add_subplot(1, 1, 1)
+            ax.bar(class_names, class_counts)
+            ax.set_title('Class Distribution in Dataset')
+            ax.set_xlabel('Classes')
+            ax.set_ylabel('Number of Samples')
+            ax.tick_params(axis='x', labelrotation=45)
+            fig.tight_layout()
+        
+        output_figure(draw, (10, 6), save_path, show, writer)
         
         return class_counts
@@ -0,0 +1,194 @@
+"""Convert a directory of images into memory-mappable uint8 numpy shards.
+
+The input directory holds one sub-directory per class (the layout used by
+keras.utils.image_dataset_from_directory). Images are decoded, converted to
+RGB and resized once, in parallel worker processes, and written as shards of
+at most --shard-size images:
+
+    <output>/train/images-00000.npy    uint8, (n, height, width, 3)
+    <output>/train/labels-00000.npy    int32, (n,)
+    <output>/index.json                 class names, image shape, shard list
+
+index.json is written last, so a partially built directory is never loaded.
+Shards are plain .npy files, so DataPreprocessor can open them with
+np.load(mmap_mode='r') without reading them up front.
+
+    python src/dataset_shards.py data/raw_images data/shards --size 32 --validation-split 0.1
+"""
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import json
+import os
+import random
+
+import numpy as np
+
+SHARD_FORMAT_VERSION = 1
+INDEX_FILENAME = 'index.json'
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.gif', '.webp')
+
+def list_images(image_dir):
+    """Return (class_names, [(path, label), ...]) for a class-per-directory layout"""
+    class_names = sorted(
+        entry for entry in os.listdir(image_dir)
+        if os.path.isdir(os.path.join(image_dir, entry)) and not entry.startswith('.')
+    )
+    if not class_names:
+        raise ValueError(f"No class directories found in {image_dir}")
+
+    samples = []
+    for label, class_name in enumerate(class_names):
+        class_dir = os.path.join(image_dir, class_name)
+        for root, _, files in os.walk(class_dir):
+            for filename in sorted(files):
+                if filename.lower().endswith(IMAGE_EXTENSIONS):
+                    samples.append((os.path.join(root, filename), label))
+    return class_names, samples
+
+def load_image(path, image_size):
+    """Decode one image as RGB uint8 and resize it to image_size (height, width)"""
+    from PIL import Image
+
+    height, width = image_size
+    with Image.open(path) as image:
+        image = image.convert('RGB')
+        if image.size != (width, height):
+            image = image.resize((width, height), Image.BILINEAR)
+        return np.asarray(image, dtype=np.uint8)
+
+def write_shard(samples, image_size, images_path, labels_path):
+    """Decode samples into one images/labels shard pair; returns (count, skipped paths)"""
+    height, width = image_size
+    images = np.lib.format.open_memmap(images_path + '.tmp', mode='w+', dtype=np.uint8,
+                                       shape=(len(samples), height, width, 3))
+    labels = np.empty(len(samples), dtype=np.int32)
+    count = 0
+    skipped = []
+    for path, label in samples:
+        try:
+            images[count] = load_image(path, image_size)
+        except Exception as e:
+            skipped.append(f"{path}: {e}")
+            continue
+        labels[count] = label
+        count += 1
+    images.flush()
+    del images
+
+    if count < len(samples):
+        # Rewrite without the trailing slots of unreadable images
+        full = np.load(images_path + '.tmp', mmap_mode='r')
+        with open(images_path, 'wb') as f:
+            np.save(f, full[:count])
+        del full
+        os.remove(images_path + '.tmp')
+    else:
+        os.replace(images_path + '.tmp', images_path)
+    np.save(labels_path, labels[:count])
+    return count, skipped
+
+def build_shards(image_dir, output_dir, image_size=(32, 32), shard_size=10000,
+                 validation_split=0.1, workers=None, seed=42):
+    """Convert image_dir into shards under output_dir and return the index"""
+    class_names, samples = list_images(image_dir)
+    if not samples:
+        raise ValueError(f"No images found in {image_dir}")
+
+    # Mixing classes across shards lets training read shards in any order
+    random.Random(seed).shuffle(samples)
+    n_validation = int(len(samples) * validation_split)
+    splits = {'train': samples[n_validation:]}
+    if n_validation:
+        splits['validation'] = samples[:n_validation]
+
+    index = {
+        'format_version': SHARD_FORMAT_VERSION,
+        'image_shape': [image_size[0], image_size[1], 3],
+        'class_names': class_names,
+        'splits': {}
+    }
+    skipped = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for split, split_samples in splits.items():
+            split_dir = os.path.join(output_dir, split)
+            os.makedirs(split_dir, exist_ok=True)
+            jobs = []
+            for shard_id, start in enumerate(range(0, len(split_samples), shard_size)):
+                images_file = f'{split}/images-{shard_id:05d}.npy'
+                labels_file = f'{split}/labels-{shard_id:05d}.npy'
+                future = executor.submit(
+                    write_shard, split_samples[start:start + shard_size], image_size,
+                    os.path.join(output_dir, images_file), os.path.join(output_dir, labels_file)
+                )
+                jobs.append((images_file, labels_file, future))
+
+            shards = []
+            for images_file, labels_file, future in jobs:
+                count, shard_skipped = future.result()
+                skipped.extend(shard_skipped)
+                shards.append({'images': images_file, 'labels': labels_file, 'count': count})
+                print(f"Wrote {images_file} ({count} images)")
+
+            split_count = sum(shard['count'] for shard in shards)
+            if split_count == 0:
+                if split == 'train':
+                    raise ValueError(f"No readable training images in {image_dir}")
+                # Readers treat a missing split as "no validation data"; an
+                # empty one would only build an empty dataset
+                print(f"No readable {split} images; leaving the split out of the index")
+                for shard in shards:
+                    os.remove(os.path.join(output_dir, shard['images']))
+                    os.remove(os.path.join(output_dir, shard['labels']))
+                os.rmdir(split_dir)
+                continue
+            index['splits'][split] = {'count': split_count, 'shards': shards}
+
+    index['skipped'] = len(skipped)
+    for message in skipped[:20]:
+        print(f"Skipped unreadable image {message}")
+
+    # Written last, so readers only ever see complete shard sets
+    tmp_path = os.path.join(output_dir, INDEX_FILENAME + '.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(index, f, indent=2)
+    os.replace(tmp_path, os.path.join(output_dir, INDEX_FILENAME))
+    return index
+
+def load_index(shard_dir):
+    """Read and validate a shard directory's index.json"""
+    with open(os.path.join(shard_dir, INDEX_FILENAME)) as f:
+        index = json.load(f)
+    if index.get('format_version') != SHARD_FORMAT_VERSION:
+        raise ValueError(f"Unsupported shard format: {index.get('format_version')}")
+    return index
+
+def open_shards(shard_dir, split='train'):
+    """Memory-map every shard of a split; returns [(images, labels), ...] without reading pixels"""
+    index = load_index(shard_dir)
+    if split not in index['splits']:
+        raise ValueError(f"Split {split!r} not found in {shard_dir}")
+    return [
+        (np.load(os.path.join(shard_dir, shard['images']), mmap_mode='r'),
+         np.load(os.path.join(shard_dir, shard['labels']), mmap_mode='r'))
+        for shard in index['splits'][split]['shards']
+        if shard['count'] > 0
+    ]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('image_dir', help='directory with one sub-directory of images per class')
+    parser.add_argument('output_dir', help='directory to write shards and index.json to')
+    parser.add_argument('--size', type=int, nargs='+', default=[32], help='output size: SIZE or HEIGHT WIDTH')
+    parser.add_argument('--shard-size', type=int, default=10000, help='images per shard')
+    parser.add_argument('--validation-split', type=float, default=0.1,
+                        help='fraction held out as a validation split (0 for none)')
+    parser.add_argument('--workers', type=int, default=None, help='decode processes (default: one per CPU core)')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    size = (args.size[0], args.size[0]) if len(args.size) == 1 else tuple(args.size[:2])
+    index = build_shards(args.image_dir, args.output_dir, size, args.shard_size,
+                         args.validation_split, args.workers, args.seed)
+    for split, info in index['splits'].items():
+        print(f"{split}: {info['count']} images in {len(info['shards'])} shards")
+    print(f"Shard index written to: {os.path.join(args.output_dir, INDEX_FILENAME)}")
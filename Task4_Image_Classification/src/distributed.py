@@ -0,0 +1,99 @@
+"""Multi-worker data-parallel training helpers.
+
+Trainer.train_model switches to MultiWorkerMirroredStrategy when TF_CONFIG
+describes a cluster of more than one worker. Each worker trains on its own
+shard of every global batch, and gradients are all-reduced across workers.
+On several machines, set TF_CONFIG on each one. On one machine, this module
+starts the worker processes for you:
+
+    cd src && python distributed.py --workers 4 -- \
+        python ../main.py --headless --epochs 10 --input-mode tfdata
+
+Every worker runs the same command with its own TF_CONFIG. The command exits
+with the first non-zero worker status.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+def cluster_spec():
+    """TF_CONFIG as a dict, or None when the process is not part of a cluster"""
+    if not os.environ.get('TF_CONFIG'):
+        return None
+    return json.loads(os.environ['TF_CONFIG'])
+
+def cluster_size(tf_config=None):
+    """Number of training tasks (chief and workers) in the cluster"""
+    tf_config = tf_config if tf_config is not None else cluster_spec()
+    if not tf_config:
+        return 1
+    cluster = tf_config.get('cluster', {})
+    return len(cluster.get('chief', [])) + len(cluster.get('worker', []))
+
+def is_chief(tf_config=None):
+    """Whether this process writes shared outputs (checkpoints, saved models, plots)"""
+    tf_config = tf_config if tf_config is not None else cluster_spec()
+    if not tf_config:
+        return True
+    task = tf_config.get('task', {})
+    if 'chief' in tf_config.get('cluster', {}):
+        return task.get('type') == 'chief'
+    return task.get('type') == 'worker' and task.get('index', 0) == 0
+
+def create_strategy(distribute=None):
+    """MultiWorkerMirroredStrategy for a multi-worker TF_CONFIG, else the default strategy
+
+    distribute=None decides from TF_CONFIG; True/False force either way.
+    Must be called before TensorFlow runs its first op.
+    """
+    import tensorflow as tf
+
+    if distribute is None:
+        distribute = cluster_size() > 1
+    if not distribute:
+        return tf.distribute.get_strategy()
+    strategy = tf.distribute.MultiWorkerMirroredStrategy()
+    print(f"Multi-worker training with {strategy.num_replicas_in_sync} replicas "
+          f"({'chief' if is_chief() else 'worker'})")
+    return strategy
+
+def local_cluster(num_workers, base_port=12345):
+    """TF_CONFIG dicts for num_workers processes on this machine"""
+    workers = [f'localhost:{base_port + i}' for i in range(num_workers)]
+    return [{'cluster': {'worker': workers}, 'task': {'type': 'worker', 'index': i}}
+            for i in range(num_workers)]
+
+def launch_local_workers(command, num_workers, base_port=12345, threads_per_worker=None):
+    """Run command once per local worker with its TF_CONFIG; returns the exit codes"""
+    processes = []
+    for tf_config in local_cluster(num_workers, base_port):
+        env = dict(os.environ, TF_CONFIG=json.dumps(tf_config))
+        if threads_per_worker:
+            # Keep workers from oversubscribing the cores they share
+            env['OMP_NUM_THREADS'] = str(threads_per_worker)
+            env['TF_NUM_INTRAOP_THREADS'] = str(threads_per_worker)
+        processes.append(subprocess.Popen(command, env=env))
+    try:
+        return [process.wait() for process in processes]
+    except KeyboardInterrupt:
+        for process in processes:
+            process.terminate()
+        raise
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=2, help='worker processes to start')
+    parser.add_argument('--port', type=int, default=12345, help='first local port used by the cluster')
+    parser.add_argument('--threads-per-worker', type=int, default=None,
+                        help='intra-op threads per worker (default: cores / workers)')
+    parser.add_argument('command', nargs=argparse.REMAINDER, help='training command, after --')
+    args = parser.parse_args()
+
+    command = args.command[1:] if args.command[:1] == ['--'] else args.command
+    if not command:
+        parser.error('a training command is required, e.g. -- python main.py')
+    threads = args.threads_per_worker or max(1, (os.cpu_count() or 1) // args.workers)
+    codes = launch_local_workers(command, args.workers, args.port, threads)
+    sys.exit(next((code for code in codes if code), 0))
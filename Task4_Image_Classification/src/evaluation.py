@@ -0,0 +1,168 @@
+"""Streaming evaluation metrics for classifier predictions.
+
+StreamingEvaluator accumulates everything incrementally from batches of
+predicted probabilities and true labels. It tracks the confusion matrix,
+per-class precision/recall/F1, top-k accuracy, log loss and calibration
+(expected calibration error over confidence bins). Memory is
+O(classes^2 + bins), however many samples are evaluated, so validation sets
+never have to be held in memory or converted to one-hot.
+
+    evaluator = evaluate_model(model, test_dataset, class_names=class_names)
+    evaluator.write_json('evaluation.json')
+"""
+import json
+import os
+
+import numpy as np
+
+class StreamingEvaluator:
+    """Accumulates classification metrics batch by batch"""
+
+    def __init__(self, num_classes, class_names=None, top_k=(1, 5), calibration_bins=15):
+        self.num_classes = num_classes
+        self.class_names = list(class_names) if class_names is not None else [str(i) for i in range(num_classes)]
+        if len(self.class_names) != num_classes:
+            raise ValueError(f"Expected {num_classes} class names, got {len(self.class_names)}")
+        self.top_k = tuple(k for k in sorted(set(top_k)) if 1 <= k <= num_classes)
+        self.calibration_bins = calibration_bins
+        self.reset()
+
+    def reset(self):
+        n = self.num_classes
+        # confusion[true, predicted]
+        self.confusion = np.zeros((n, n), dtype=np.int64)
+        self.top_k_correct = np.zeros(len(self.top_k), dtype=np.int64)
+        self.bin_counts = np.zeros(self.calibration_bins, dtype=np.int64)
+        self.bin_confidence = np.zeros(self.calibration_bins, dtype=np.float64)
+        self.bin_correct = np.zeros(self.calibration_bins, dtype=np.float64)
+        self.log_loss_sum = 0.0
+        self.samples = 0
+
+    def update(self, probabilities, labels):
+        """Add one batch: (n, classes) probabilities and sparse or one-hot labels"""
+        probabilities = np.asarray(probabilities, dtype=np.float64)
+        labels = np.asarray(labels)
+        # (n, 1) columns of class indices are sparse, not one-hot
+        if labels.ndim == 2 and labels.shape[1] > 1:
+            labels = labels.argmax(axis=1)
+        labels = labels.reshape(-1).astype(np.int64)
+        if len(labels) == 0:
+            return
+        n = self.num_classes
+
+        predicted = probabilities.argmax(axis=1)
+        self.confusion += np.bincount(labels * n + predicted, minlength=n * n).reshape(n, n)
+
+        # A label is in the top k when fewer than k classes score strictly higher
+        label_probability = probabilities[np.arange(len(labels)), labels]
+        rank = (probabilities > label_probability[:, None]).sum(axis=1)
+        for i, k in enumerate(self.top_k):
+            self.top_k_correct[i] += int(np.count_nonzero(rank < k))
+
+        confidence = probabilities[np.arange(len(labels)), predicted]
+        bins = np.minimum((confidence * self.calibration_bins).astype(np.int64), self.calibration_bins - 1)
+        correct = (predicted == labels).astype(np.float64)
+        self.bin_counts += np.bincount(bins, minlength=self.calibration_bins)
+        self.bin_confidence += np.bincount(bins, weights=confidence, minlength=self.calibration_bins)
+        self.bin_correct += np.bincount(bins, weights=correct, minlength=self.calibration_bins)
+
+        self.log_loss_sum += float(-np.log(np.clip(label_probability, 1e-12, 1.0)).sum())
+        self.samples += len(labels)
+
+    def result(self):
+        """All metrics as a JSON-serializable dict"""
+        if self.samples == 0:
+            raise ValueError("No samples have been evaluated")
+        confusion = self.confusion.astype(np.float64)
+        true_positives = np.diag(confusion)
+        support = confusion.sum(axis=1)
+        predicted_counts = confusion.sum(axis=0)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            precision = np.where(predicted_counts > 0, true_positives / predicted_counts, 0.0)
+            recall = np.where(support > 0, true_positives / support, 0.0)
+            f1 = np.where(precision + recall > 0, 2 * precision * recall / (precision + recall), 0.0)
+            bin_accuracy = np.where(self.bin_counts > 0, self.bin_correct / self.bin_counts, 0.0)
+            bin_confidence = np.where(self.bin_counts > 0, self.bin_confidence / self.bin_counts, 0.0)
+
+        gaps = np.abs(bin_accuracy - bin_confidence)
+        weights = support / self.samples
+        return {
+            'samples': int(self.samples),
+            'accuracy': float(true_positives.sum() / self.samples),
+            'log_loss': self.log_loss_sum / self.samples,
+            'top_k_accuracy': {str(k): float(c / self.samples) for k, c in zip(self.top_k, self.top_k_correct)},
+            'macro_avg': {'precision': float(precision.mean()), 'recall': float(recall.mean()), 'f1': float(f1.mean())},
+            'weighted_avg': {'precision': float(precision @ weights), 'recall': float(recall @ weights),
+                             'f1': float(f1 @ weights)},
+            'per_class': {
+                name: {'precision': float(precision[i]), 'recall': float(recall[i]), 'f1': float(f1[i]),
+                       'support': int(support[i])}
+                for i, name in enumerate(self.class_names)
+            },
+            'calibration': {
+                'ece': float((self.bin_counts / self.samples) @ gaps),
+                'max_calibration_error': float(gaps[self.bin_counts > 0].max()),
+                'bins': [
+                    {'upper': (i + 1) / self.calibration_bins, 'count': int(self.bin_counts[i]),
+                     'accuracy': float(bin_accuracy[i]), 'confidence': float(bin_confidence[i])}
+                    for i in range(self.calibration_bins)
+                ]
+            },
+            'class_names': self.class_names,
+            'confusion_matrix': self.confusion.tolist()
+        }
+
+    def write_json(self, path, extra=None):
+        """Write result() (plus any extra fields) to path and return it"""
+        result = self.result()
+        if extra:
+            result.update(extra)
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(result, f, indent=2)
+        os.replace(tmp_path, path)
+        return result
+
+    def summary(self):
+        """Short human-readable report"""
+        result = self.result()
+        lines = [
+            f"Samples: {result['samples']}",
+            f"Accuracy: {result['accuracy']:.4f}  Log loss: {result['log_loss']:.4f}  "
+            f"ECE: {result['calibration']['ece']:.4f}",
+            "Top-k accuracy: " + ", ".join(f"top-{k} {v:.4f}" for k, v in result['top_k_accuracy'].items()),
+            f"Macro F1: {result['macro_avg']['f1']:.4f}  Weighted F1: {result['weighted_avg']['f1']:.4f}",
+            f"{'class':>12s} {'precision':>9s} {'recall':>7s} {'f1':>7s} {'support':>8s}"
+        ]
+        for name, metrics in result['per_class'].items():
+            lines.append(f"{name:>12s} {metrics['precision']:9.4f} {metrics['recall']:7.4f} "
+                         f"{metrics['f1']:7.4f} {metrics['support']:8d}")
+        return '\n'.join(lines)
+
+def iterate_batches(data, labels=None, batch_size=256):
+    """Yield (inputs, labels) numpy batches from arrays or a batched tf.data.Dataset"""
+    if labels is not None:
+        for start in range(0, len(data), batch_size):
+            yield data[start:start + batch_size], labels[start:start + batch_size]
+        return
+    batches = data.as_numpy_iterator() if hasattr(data, 'as_numpy_iterator') else data
+    for inputs, batch_labels in batches:
+        yield inputs, batch_labels
+
+def evaluate_model(model, data, labels=None, batch_size=256, class_names=None, top_k=(1, 5),
+                   calibration_bins=15, evaluator=None):
+    """Run batched prediction over data and return the filled StreamingEvaluator
+
+    data is an array of model-ready images with labels, or a batched
+    dataset/iterable of (images, labels) such as DataPreprocessor.make_dataset
+    output. Only one batch of predictions is held at a time.
+    """
+    if evaluator is None:
+        num_classes = int(model.output_shape[-1])
+        evaluator = StreamingEvaluator(num_classes, class_names, top_k, calibration_bins)
+    for inputs, batch_labels in iterate_batches(data, labels, batch_size):
+        evaluator.update(model.predict_on_batch(inputs), batch_labels)
+    return evaluator
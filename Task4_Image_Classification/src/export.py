@@ -0,0 +1,291 @@
+"""Export a trained CNNClassifier model for CPU inference.
+
+The export pipeline:
+
+1. Rebuilds the model as an inference-only float32 graph: Dropout layers are
+   dropped, and BatchNormalization is frozen with its moving statistics.
+   A BatchNormalization followed by a Dense layer is folded into that Dense
+   layer's weights, which is exact. One followed by a padded Conv2D is kept,
+   because folding it would change the zero padding at the borders.
+2. Converts the graph to TFLite as float16 and/or int8. Int8 calibration uses
+   a representative sample of training images from DataPreprocessor.
+3. Writes export_report.json comparing every artifact with the original
+   float32 Keras model on accuracy, single-image latency and file size.
+
+    python src/export.py ../data/models/best_cnn_model.h5 --output-dir ../data/models/export --formats float16 int8
+
+TFLiteModel wraps an exported .tflite file with the parts of the Keras model
+interface ImageClassifierService uses, so serve.py can serve it directly
+(CNN_MODEL_PATH=.../cnn_int8.tflite).
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import tensorflow as tf
+import keras
+
+from data_preprocessing import DataPreprocessor
+from dataset_shards import load_index, open_shards
+
+EXPORT_FORMATS = ('float32', 'float16', 'int8')
+
+def _float32_config(layer):
+    config = layer.get_config()
+    # Mixed precision models are exported as plain float32 graphs
+    config['dtype'] = 'float32'
+    return config
+
+def _batchnorm_affine(layer):
+    """Per-channel (scale, offset) that a frozen BatchNormalization applies"""
+    gamma = layer.gamma.numpy() if layer.scale else 1.0
+    beta = layer.beta.numpy() if layer.center else 0.0
+    scale = gamma / np.sqrt(layer.moving_variance.numpy() + layer.epsilon)
+    offset = beta - layer.moving_mean.numpy() * scale
+    return scale.astype(np.float32), offset.astype(np.float32)
+
+def build_inference_model(model):
+    """Float32 copy of a Sequential model without Dropout and with BatchNorm folded where exact
+
+    Returns (inference_model, summary) where summary counts the removed
+    and folded layers.
+    """
+    layers = [layer for layer in model.layers if not isinstance(layer, keras.layers.Dropout)]
+    summary = {'dropout_removed': len(model.layers) - len(layers), 'batchnorm_folded': 0, 'batchnorm_frozen': 0}
+
+    inference_model = keras.Sequential([keras.Input(shape=model.input_shape[1:])])
+    weights = []
+    i = 0
+    while i < len(layers):
+        layer = layers[i]
+        following = layers[i + 1] if i + 1 < len(layers) else None
+        if (isinstance(layer, keras.layers.BatchNormalization) and isinstance(following, keras.layers.Dense)
+                and len(layer.input.shape) == 2):
+            # Dense(a * x + c) == x @ (a[:, None] * W) + (c @ W + b)
+            scale, offset = _batchnorm_affine(layer)
+            kernel, *bias = [w.numpy() for w in following.weights]
+            bias = bias[0] if bias else np.zeros(kernel.shape[1], dtype=np.float32)
+            config = _float32_config(following)
+            config['use_bias'] = True
+            inference_model.add(keras.layers.Dense.from_config(config))
+            weights.append([scale[:, None] * kernel, offset @ kernel + bias])
+            summary['batchnorm_folded'] += 1
+            i += 2
+            continue
+
+        inference_model.add(layer.__class__.from_config(_float32_config(layer)))
+        weights.append([w.numpy() for w in layer.weights])
+        if isinstance(layer, keras.layers.BatchNormalization):
+            summary['batchnorm_frozen'] += 1
+        i += 1
+
+    for new_layer, layer_weights in zip(inference_model.layers, weights):
+        new_layer.set_weights(layer_weights)
+        # BatchNormalization only ever uses its moving statistics from here on
+        new_layer.trainable = False
+    return inference_model, summary
+
+def convert_to_tflite(model, export_format, representative_images=None):
+    """Serialized TFLite flatbuffer of model in export_format ('float32', 'float16' or 'int8')"""
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Export format must be one of {EXPORT_FORMATS}, not {export_format!r}")
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    if export_format == 'float16':
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.target_spec.supported_types = [tf.float16]
+    elif export_format == 'int8':
+        if representative_images is None:
+            raise ValueError("int8 export requires representative images for calibration")
+
+        def representative_dataset():
+            for image in representative_images:
+                yield [image[None].astype(np.float32) / 255.0]
+
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.representative_dataset = representative_dataset
+        # Full integer kernels; float input/output keeps the serving code unchanged
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+    return converter.convert()
+
+class TFLiteModel:
+    """Runs a .tflite model with the predict_on_batch interface of a Keras model
+
+    TFLite interpreters have a fixed input shape, so one interpreter is kept
+    per batch size; ImageBatcher pads batches to a few sizes, so this stays
+    small. Interpreters are not thread-safe; call from one thread at a time.
+    """
+
+    def __init__(self, model_path, num_threads=None):
+        self.model_path = model_path
+        self.num_threads = num_threads or os.cpu_count()
+        self._interpreters = {}
+        interpreter = self._interpreter(1)
+        input_details = interpreter.get_input_details()[0]
+        output_details = interpreter.get_output_details()[0]
+        self.input_shape = (None,) + tuple(int(d) for d in input_details['shape'][1:])
+        self.output_shape = (None,) + tuple(int(d) for d in output_details['shape'][1:])
+
+    def _interpreter(self, batch_size):
+        interpreter = self._interpreters.get(batch_size)
+        if interpreter is None:
+            interpreter = tf.lite.Interpreter(model_path=self.model_path, num_threads=self.num_threads)
+            input_details = interpreter.get_input_details()[0]
+            if input_details['shape'][0] != batch_size:
+                shape = [batch_size] + list(input_details['shape'][1:])
+                interpreter.resize_tensor_input(input_details['index'], shape)
+            interpreter.allocate_tensors()
+            self._interpreters[batch_size] = interpreter
+        return interpreter
+
+    def predict_on_batch(self, inputs):
+        interpreter = self._interpreter(len(inputs))
+        input_details = interpreter.get_input_details()[0]
+        output_details = interpreter.get_output_details()[0]
+        interpreter.set_tensor(input_details['index'], np.asarray(inputs, dtype=input_details['dtype']))
+        interpreter.invoke()
+        return interpreter.get_tensor(output_details['index'])
+
+def load_model_for_inference(model_path):
+    """Keras model (without optimizer state) or TFLiteModel, by file extension"""
+    if model_path.endswith('.tflite'):
+        return TFLiteModel(model_path)
+    return keras.models.load_model(model_path, compile=False)
+
+def _sample_shards(shards, count, rng):
+    """Read count random (images, labels) rows from memory-mapped shards, in index order"""
+    sizes = np.array([len(labels) for _, labels in shards])
+    offsets = np.concatenate([[0], np.cumsum(sizes)])
+    indices = np.sort(rng.choice(offsets[-1], min(count, offsets[-1]), replace=False))
+    # Only the chosen rows are read from disk, never whole shards
+    shard_ids = np.searchsorted(offsets, indices, side='right') - 1
+    images, labels = [], []
+    for shard_id in np.unique(shard_ids):
+        shard_images, shard_labels = shards[shard_id]
+        rows = indices[shard_ids == shard_id] - offsets[shard_id]
+        images.append(np.asarray(shard_images[rows]))
+        labels.append(np.asarray(shard_labels[rows]))
+    return np.concatenate(images), np.concatenate(labels)
+
+def load_export_data(preprocessor, shard_dir=None, calibration_samples=200, eval_samples=2000, seed=42):
+    """(calibration uint8 images, eval uint8 images, eval sparse labels)
+
+    Calibration images come from the training split and evaluation images
+    from the test split (CIFAR-10) or the validation split (shards; the
+    training split when the shards have no validation split).
+    """
+    rng = np.random.RandomState(seed)
+    if shard_dir:
+        calibration, _ = _sample_shards(open_shards(shard_dir, 'train'), calibration_samples, rng)
+        eval_split = 'validation' if 'validation' in load_index(shard_dir)['splits'] else 'train'
+        if eval_split == 'train':
+            print("No validation split in the shards; evaluating on training images")
+        eval_images, eval_labels = _sample_shards(open_shards(shard_dir, eval_split), eval_samples, rng)
+        return calibration, eval_images, eval_labels
+
+    (train_images, _), (eval_images, eval_labels) = preprocessor.load_raw_data()
+    calibration = train_images[np.sort(rng.choice(len(train_images), min(calibration_samples, len(train_images)), replace=False))]
+    eval_index = np.sort(rng.choice(len(eval_images), min(eval_samples, len(eval_images)), replace=False))
+    return np.asarray(calibration), np.asarray(eval_images[eval_index]), np.asarray(eval_labels[eval_index])
+
+def benchmark_model(model, images, labels, latency_samples=200, batch_size=64):
+    """Accuracy over images/labels and single-image latency percentiles in ms"""
+    predictions = []
+    for start in range(0, len(images), batch_size):
+        batch = images[start:start + batch_size].astype(np.float32) / 255.0
+        predictions.append(np.argmax(model.predict_on_batch(batch), axis=1))
+    accuracy = float(np.mean(np.concatenate(predictions) == labels))
+
+    timings = []
+    for image in images[:latency_samples]:
+        single = image[None].astype(np.float32) / 255.0
+        start = time.perf_counter()
+        model.predict_on_batch(single)
+        timings.append(time.perf_counter() - start)
+    # Drop the first call, which includes tracing/allocation
+    timings = np.array(timings[1:] or timings) * 1000
+    return {
+        'accuracy': accuracy,
+        'latency_ms': {
+            'p50': float(np.percentile(timings, 50)),
+            'p95': float(np.percentile(timings, 95)),
+            'mean': float(timings.mean())
+        }
+    }
+
+def export_model(model_path, output_dir, formats=('float16', 'int8'), shard_dir=None,
+                 calibration_samples=200, eval_samples=2000, latency_samples=200):
+    """Run the export pipeline and return the report (also written to export_report.json)"""
+    for export_format in formats:
+        if export_format not in EXPORT_FORMATS:
+            raise ValueError(f"Export format must be one of {EXPORT_FORMATS}, not {export_format!r}")
+    os.makedirs(output_dir, exist_ok=True)
+    preprocessor = DataPreprocessor()
+
+    print(f"Loading model from: {model_path}")
+    model = keras.models.load_model(model_path, compile=False)
+    calibration, eval_images, eval_labels = load_export_data(
+        preprocessor, shard_dir, calibration_samples, eval_samples
+    )
+
+    inference_model, summary = build_inference_model(model)
+    # Folding is exact up to float rounding; a large difference means a bug
+    sample = eval_images[:256].astype(np.float32) / 255.0
+    max_difference = float(np.max(np.abs(
+        model.predict_on_batch(sample).astype(np.float32) - inference_model.predict_on_batch(sample)
+    )))
+    print(f"Inference graph: {summary}, max output difference {max_difference:.2e}")
+
+    report = {
+        'source_model': os.path.abspath(model_path),
+        'eval_samples': int(len(eval_labels)),
+        'calibration_samples': int(len(calibration)),
+        'inference_graph': dict(summary, max_output_difference=max_difference),
+        'artifacts': {}
+    }
+
+    baseline = benchmark_model(model, eval_images, eval_labels, latency_samples)
+    report['artifacts']['keras_float32'] = dict(
+        baseline, path=os.path.abspath(model_path), size_bytes=os.path.getsize(model_path)
+    )
+
+    for export_format in formats:
+        print(f"Converting to TFLite ({export_format})...")
+        flatbuffer = convert_to_tflite(inference_model, export_format, calibration)
+        path = os.path.join(output_dir, f'cnn_{export_format}.tflite')
+        with open(path, 'wb') as f:
+            f.write(flatbuffer)
+        results = benchmark_model(TFLiteModel(path), eval_images, eval_labels, latency_samples)
+        report['artifacts'][f'tflite_{export_format}'] = dict(results, path=os.path.abspath(path), size_bytes=len(flatbuffer))
+
+    for name, artifact in report['artifacts'].items():
+        artifact['accuracy_change'] = artifact['accuracy'] - baseline['accuracy']
+        artifact['size_ratio'] = artifact['size_bytes'] / report['artifacts']['keras_float32']['size_bytes']
+        artifact['latency_speedup'] = baseline['latency_ms']['p50'] / artifact['latency_ms']['p50']
+
+    with open(os.path.join(output_dir, 'export_report.json'), 'w') as f:
+        json.dump(report, f, indent=2)
+
+    print(f"\n{'artifact':16s} {'accuracy':>9s} {'change':>8s} {'p50 ms':>8s} {'speedup':>8s} {'size MB':>8s} {'ratio':>6s}")
+    for name, artifact in report['artifacts'].items():
+        print(f"{name:16s} {artifact['accuracy']:9.4f} {artifact['accuracy_change']:+8.4f} "
+              f"{artifact['latency_ms']['p50']:8.3f} {artifact['latency_speedup']:7.2f}x "
+              f"{artifact['size_bytes'] / 1e6:8.2f} {artifact['size_ratio']:6.2f}")
+    print(f"\nExport report written to: {os.path.join(output_dir, 'export_report.json')}")
+    return report
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('model_path', help='trained Keras model (.h5 or .keras)')
+    parser.add_argument('--output-dir', default='../data/models/export')
+    parser.add_argument('--formats', nargs='+', choices=EXPORT_FORMATS, default=['float16', 'int8'])
+    parser.add_argument('--shard-dir', help='take calibration/eval images from dataset_shards.py output instead of CIFAR-10')
+    parser.add_argument('--calibration-samples', type=int, default=200, help='training images used for int8 calibration')
+    parser.add_argument('--eval-samples', type=int, default=2000, help='held-out images used for the accuracy comparison')
+    parser.add_argument('--latency-samples', type=int, default=200, help='single-image inferences timed per artifact')
+    args = parser.parse_args()
+
+    export_model(args.model_path, args.output_dir, args.formats, args.shard_dir,
+                 args.calibration_samples, args.eval_samples, args.latency_samples)
@@ -0,0 +1,216 @@
+"""Batched inference for a trained CNNClassifier model.
+
+ImageClassifierService loads a saved Keras or TFLite model once, decodes
+and resizes uploaded images on a thread pool, and runs them through an
+ImageBatcher that groups images from concurrent requests into one forward
+pass. serve.py puts an HTTP endpoint in front of it.
+"""
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+import io
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+from dataset_shards import load_image
+
+# Shared batching queue lives in the repository's common/ directory
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'common'))
+from batch_queue import BatchQueue
+
+class ImageBatcher(BatchQueue):
+    """Groups images from concurrent requests into one forward pass
+
+    The queue, deadline and failure handling are the sentiment backend's
+    MicroBatcher's (see common/batch_queue.py). Batches are padded up to a
+    power of two so the model only ever sees a handful of input shapes and
+    is not retraced for every batch size. Given image_shape, submit() rejects
+    images of any other shape; a batch that still fails to stack or predict
+    fails only its own futures.
+    """
+
+    def __init__(self, predict_batch, max_batch_size=64, max_wait_ms=5.0, image_shape=None):
+        # predict_batch(uint8 images of shape (n, h, w, c)) -> (n, num_classes) probabilities
+        self.predict_batch = predict_batch
+        self.image_shape = tuple(image_shape) if image_shape is not None else None
+        self._lock = threading.Lock()
+        # Optional batch_observer(n) hook, called with each batch's real size
+        self.batch_observer = None
+        self.batches = 0
+        self.images = 0
+        self.padded_images = 0
+
+        self.batch_sizes = []
+        size = 1
+        while size < max_batch_size:
+            self.batch_sizes.append(size)
+            size *= 2
+        self.batch_sizes.append(max_batch_size)
+
+        super().__init__(max_batch_size, max_wait_ms, name='image-batcher')
+
+    def submit(self, image):
+        """Queue one decoded uint8 image and return a Future for its probabilities"""
+        image = np.asarray(image)
+        if image.dtype != np.uint8:
+            raise ValueError(f"Expected a uint8 image, got {image.dtype}")
+        if self.image_shape is not None and image.shape != self.image_shape:
+            raise ValueError(f"Expected an image of shape {self.image_shape}, got {image.shape}")
+        return self._put(image)
+
+    def padded_size(self, n):
+        """Smallest batch shape that holds n images"""
+        for size in self.batch_sizes:
+            if n <= size:
+                return size
+        return n
+
+    def process_batch(self, images, futures):
+        self.resolve(futures, lambda: self._predict_padded(images))
+
+    def _predict_padded(self, images):
+        size = self.padded_size(len(images))
+        batch = np.zeros((size,) + images[0].shape, dtype=np.uint8)
+        for i, image in enumerate(images):
+            batch[i] = image
+        with self._lock:
+            self.batches += 1
+            self.images += len(images)
+            self.padded_images += size - len(images)
+        if self.batch_observer is not None:
+            self.batch_observer(len(images))
+
+        probabilities = self.predict_batch(batch)
+        if len(probabilities) != size:
+            raise RuntimeError(f"predict_batch returned {len(probabilities)} rows for a batch of {size}")
+        return probabilities[:len(images)]
+
+    def stats(self):
+        """Return queue depth and batch counters"""
+        with self._lock:
+            return {
+                'queue_depth': self.queue_depth(),
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': self.max_wait * 1000.0,
+                'batches': self.batches,
+                'images': self.images,
+                'padded_images': self.padded_images,
+                'mean_batch_size': self.images / self.batches if self.batches else 0.0
+            }
+
+class ImageClassifierService:
+    """Loads a saved model once and classifies uploaded images in micro-batches"""
+
+    def __init__(self, model_path, class_names=None, decode_workers=None, max_batch_size=64,
+                 max_wait_ms=5.0, warmup=True, result_timeout=30.0):
+        from data_preprocessing import DataPreprocessor
+        from export import load_model_for_inference
+
+        print(f"Loading model from: {model_path}")
+        self.model_path = model_path
+        # A Keras model file, or a .tflite artifact written by export.py
+        self.model = load_model_for_inference(model_path)
+        self.image_shape = tuple(self.model.input_shape[1:])
+        self.num_classes = self.model.output_shape[-1]
+
+        self.class_names = list(class_names or DataPreprocessor().class_names)
+        if len(self.class_names) != self.num_classes:
+            raise ValueError(f"Model predicts {self.num_classes} classes but {len(self.class_names)} class names were given")
+
+        # Pillow releases the GIL while decoding and resizing, so threads scale
+        self.decode_pool = ThreadPoolExecutor(max_workers=decode_workers or os.cpu_count() or 1,
+                                              thread_name_prefix='image-decode')
+        self.stage_observer = None
+        # Seconds a request waits for its batch before giving up
+        self.result_timeout = result_timeout
+        self.batcher = ImageBatcher(self._predict_batch, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms,
+                                    image_shape=self.image_shape)
+
+        if warmup:
+            # Trace every padded batch shape now instead of on the first requests
+            for size in self.batcher.batch_sizes:
+                self._predict_batch(np.zeros((size,) + self.image_shape, dtype=np.uint8))
+
+    def _timed(self, stage, func, *args):
+        if self.stage_observer is None:
+            return func(*args)
+        start = time.perf_counter()
+        result = func(*args)
+        self.stage_observer(stage, time.perf_counter() - start)
+        return result
+
+    def _predict_batch(self, images):
+        # Same 0-1 scaling as DataPreprocessor._normalize
+        inputs = images.astype(np.float32) / 255.0
+        return np.asarray(self._timed('model', self.model.predict_on_batch, inputs), dtype=np.float32)
+
+    def decode(self, data):
+        """Decode encoded image bytes into a resized uint8 array"""
+        image = load_image(io.BytesIO(data), self.image_shape[:2])
+        if self.image_shape[-1] == 1:
+            # load_image always returns RGB; single-channel models get luma
+            image = np.round(image @ np.array([0.299, 0.587, 0.114]))[..., None].astype(np.uint8)
+        return image
+
+    def top_k(self, probabilities, k=5):
+        """Top-k classes for one probability vector, most likely first"""
+        k = max(1, min(k, self.num_classes))
+        indices = np.argpartition(-probabilities, k - 1)[:k]
+        indices = indices[np.argsort(-probabilities[indices], kind='stable')]
+        return [
+            {'class': self.class_names[i], 'index': int(i), 'probability': float(probabilities[i])}
+            for i in indices
+        ]
+
+    def classify(self, images, k=5):
+        """Classify a list of encoded images; returns one top-k list per image
+
+        Raises ValueError naming the first image that could not be decoded.
+        """
+        start = time.perf_counter()
+        decoded = list(self.decode_pool.map(self._decode_or_error, images))
+        if self.stage_observer is not None:
+            self.stage_observer('decode', time.perf_counter() - start)
+        for i, image in enumerate(decoded):
+            if isinstance(image, Exception):
+                raise ValueError(f"Image {i} could not be decoded: {image}")
+        return self.classify_arrays(decoded, k)
+
+    def classify_arrays(self, images, k=5):
+        """Classify already decoded uint8 images of the model's input shape
+
+        Raises ValueError for an image of the wrong shape or dtype and
+        TimeoutError when results take longer than result_timeout.
+        """
+        futures = [self.batcher.submit(image) for image in images]
+        deadline = time.monotonic() + self.result_timeout if self.result_timeout else None
+        results = []
+        for future in futures:
+            try:
+                timeout = max(0.0, deadline - time.monotonic()) if deadline is not None else None
+                probabilities = future.result(timeout)
+            except FutureTimeoutError:
+                raise TimeoutError(f"Inference did not finish within {self.result_timeout:g}s")
+            results.append(self.top_k(probabilities, k))
+        return results
+
+    def _decode_or_error(self, data):
+        try:
+            return self.decode(data)
+        except Exception as e:
+            return e
+
+    def info(self):
+        return {
+            'model_path': self.model_path,
+            'image_shape': list(self.image_shape),
+            'num_classes': self.num_classes,
+            'class_names': self.class_names,
+            'batching': self.batcher.stats()
+        }
+
+    def close(self):
+        self.batcher.close()
+        self.decode_pool.shutdown(wait=True)
@@ -1,5 +1,36 @@
 import tensorflow as tf
 import keras
+import os
+
+# CPU flags (from /proc/cpuinfo) for native bfloat16 matmul/conv support
+BF16_CPU_FLAGS = ('avx512_bf16', 'amx_bf16')
+
+def bfloat16_supported():
+    """Whether the CPU runs bfloat16 math natively (AVX512-BF16 or AMX)"""
+    if not os.path.exists('/proc/cpuinfo'):
+        return False
+    with open('/proc/cpuinfo') as f:
+        for line in f:
+            if line.startswith('flags'):
+                flags = line.split(':', 1)[1].split()
+                return any(flag in flags for flag in BF16_CPU_FLAGS)
+    return False
+
+def configure_threading(intra_op_threads=None, inter_op_threads=None):
+    """Size TensorFlow's intra-op and inter-op thread pools (None keeps TF's default)
+
+    Must run before TensorFlow executes its first op; later calls are
+    reported and ignored instead of failing the run.
+    """
+    try:
+        if intra_op_threads:
+            tf.config.threading.set_intra_op_parallelism_threads(intra_op_threads)
+        if inter_op_threads:
+            tf.config.threading.set_inter_op_parallelism_threads(inter_op_threads)
+    except RuntimeError as e:
+        print(f"Could not set thread pool sizes (TensorFlow already initialized): {e}")
+    return (tf.config.threading.get_intra_op_parallelism_threads(),
+            tf.config.threading.get_inter_op_parallelism_threads())
 
 
 class CNNClassifier:
@@ -7,9 +38,34 @@ class CNNClassifier:
         self.input_shape = input_shape
         self.num_classes = num_classes
         self.model = None
+        self.precision = 'float32'
+    
+    def build_model(self, mixed_precision=False):
+        """Build CNN architecture optimized for CIFAR-10
+        
+        mixed_precision=True builds the layers under the mixed_bfloat16
+        policy (bfloat16 compute, float32 weights) when the hardware supports
+        bfloat16, and falls back to float32 otherwise. The softmax output
+        layer always runs in float32.
+        """
+        if mixed_precision and not bfloat16_supported():
+            print("This CPU has no native bfloat16 support; building a float32 model")
+            mixed_precision = False
+        self.precision = 'mixed_bfloat16' if mixed_precision else 'float32'
+        
+        # Layers capture the global policy when they are created, so only
+        # this model is affected once the previous policy is restored
+        previous_policy = keras.mixed_precision.global_policy()
+        keras.mixed_precision.set_global_policy(self.precision)
+        try:
+            model = self._build_layers()
+        finally:
+            keras.mixed_precision.set_global_policy(previous_policy)
+        
+        self.model = model
+        return model
     
-    def build_model(self):
-        """Build CNN architecture optimized for CIFAR-10"""
+    def _build_layers(self):
         model = keras.models.Sequential([
             # First Convolutional Block
             keras.layers.Conv2D(32, (3, 3), activation='relu', padding='same', 
@@ -38,14 +94,17 @@ class CNNClassifier:
             keras.layers.Dense(512, activation='relu'),
             keras.layers.BatchNormalization(),
             keras.layers.Dropout(0.5),
-            keras.layers.Dense(self.num_classes, activation='softmax')
+            # float32 output keeps the softmax and the loss numerically stable
+            # under mixed precision
+            keras.layers.Dense(self.num_classes, activation='softmax', dtype='float32')
         ])
-        
-        self.model = model
         return model
     
-    def compile_model(self, learning_rate=0.001):
-        """Compile the model with optimizer and loss function"""
+    def compile_model(self, learning_rate=0.001, sparse_labels=False, jit_compile=False):
+        """Compile the model with optimizer and loss function
+        
+        jit_compile=True compiles the train and predict steps with XLA.
+        """
         if self.model is None:
             raise ValueError("Model not built yet. Call build_model() first.")
         
@@ -54,11 +113,13 @@ class CNNClassifier:
         
         self.model.compile( # pyright: ignore[reportFunctionMemberAccess]
             optimizer=optimizer, # pyright: ignore[reportArgumentType]
-            loss='categorical_crossentropy',
-            metrics=['accuracy']
+            # Sparse labels are class indices, as produced by the tf.data input mode
+            loss='sparse_categorical_crossentropy' if sparse_labels else 'categorical_crossentropy',
+            metrics=['accuracy'],
+            jit_compile=jit_compile
         )
         
-        print("Model compiled successfully!")
+        print(f"Model compiled successfully! (precision: {self.precision}, XLA: {jit_compile})")
     
     def model_summary(self):
         """Display model architecture summary"""
@@ -75,8 +136,12 @@ class CNNClassifier:
         self.model.save(filepath) # pyright: ignore[reportFunctionMemberAccess]
         print(f"Model saved to: {filepath}")
     
-    def load_model(self, filepath):
-        """Load a pre-trained model"""
-        self.model = keras.models.load_model(filepath)
+    def load_model(self, filepath, compile=True):
+        """Load a pre-trained model
+        
+        compile=False skips restoring the optimizer and loss, which is all
+        inference needs (see export.py for CPU-optimized artifacts).
+        """
+        self.model = keras.models.load_model(filepath, compile=compile)
         print(f"Model loaded from: {filepath}")
         return self.model
@@ -1,36 +1,69 @@
+import json
 import tensorflow as tf
 import keras
-import matplotlib.pyplot as plt
 import os
+import shutil
 from data_preprocessing import DataPreprocessor
-from model import CNNClassifier
+from model import CNNClassifier, configure_threading
+from checkpointing import TrainingCheckpoint
+from distributed import create_strategy, is_chief
+from evaluation import evaluate_model
+from artifacts import BackgroundModelCheckpoint, ThroughputLogger, output_figure
+
+# Task 4's data/models directory, wherever the trainer is run from
+DEFAULT_MODEL_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'models'))
 
 class Trainer:
-    def __init__(self):
+    def __init__(self, model_dir=None, writer=None, show_plots=True):
         self.preprocessor = DataPreprocessor()
         self.classifier = CNNClassifier()
         self.history = None
+        self.evaluator = None
+        self.validation_data = None
+        self.model_dir = model_dir or os.environ.get('CNN_MODEL_DIR') or DEFAULT_MODEL_DIR
+        # With an ArtifactWriter (see artifacts.py) checkpoints, logs and plots
+        # are written in the background; show_plots=False never opens a window
+        self.writer = writer
+        self.show_plots = show_plots
     
-    def setup_callbacks(self):
-        """Setup training callbacks for better training"""
+    def setup_callbacks(self, validation=True):
+        """Setup training callbacks for better training
+        
+        Without validation data the callbacks watch the training metrics
+        instead, so best_cnn_model.h5 is still written.
+        """
+        prefix = 'val_' if validation else ''
+        # Under multi-worker training only the chief keeps the best model
+        best_model_dir = self.model_dir if is_chief() else os.path.join(self.model_dir, f'.worker-{os.getpid()}')
         # Create models directory if it doesn't exist
-        os.makedirs('../data/models', exist_ok=True)
+        os.makedirs(best_model_dir, exist_ok=True)
+        self.best_model_path = os.path.join(best_model_dir, 'best_cnn_model.h5')
+        
+        if self.writer is not None and is_chief():
+            # Only the weight snapshot happens between epochs; the writer saves the file
+            best_model_checkpoint = BackgroundModelCheckpoint(
+                self.best_model_path, self.writer, monitor=prefix + 'accuracy'
+            )
+        else:
+            # Without a writer, and on non-chief workers whose scratch copy is
+            # deleted right after fit, the save stays synchronous
+            best_model_checkpoint = keras.callbacks.ModelCheckpoint(
+                self.best_model_path,
+                monitor=prefix + 'accuracy',
+                save_best_only=True,
+                verbose=1
+            )
         
         callbacks = [
             keras.callbacks.EarlyStopping(
-                monitor='val_accuracy',
+                monitor=prefix + 'accuracy',
                 patience=10,
                 restore_best_weights=True,
                 verbose=1
             ),
-            keras.callbacks.ModelCheckpoint(
-                '../data/models/best_cnn_model.h5',
-                monitor='val_accuracy',
-                save_best_only=True,
-                verbose=1
-            ),
+            best_model_checkpoint,
             keras.callbacks.ReduceLROnPlateau(
-                monitor='val_loss',
+                monitor=prefix + 'loss',
                 factor=0.2,
                 patience=5,
                 min_lr=1e-7,
@@ -39,80 +72,235 @@ class Trainer:
         ]
         return callbacks
     
-    def train_model(self, epochs=30, batch_size=32):
-        """Train the CNN model"""
+    def train_model(self, epochs=30, batch_size=32, input_mode='numpy', augment=False,
+                    shuffle_buffer=10000, cache=False, shard_dir=None, mixed_precision=False,
+                    jit_compile=False, intra_op_threads=None, inter_op_threads=None, resume=False,
+                    distribute=None):
+        """Train the CNN model
+        
+        input_mode='numpy' feeds float32 arrays with one-hot labels straight
+        into fit; input_mode='tfdata' streams uint8 images and sparse labels
+        through a tf.data pipeline (see DataPreprocessor.make_dataset);
+        input_mode='shards' streams the same way from memory-mapped shards
+        in shard_dir written by dataset_shards.py, with the model's input
+        shape and class count taken from the shard index.
+        
+        mixed_precision, jit_compile and the thread pool sizes form the
+        opt-in performance mode (see CNNClassifier.build_model/compile_model
+        and configure_threading); the thread pools can only be sized before
+        TensorFlow runs its first op.
+        
+        Full training state is checkpointed to model_dir/checkpoints after
+        every epoch; resume=True continues from the latest checkpoint with
+        its optimizer, learning rate and callback state (see checkpointing.py).
+        distribute=None trains data-parallel with MultiWorkerMirroredStrategy
+        when TF_CONFIG describes several workers (see distributed.py);
+        batch_size is per worker.
+        
+        The chief appends per-epoch throughput and step timings to
+        model_dir/training_log.jsonl and keeps model_dir/history.json current.
+        """
+        if input_mode not in ('numpy', 'tfdata', 'shards'):
+            raise ValueError(f"input_mode must be 'numpy', 'tfdata' or 'shards', not {input_mode!r}")
+        if input_mode == 'shards' and not shard_dir:
+            raise ValueError("input_mode='shards' requires shard_dir")
+        sparse_labels = input_mode != 'numpy'
+        
         print("=== Starting CNN Training Process ===")
+        if intra_op_threads or inter_op_threads:
+            intra, inter = configure_threading(intra_op_threads, inter_op_threads)
+            print(f"Thread pools: intra-op {intra}, inter-op {inter} (0 = TensorFlow default)")
+        
+        # Like the thread pools, the cluster has to be set up before any op runs
+        strategy = create_strategy(distribute)
+        distributed = strategy.num_replicas_in_sync > 1
+        if distributed and input_mode == 'numpy':
+            raise ValueError("Multi-worker training needs input_mode='tfdata' or 'shards'")
+        global_batch_size = batch_size * strategy.num_replicas_in_sync
         
         # Load and preprocess data
-        (x_train, y_train), (x_test, y_test) = self.preprocessor.load_data()
+        if input_mode == 'shards':
+            # Shards are read lazily from disk; caching them in memory defeats the point
+            train_data, validation_data = self.preprocessor.load_shard_datasets(
+                shard_dir, batch_size=global_batch_size, augment=augment, shuffle_buffer=shuffle_buffer,
+                cache=cache if isinstance(cache, str) else False
+            )
+            self.classifier.input_shape = self.preprocessor.image_shape
+            self.classifier.num_classes = self.preprocessor.num_classes
+        elif input_mode == 'tfdata':
+            train_data, validation_data = self.preprocessor.load_datasets(
+                batch_size=global_batch_size, augment=augment, shuffle_buffer=shuffle_buffer, cache=cache
+            )
+        else:
+            (x_train, y_train), (x_test, y_test) = self.preprocessor.load_data()
+            validation_data = (x_test, y_test)
+        
+        if distributed:
+            # Each worker keeps its part of every global batch; the datasets are
+            # not built from files, so file-based auto-sharding can't apply
+            options = tf.data.Options()
+            options.experimental_distribute.auto_shard_policy = tf.data.experimental.AutoShardPolicy.DATA
+            train_data = train_data.with_options(options)
+            if validation_data is not None:
+                validation_data = validation_data.with_options(options)
+        
+        # Setup callbacks, with the full-state checkpoint last so it can
+        # restore the other callbacks' state after they reset themselves
+        if validation_data is None:
+            print("No validation split; checkpointing and early stopping follow the training metrics")
+        callbacks = self.setup_callbacks(validation=validation_data is not None)
+        checkpoint = TrainingCheckpoint(self.model_dir, callbacks, write_checkpoints=is_chief(), writer=self.writer)
+        callbacks.append(checkpoint)
+        if is_chief():
+            callbacks.append(ThroughputLogger(
+                os.path.join(self.model_dir, 'training_log.jsonl'), global_batch_size,
+                self.preprocessor.train_samples, self.writer,
+                run_info={'epochs': epochs, 'batch_size': batch_size, 'replicas': strategy.num_replicas_in_sync,
+                          'input_mode': input_mode, 'augment': augment, 'mixed_precision': mixed_precision,
+                          'jit_compile': jit_compile, 'resume': resume}
+            ))
+            # Runs after the checkpoint callback, whose history includes resumed epochs
+            callbacks.append(keras.callbacks.LambdaCallback(
+                on_epoch_end=lambda epoch, logs: self._save_history(checkpoint.history)
+            ))
+        self.validation_data = validation_data
         
         # Build and compile model
         print("\nBuilding CNN model...")
-        model = self.classifier.build_model()
-        self.classifier.compile_model()
+        with strategy.scope():
+            model = self.classifier.build_model(mixed_precision=mixed_precision)
+            self.classifier.compile_model(sparse_labels=sparse_labels, jit_compile=jit_compile)
+            initial_epoch = checkpoint.restore(model) if resume else 0
         
         # Display model summary
         print("\nModel Architecture:")
         self.classifier.model_summary()
         
-        # Setup callbacks
-        callbacks = self.setup_callbacks()
+        if initial_epoch >= epochs:
+            print(f"Checkpoint already covers {initial_epoch} of {epochs} epochs; nothing to train")
+            self.history = keras.callbacks.History()
+            self.history.history = checkpoint.history
+            return self.history
         
         # Train model
-        print(f"\nStarting training for {epochs} epochs with batch size {batch_size}")
-        self.history = model.fit(
-            x_train, y_train,
-            batch_size=batch_size,
-            epochs=epochs,
-            validation_data=(x_test, y_test),
-            callbacks=callbacks,
-            verbose="auto"
-        )
+        print(f"\nStarting training for {epochs} epochs with batch size {batch_size} ({input_mode} input)"
+              + (f", resuming at epoch {initial_epoch + 1}" if initial_epoch else ""))
+        if sparse_labels:
+            # Datasets are already batched, shuffled and prefetched
+            self.history = model.fit(
+                train_data,
+                epochs=epochs,
+                initial_epoch=initial_epoch,
+                validation_data=validation_data,
+                callbacks=callbacks,
+                verbose="auto"
+            )
+        else:
+            self.history = model.fit(
+                x_train, y_train,
+                batch_size=batch_size,
+                epochs=epochs,
+                initial_epoch=initial_epoch,
+                validation_data=validation_data,
+                callbacks=callbacks,
+                verbose="auto"
+            )
         
+        # Epochs from before a resume are only in the checkpoint's history
+        self.history.history = checkpoint.history
+        if not is_chief():
+            shutil.rmtree(os.path.dirname(self.best_model_path), ignore_errors=True)
         return self.history
     
-    def evaluate_model(self, x_test, y_test):
-        """Evaluate the trained model"""
+    def evaluate_model(self, x_test, y_test=None, batch_size=256, output_path=None):
+        """Evaluate the trained model
+        
+        x_test/y_test are arrays (one-hot or sparse labels), or x_test is a
+        batched dataset of (images, labels) with y_test=None. Metrics are
+        accumulated batch by batch (see evaluation.py) and written as JSON
+        to output_path, by default model_dir/evaluation.json (on the writer
+        thread when the trainer has one). Under multi-worker training only
+        the chief writes it.
+        """
         if self.classifier.model is None:
             print("No trained model found!")
             return
-            
-        test_loss, test_accuracy = self.classifier.model.evaluate(x_test, y_test, verbose="auto") # pyright: ignore[reportFunctionMemberAccess]
+        
+        self.evaluator = evaluate_model(
+            self.classifier.model, x_test, y_test, batch_size=batch_size,
+            class_names=self.preprocessor.class_names
+        )
+        output_path = output_path or os.path.join(self.model_dir, 'evaluation.json')
+        if not is_chief():
+            result = self.evaluator.result()
+        elif self.writer is not None:
+            result = self.evaluator.result()
+            self.writer.write_json(output_path, result)
+        else:
+            result = self.evaluator.write_json(output_path)
+        
+        # Log loss is the categorical cross-entropy the model is trained on
+        test_loss, test_accuracy = result['log_loss'], result['accuracy']
         print(f"\nFinal Test Results:")
         print(f"Test Loss: {test_loss:.4f}")
         print(f"Test Accuracy: {test_accuracy:.4f}")
+        print(self.evaluator.summary())
+        if is_chief():
+            print(f"Evaluation metrics saved to: {output_path}")
         
         return test_loss, test_accuracy
     
-    def plot_training_history(self):
-        """Plot training and validation metrics"""
+    def _save_history(self, history):
+        path = os.path.join(self.model_dir, 'history.json')
+        snapshot = {key: list(values) for key, values in history.items()}
+        if self.writer is not None:
+            self.writer.write_json(path, snapshot)
+        else:
+            with open(path, 'w') as f:
+                json.dump(snapshot, f, indent=2)
+    
+    def plot_training_history(self, show=None, save_path=None):
+        """Plot training and validation metrics
+        
+        The plot is saved to model_dir/training_history.png (or save_path)
+        before it is shown; show defaults to the trainer's show_plots. Under
+        multi-worker training only the chief plots.
+        """
         if self.history is None:
             print("No training history found!")
             return
+        if not is_chief():
+            return
+        
+        show = self.show_plots if show is None else show
+        history = {key: list(values) for key, values in self.history.history.items()}
+        
+        def draw(fig):
+            ax1, ax2 = fig.subplots(1, 2)
+            
+            # Plot accuracy
+            ax1.plot(history['accuracy'], label='Training Accuracy', color='blue')
+            if 'val_accuracy' in history:
+                ax1.plot(history['val_accuracy'], label='Validation Accuracy', color='red')
+            ax1.set_title('Model Accuracy Over Epochs')
+            ax1.set_xlabel('Epoch')
+            ax1.set_ylabel('Accuracy')
+            ax1.legend()
+            ax1.grid(True)
+            
+            # Plot loss
+            ax2.plot(history['loss'], label='Training Loss', color='blue')
+            if 'val_loss' in history:
+                ax2.plot(history['val_loss'], label='Validation Loss', color='red')
+            ax2.set_title('Model Loss Over Epochs')
+            ax2.set_xlabel('Epoch')
+            ax2.set_ylabel('Loss')
+            ax2.legend()
+            ax2.grid(True)
             
-        fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(12, 4))
-        
-        # Plot accuracy
-        ax1.plot(self.history.history['accuracy'], label='Training Accuracy', color='blue')
-        ax1.plot(self.history.history['val_accuracy'], label='Validation Accuracy', color='red')
-        ax1.set_title('Model Accuracy Over Epochs')
-        ax1.set_xlabel('Epoch')
-        ax1.set_ylabel('Accuracy')
-        ax1.legend()
-        ax1.grid(True)
-        
-        # Plot loss
-        ax2.plot(self.history.history['loss'], label='Training Loss', color='blue')
-        ax2.plot(self.history.history['val_loss'], label='Validation Loss', color='red')
-        ax2.set_title('Model Loss Over Epochs')
-        ax2.set_xlabel('Epoch')
-        ax2.set_ylabel('Loss')
-        ax2.legend()
-        ax2.grid(True)
-        
-        plt.tight_layout()
-        plt.show()
+            fig.tight_layout()
         
         # Save the plot
-        plt.savefig('../data/models/training_history.png', dpi=300, bbox_inches='tight')
-        print("Training history plot saved to: ../data/models/training_history.png")
+        plot_path = save_path or os.path.join(self.model_dir, 'training_history.png')
+        output_figure(draw, (12, 4), plot_path, show, self.writer)
+        print(f"Training history plot saved to: {plot_path}")
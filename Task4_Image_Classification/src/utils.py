@@ -1,23 +1,30 @@
 import numpy as np
-import matplotlib.pyplot as plt
+from artifacts import output_figure
 
-def plot_sample_predictions(model, x_test, y_test, class_names, num_samples=8):
-    """Plot sample predictions"""
-    predictions = model.predict(x_test[:num_samples])
+def to_sparse_labels(labels):
+    """Class indices from one-hot or already sparse labels"""
+    labels = np.asarray(labels)
+    if labels.ndim == 2 and labels.shape[1] > 1:
+        return labels.argmax(axis=1)
+    return labels.reshape(-1)
+
+def plot_sample_predictions(model, x_test, y_test, class_names, num_samples=8, show=True, save_path=None,
+                            writer=None):
+    """Plot sample predictions (show=False renders to save_path only, for headless runs)"""
+    images = np.array(x_test[:num_samples])
+    predicted_classes = np.argmax(model.predict_on_batch(images), axis=1)
+    true_classes = to_sparse_labels(y_test[:num_samples])
+    
+    def draw(fig):
+        for i in range(len(images)):
+            ax = fig.add_subplot(2, 4, i + 1)
+            ax.imshow(images[i])
+            ax.set_title(f'True: {class_names[true_classes[i]]}\nPred: {class_names[predicted_classes[i]]}')
+            ax.axis('off')
+        fig.tight_layout()
     
-    plt.figure(figsize=(12, 8))
-    for i in range(num_samples):
-        plt.subplot(2, 4, i + 1)
-        plt.imshow(x_test[i])
-        
-        predicted_class = np.argmax(predictions[i])
-        true_class = np.argmax(y_test[i])
-        
-        plt.title(f'True: {class_names[true_class]}\nPred: {class_names[predicted_class]}')
-        plt.axis('off')
-    plt.tight_layout()
-    plt.show()
+    output_figure(draw, (12, 8), save_path, show, writer)
 
 def calculate_accuracy(y_true, y_pred):
-    """Calculate accuracy percentage"""
-    return np.mean(np.argmax(y_true, axis=1) == np.argmax(y_pred, axis=1)) * 100
+    """Calculate accuracy percentage (labels may be one-hot or sparse)"""
+    return np.mean(to_sparse_labels(y_true) == np.argmax(y_pred, axis=1)) * 100
@@ -0,0 +1,66 @@
+"""Shard building must never index an empty validation split.
+
+Run from the project root with: python -m pytest -q tests
+"""
+import multiprocessing
+import os
+import random
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import dataset_shards
+from dataset_shards import build_shards, load_index, open_shards
+
+# The fake decoder below reaches the worker processes only through fork
+pytestmark = pytest.mark.skipif(multiprocessing.get_start_method() != 'fork',
+                                reason='needs fork-started shard workers')
+
+def fake_load_image(path, image_size):
+    if 'unreadable' in os.path.basename(path):
+        raise ValueError('cannot decode')
+    return np.full(tuple(image_size) + (3,), len(path) % 256, dtype=np.uint8)
+
+@pytest.fixture(autouse=True)
+def decoder(monkeypatch):
+    monkeypatch.setattr(dataset_shards, 'load_image', fake_load_image)
+
+def make_images(image_dir, count, unreadable=()):
+    os.makedirs(image_dir / 'cat')
+    for i in range(count):
+        name = f'{i:03d}-{"unreadable" if i in unreadable else "ok"}.png'
+        (image_dir / 'cat' / name).write_bytes(b'')
+
+@pytest.mark.parametrize('validation_split', [0.0, 0.05])
+def test_empty_validation_split_is_left_out(tmp_path, validation_split):
+    # 10 images * 0.05 rounds down to no validation rows
+    make_images(tmp_path / 'images', 10)
+    index = build_shards(str(tmp_path / 'images'), str(tmp_path / 'shards'), (4, 4),
+                         validation_split=validation_split, workers=1)
+
+    assert list(index['splits']) == ['train']
+    assert load_index(str(tmp_path / 'shards'))['splits']['train']['count'] == 10
+
+def test_unreadable_validation_split_is_left_out(tmp_path):
+    # The split takes the first 3 samples after the seeded shuffle, which
+    # only depends on the sample count
+    order = list(range(10))
+    random.Random(42).shuffle(order)
+    make_images(tmp_path / 'images', 10, unreadable=order[:3])
+
+    index = build_shards(str(tmp_path / 'images'), str(tmp_path / 'shards'), (4, 4),
+                         validation_split=0.3, workers=1)
+    assert list(index['splits']) == ['train']
+    assert index['splits']['train']['count'] == 7
+    assert index['skipped'] == 3
+    assert not os.path.exists(tmp_path / 'shards' / 'validation')
+    assert sum(len(labels) for _, labels in open_shards(str(tmp_path / 'shards'))) == 7
+
+def test_unreadable_training_split_is_an_error(tmp_path):
+    make_images(tmp_path / 'images', 4, unreadable=range(4))
+    with pytest.raises(ValueError, match='No readable training images'):
+        build_shards(str(tmp_path / 'images'), str(tmp_path / 'shards'), (4, 4), workers=1)
+    assert not os.path.exists(tmp_path / 'shards' / 'index.json')
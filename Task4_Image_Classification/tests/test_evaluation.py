@@ -0,0 +1,28 @@
+"""Streaming metrics must not depend on the label encoding.
+
+Run from the project root with: python -m pytest -q tests
+"""
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from evaluation import StreamingEvaluator
+
+def evaluate(probabilities, labels):
+    evaluator = StreamingEvaluator(3)
+    evaluator.update(probabilities, labels)
+    return evaluator.result()
+
+def test_sparse_column_and_one_hot_labels_agree():
+    rng = np.random.RandomState(0)
+    probabilities = rng.dirichlet(np.ones(3), size=50)
+    labels = rng.randint(0, 3, size=50)
+
+    expected = evaluate(probabilities, labels)
+    # CIFAR-10 ships labels as an (n, 1) column of class indices
+    assert evaluate(probabilities, labels.reshape(-1, 1)) == expected
+    assert evaluate(probabilities, np.eye(3)[labels]) == expected
+    assert [row['support'] for row in expected['per_class'].values()] == np.bincount(labels, minlength=3).tolist()
@@ -0,0 +1,63 @@
+"""The image batcher must resolve every request and outlive failing batches.
+
+Run from the project root with: python -m pytest -q tests
+"""
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from inference import ImageBatcher
+
+def image(value):
+    return np.full((2, 2, 3), value, dtype=np.uint8)
+
+def probabilities(images):
+    # One row per padded image, keyed by its pixel value
+    return images[:, 0, 0, :2].astype(np.float32)
+
+@pytest.fixture
+def batcher():
+    batchers = []
+
+    def make(predict_batch, **kwargs):
+        batchers.append(ImageBatcher(predict_batch, image_shape=(2, 2, 3), **kwargs))
+        return batchers[-1]
+
+    yield make
+    for batcher in batchers:
+        batcher.close()
+
+def test_padded_rows_are_dropped(batcher):
+    images = batcher(probabilities, max_batch_size=8, max_wait_ms=200)
+    futures = [images.submit(image(value)) for value in (1, 2, 3)]
+    assert [future.result(5)[0] for future in futures] == [1, 2, 3]
+    assert images.stats()['padded_images'] == 1
+
+def test_worker_survives_a_failing_batch(batcher):
+    calls = []
+
+    def predict_batch(images):
+        calls.append(len(images))
+        if len(calls) == 1:
+            raise ValueError('boom')
+        return probabilities(images)
+
+    images = batcher(predict_batch, max_batch_size=1, max_wait_ms=1)
+    with pytest.raises(ValueError):
+        images.submit(image(1)).result(5)
+    assert images.submit(image(2)).result(5)[0] == 2
+
+def test_short_prediction_fails_every_future(batcher):
+    images = batcher(lambda batch: probabilities(batch)[:1], max_batch_size=4, max_wait_ms=200)
+    futures = [images.submit(image(value)) for value in (1, 2, 3)]
+    for future in futures:
+        assert isinstance(future.exception(5), RuntimeError)
+
+def test_wrong_image_shape_is_rejected(batcher):
+    images = batcher(probabilities)
+    with pytest.raises(ValueError):
+        images.submit(np.zeros((3, 3, 3), dtype=np.uint8))
@@ -1,15 +1,207 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify, stream_with_context
 from flask_cors import CORS
-from sentiment_pipeline import SentimentAnalysisPipeline
+from sentiment_pipeline import SentimentAnalysisPipeline, bundle_is_incremental, find_latest_bundle
+from training_jobs import TrainingJobManager
+from micro_batching import MicroBatcher
+from itertools import islice
 import json
 import os
+import sys
+import time
+
+# Shared metrics module lives in the repository's common/ directory
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'common'))
+from metrics import BATCH_SIZE, CONTENT_TYPE, REGISTRY, REQUESTS, REQUEST_LATENCY, stage_observer
 
 app = Flask(__name__)
 CORS(app)
 
-# Initialize the sentiment analysis pipeline
-pipeline = SentimentAnalysisPipeline()
-models_trained = False
+# Directory holding versioned model bundles written by /train
+MODEL_DIR = os.environ.get(
+    'SENTIMENT_MODEL_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models')
+)
+
+# Prediction cache is opt-in: SENTIMENT_CACHE_SIZE=0 disables it
+CACHE_SIZE = int(os.environ.get('SENTIMENT_CACHE_SIZE', 0))
+CACHE_TTL = float(os.environ['SENTIMENT_CACHE_TTL']) if os.environ.get('SENTIMENT_CACHE_TTL') else None
+
+# Text preprocessing/featurization worker processes (0 means one per CPU core)
+PREPROCESS_WORKERS = int(os.environ.get('SENTIMENT_PREPROCESS_WORKERS', 1))
+PREPROCESS_CHUNK_SIZE = int(os.environ.get('SENTIMENT_PREPROCESS_CHUNK_SIZE', 2000))
+
+# Serve bundles with their numpy-only compiled scorer instead of sklearn
+USE_COMPILED_SCORER = os.environ.get('SENTIMENT_COMPILED_SCORER', '0') == '1'
+
+# Per-stage timings (preprocess, featurize, model) for /metrics
+observe_stage = stage_observer('sentiment')
+
+def create_pipeline():
+    """Build a pipeline with the configured serving options"""
+    new_pipeline = SentimentAnalysisPipeline(
+        cache_size=CACHE_SIZE,
+        cache_ttl=CACHE_TTL,
+        preprocess_workers=PREPROCESS_WORKERS,
+        preprocess_chunk_size=PREPROCESS_CHUNK_SIZE,
+        use_compiled_scorer=USE_COMPILED_SCORER
+    )
+    new_pipeline.stage_observer = observe_stage
+    return new_pipeline
+
+# Initialize the sentiment analysis pipeline, starting warm from the newest
+# saved bundle when one exists so new workers can serve without retraining
+pipeline = create_pipeline()
+try:
+    manifest = pipeline.load_latest_artifacts(MODEL_DIR)
+    if manifest is None:
+        print(f"No model bundle found in {MODEL_DIR}; POST /train to train models")
+except Exception as e:
+    print(f"Failed to load model bundle from {MODEL_DIR}: {e}")
+    pipeline = create_pipeline()
+
+# Batch limits: requests above MAX_BATCH_SIZE are rejected, and accepted
+# batches are scored BATCH_CHUNK_SIZE texts at a time to bound memory
+MAX_BATCH_SIZE = int(os.environ.get('SENTIMENT_MAX_BATCH_SIZE', 10000))
+BATCH_CHUNK_SIZE = int(os.environ.get('SENTIMENT_BATCH_CHUNK_SIZE', 1000))
+
+# Streaming scoring: texts are scored STREAM_BATCH_SIZE lines at a time.
+# Server-side input files are only readable from under DATA_ROOT; file
+# input is disabled when it is not set.
+STREAM_BATCH_SIZE = int(os.environ.get('SENTIMENT_STREAM_BATCH_SIZE', 500))
+DATA_ROOT = os.environ.get('SENTIMENT_DATA_ROOT')
+
+def resolve_data_path(path):
+    """Resolve a client-supplied path, refusing anything outside DATA_ROOT"""
+    if not DATA_ROOT:
+        raise PermissionError("Server-side file input is disabled (SENTIMENT_DATA_ROOT not set)")
+    root = os.path.realpath(DATA_ROOT)
+    resolved = os.path.realpath(os.path.join(root, path))
+    if os.path.commonpath([root, resolved]) != root:
+        raise PermissionError(f"Path is outside the data root: {path}")
+    if not os.path.isfile(resolved):
+        raise FileNotFoundError(f"File not found: {path}")
+    return resolved
+
+def parse_stream_line(line_number, line):
+    """Turn one input line into a record; JSON objects may carry an 'id'"""
+    record = {'line': line_number}
+    if line.startswith('{'):
+        try:
+            data = json.loads(line)
+            text = data.get('text', '')
+            if 'id' in data:
+                record['id'] = data['id']
+        except (ValueError, AttributeError) as e:
+            record['error'] = f"Invalid JSON: {e}"
+            return record
+    else:
+        text = line
+    
+    if not isinstance(text, str) or not text:
+        record['error'] = "Text is required"
+    else:
+        record['text'] = text
+    return record
+
+def stream_predictions(current, lines, model_type):
+    """Score input lines in fixed-size micro-batches, yielding NDJSON lines"""
+    records = (
+        parse_stream_line(line_number, line.strip())
+        for line_number, line in enumerate(lines, start=1)
+        if line.strip()
+    )
+    while True:
+        batch = list(islice(records, STREAM_BATCH_SIZE))
+        if not batch:
+            break
+        
+        scorable = [record for record in batch if 'error' not in record]
+        BATCH_SIZE.labels('sentiment', '/stream_predict').observe(len(scorable))
+        predictions = current.predict_batch(
+            [record['text'] for record in scorable], model_type, chunk_size=STREAM_BATCH_SIZE
+        )
+        for record, prediction in zip(scorable, predictions):
+            record.update(prediction)
+        
+        # Output keeps input order, with failed lines reported in place
+        yield ''.join(json.dumps(record) + '\n' for record in batch)
+
+def activate_bundle(bundle_dir):
+    """Load a freshly trained bundle and swap it in for new requests"""
+    global pipeline
+    new_pipeline = create_pipeline()
+    new_pipeline.load_artifacts(bundle_dir)
+    # Rebinding the global is a single atomic reference swap: handlers take a
+    # local reference once, so each request sees either the old or new model
+    pipeline = new_pipeline
+
+# Training runs in background worker processes so /predict never waits on it
+training_jobs = TrainingJobManager(
+    MODEL_DIR,
+    on_model_ready=activate_bundle,
+    max_workers=int(os.environ.get('SENTIMENT_TRAINING_WORKERS', 1))
+)
+
+# Opt-in dynamic batching of concurrent /predict calls: requests are grouped
+# for up to MICROBATCH_MAX_WAIT_MS or MICROBATCH_MAX_SIZE items per batch
+MICROBATCH_ENABLED = os.environ.get('SENTIMENT_MICROBATCH', '0') == '1'
+MICROBATCH_MAX_SIZE = int(os.environ.get('SENTIMENT_MICROBATCH_MAX_SIZE', 64))
+MICROBATCH_MAX_WAIT_MS = float(os.environ.get('SENTIMENT_MICROBATCH_MAX_WAIT_MS', 5))
+
+def score_micro_batch(texts, model_type):
+    # Reads the global at batch time so batches follow model hot-swaps
+    BATCH_SIZE.labels('sentiment', 'micro_batch').observe(len(texts))
+    return pipeline.predict_batch(texts, model_type)
+
+micro_batcher = None
+if MICROBATCH_ENABLED:
+    micro_batcher = MicroBatcher(
+        score_micro_batch,
+        max_batch_size=MICROBATCH_MAX_SIZE,
+        max_wait_ms=MICROBATCH_MAX_WAIT_MS
+    )
+
+def collect_sentiment_metrics():
+    """Scrape-time model, cache and micro-batching metrics"""
+    current = pipeline
+    labels = {'service': 'sentiment'}
+    yield 'model_info', 'gauge', 'Currently served model (value is always 1)', [({
+        'service': 'sentiment',
+        'version': current.model_version or 'none',
+        'trained': str(current.is_trained).lower(),
+        'compiled_scorer': str(current.compiled_scorer is not None).lower()
+    }, 1)]
+    
+    cache = current.cache_stats()
+    if cache is not None:
+        for name in ('hits', 'misses', 'evictions', 'expirations'):
+            yield f'prediction_cache_{name}_total', 'counter', f'Prediction cache {name}', [(labels, cache[name])]
+        yield 'prediction_cache_size', 'gauge', 'Entries in the prediction cache', [(labels, cache['size'])]
+    
+    if micro_batcher is not None:
+        batching = micro_batcher.stats()
+        yield 'micro_batch_queue_depth', 'gauge', 'Predictions waiting for a micro-batch', [(labels, batching['queue_depth'])]
+
+REGISTRY.register_collector(collect_sentiment_metrics)
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    # Route templates keep label cardinality bounded; for streamed responses
+    # this measures the time until the body starts streaming
+    endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+    REQUESTS.labels('sentiment', endpoint, request.method, response.status_code).inc()
+    start = g.get('request_start')
+    if start is not None:
+        REQUEST_LATENCY.labels('sentiment', endpoint).observe(time.perf_counter() - start)
+    return response
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    return Response(REGISTRY.render(), content_type=CONTENT_TYPE)
 
 @app.route('/')
 def home():
@@ -17,42 +209,98 @@ def home():
         "message": "OutriX Task 5 - Sentiment Analysis API",
         "status": "running",
         "endpoints": [
-            "/train - POST: Train the models",
+            "/train - POST: Start a background training job",
+            "/train/<job_id> - GET: Training job status, DELETE: Cancel job",
             "/predict - POST: Predict sentiment for text",
             "/batch_predict - POST: Predict sentiment for multiple texts",
-            "/model_info - GET: Get model information"
+            "/stream_predict - POST: Stream NDJSON predictions for NDJSON/text lines",
+            "/model_info - GET: Get model information",
+            "/metrics - GET: Prometheus metrics"
         ]
     })
 
 @app.route('/train', methods=['POST'])
 def train_models():
-    global models_trained
     try:
-        # Load and train models
-        df = pipeline.load_and_prepare_data()
-        results = pipeline.train_models(df)
+        # Optional body: {"data_path": ..., "incremental": bool, "chunk_size": int}.
+        # Without a data_path the built-in sample dataset is used.
+        data = request.get_json(silent=True) or {}
+        options = {
+            'incremental': bool(data.get('incremental', False)),
+            'chunk_size': int(data.get('chunk_size', 10000)),
+            'preprocess_workers': PREPROCESS_WORKERS,
+            'preprocess_chunk_size': PREPROCESS_CHUNK_SIZE
+        }
+        if data.get('data_path'):
+            options['data_path'] = resolve_data_path(data['data_path'])
+        elif options['incremental']:
+            return jsonify({
+                "status": "error",
+                "message": "Incremental training requires a data_path"
+            }), 400
         
-        models_trained = True
+        # Incremental jobs update the newest bundle, which must be hashing-based;
+        # the job re-checks in case a full retrain publishes in between
+        latest_bundle = find_latest_bundle(MODEL_DIR)
+        if options['incremental'] and latest_bundle is not None and not bundle_is_incremental(latest_bundle):
+            return jsonify({
+                "status": "error",
+                "message": "The current model was trained in full on a TF-IDF vocabulary and can't be "
+                           "updated incrementally; retrain it with incremental=false"
+            }), 409
+        
+        job = training_jobs.submit(options)
         
         return jsonify({
             "status": "success",
-            "message": "Models trained successfully",
-            "results": {
-                "naive_bayes_accuracy": float(results['nb_accuracy']),
-                "logistic_regression_accuracy": float(results['lr_accuracy']),
-                "dataset_size": len(df)
-            }
-        })
+            "message": "Training job submitted",
+            "job": job
+        }), 202
+    except (PermissionError, FileNotFoundError, ValueError) as e:
+        return jsonify({
+            "status": "error",
+            "message": str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             "status": "error",
             "message": str(e)
         }), 500
 
+@app.route('/train/<job_id>', methods=['GET'])
+def get_training_job(job_id):
+    job = training_jobs.get(job_id)
+    if job is None:
+        return jsonify({
+            "status": "error",
+            "message": f"Unknown training job: {job_id}"
+        }), 404
+    
+    return jsonify({
+        "status": "success",
+        "job": job
+    })
+
+@app.route('/train/<job_id>', methods=['DELETE'])
+def cancel_training_job(job_id):
+    job = training_jobs.cancel(job_id)
+    if job is None:
+        return jsonify({
+            "status": "error",
+            "message": f"Unknown training job: {job_id}"
+        }), 404
+    
+    # A running job is only 'cancelling' until its staged model is discarded
+    return jsonify({
+        "status": "success",
+        "job": job
+    }), 202 if job['state'] == 'cancelling' else 200
+
 @app.route('/predict', methods=['POST'])
 def predict_sentiment():
     try:
-        if not models_trained:
+        current = pipeline
+        if not current.is_trained:
             return jsonify({
                 "status": "error",
                 "message": "Models not trained yet. Please train models first."
@@ -68,7 +316,10 @@ def predict_sentiment():
                 "message": "Text is required"
             }), 400
         
-        result = pipeline.predict_sentiment(text, model_type)
+        if micro_batcher is not None:
+            result = micro_batcher.predict(text, model_type)
+        else:
+            result = current.predict_sentiment(text, model_type)
         
         return jsonify({
             "status": "success",
@@ -83,7 +334,8 @@ def predict_sentiment():
 @app.route('/batch_predict', methods=['POST'])
 def batch_predict_sentiment():
     try:
-        if not models_trained:
+        current = pipeline
+        if not current.is_trained:
             return jsonify({
                 "status": "error",
                 "message": "Models not trained yet. Please train models first."
@@ -99,10 +351,14 @@ def batch_predict_sentiment():
                 "message": "Texts array is required"
             }), 400
         
-        predictions = []
-        for text in texts:
-            result = pipeline.predict_sentiment(text, model_type)
-            predictions.append(result)
+        if len(texts) > MAX_BATCH_SIZE:
+            return jsonify({
+                "status": "error",
+                "message": f"Batch too large: {len(texts)} texts (max {MAX_BATCH_SIZE})"
+            }), 413
+        
+        BATCH_SIZE.labels('sentiment', '/batch_predict').observe(len(texts))
+        predictions = current.predict_batch(texts, model_type, chunk_size=BATCH_CHUNK_SIZE)
         
         return jsonify({
             "status": "success",
@@ -114,12 +370,58 @@ def batch_predict_sentiment():
             "message": str(e)
         }), 500
 
+@app.route('/stream_predict', methods=['POST'])
+def stream_predict_sentiment():
+    try:
+        current = pipeline
+        if not current.is_trained:
+            return jsonify({
+                "status": "error",
+                "message": "Models not trained yet. Please train models first."
+            }), 400
+        
+        model_type = request.args.get('model', 'nb')
+        path = request.args.get('path')
+        
+        # Input is either a server-side file or the request body itself,
+        # one JSON object or plain text per line
+        if path:
+            input_file = open(resolve_data_path(path), encoding='utf-8')
+        else:
+            input_file = None
+        
+        def generate():
+            if input_file is not None:
+                with input_file:
+                    yield from stream_predictions(current, input_file, model_type)
+            else:
+                lines = (line.decode('utf-8', errors='replace') for line in request.stream)
+                yield from stream_predictions(current, lines, model_type)
+        
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+    except (PermissionError, FileNotFoundError) as e:
+        return jsonify({
+            "status": "error",
+            "message": str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            "status": "error",
+            "message": str(e)
+        }), 500
+
 @app.route('/model_info', methods=['GET'])
 def get_model_info():
+    current = pipeline
     return jsonify({
         "status": "success",
         "info": {
-            "models_trained": models_trained,
+            "models_trained": current.is_trained,
+            "model_version": current.model_version,
+            "training_metadata": current.training_metadata,
+            "compiled_scorer": current.compiled_scorer is not None,
+            "cache": current.cache_stats(),
+            "micro_batching": micro_batcher.stats() if micro_batcher is not None else None,
             "available_models": ["naive_bayes", "logistic_regression"],
             "features": "TF-IDF Vectorization",
             "preprocessing": [
@@ -133,9 +435,12 @@ def get_model_info():
 if __name__ == '__main__':
     print("Starting OutriX Task 5 - Sentiment Analysis API...")
     print("Available endpoints:")
-    print("- POST /train - Train the sentiment analysis models")
+    print("- POST /train - Start a background training job")
+    print("- GET /train/<job_id> - Poll a training job (DELETE to cancel)")
     print("- POST /predict - Predict sentiment for single text")
     print("- POST /batch_predict - Predict sentiment for multiple texts")
+    print("- POST /stream_predict - Stream NDJSON predictions for a body or file of lines")
     print("- GET /model_info - Get model information")
+    print("- GET /metrics - Prometheus metrics")
     
     app.run(debug=True, host='0.0.0.0', port=5000)
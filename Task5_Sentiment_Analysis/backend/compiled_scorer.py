@@ -0,0 +1,103 @@
+import re
+
+import numpy as np
+
+# Same default token pattern as sklearn's TfidfVectorizer
+TOKEN_PATTERN = re.compile(r"(?u)\b\w\w+\b")
+SCORER_FORMAT_VERSION = 1
+
+class CompiledSentimentScorer:
+    """Numpy-only TF-IDF + linear model scorer exported from a fitted pipeline
+
+    Each model is a dense (n_features, n_classes) weight matrix plus a bias
+    row. 'softmax' models normalise the logits with a softmax (Naive Bayes
+    joint log-likelihoods, multinomial logistic regression); 'ovr' models
+    normalise per-class sigmoids as sklearn does for one-vs-rest classifiers.
+    """
+
+    def __init__(self, vocabulary, idf, classes, models):
+        self.vocabulary = vocabulary
+        self.idf = np.asarray(idf, dtype=np.float64)
+        self.classes = [str(label) for label in classes]
+        self.models = models
+
+    def _features(self, processed_texts):
+        """Return (rows, columns, values) of the l2-normalised TF-IDF matrix"""
+        rows, columns, counts = [], [], []
+        for row, text in enumerate(processed_texts):
+            term_counts = {}
+            for token in TOKEN_PATTERN.findall(text):
+                column = self.vocabulary.get(token)
+                if column is not None:
+                    term_counts[column] = term_counts.get(column, 0) + 1
+            rows.extend([row] * len(term_counts))
+            columns.extend(term_counts.keys())
+            counts.extend(term_counts.values())
+
+        rows = np.asarray(rows, dtype=np.intp)
+        columns = np.asarray(columns, dtype=np.intp)
+        values = np.asarray(counts, dtype=np.float64) * self.idf[columns]
+
+        norms = np.sqrt(np.bincount(rows, weights=values * values, minlength=len(processed_texts)))
+        values /= norms[rows]
+        return rows, columns, values
+
+    def predict_proba(self, processed_texts, model_type='nb'):
+        """Class probabilities for already-preprocessed texts"""
+        weights, bias, normalization = self.models[model_type]
+        rows, columns, values = self._features(processed_texts)
+
+        logits = np.tile(bias, (len(processed_texts), 1))
+        np.add.at(logits, rows, values[:, None] * weights[columns])
+
+        if normalization == 'ovr':
+            probabilities = 1.0 / (1.0 + np.exp(-logits))
+        else:
+            probabilities = np.exp(logits - logits.max(axis=1, keepdims=True))
+        return probabilities / probabilities.sum(axis=1, keepdims=True)
+
+    def score(self, processed_texts, model_type='nb'):
+        """Return a (label, confidence) pair per preprocessed text"""
+        probabilities = self.predict_proba(processed_texts, model_type)
+        best = np.argmax(probabilities, axis=1)
+        confidences = probabilities[np.arange(len(processed_texts)), best]
+        return [(self.classes[index], float(confidence)) for index, confidence in zip(best, confidences)]
+
+    def save(self, path):
+        """Write the scorer to a single .npz file"""
+        tokens = [None] * len(self.vocabulary)
+        for token, column in self.vocabulary.items():
+            tokens[column] = token
+
+        arrays = {
+            'format_version': np.array(SCORER_FORMAT_VERSION),
+            'tokens': np.array(tokens, dtype=str),
+            'idf': self.idf,
+            'classes': np.array(self.classes, dtype=str),
+            'model_types': np.array(sorted(self.models), dtype=str)
+        }
+        for model_type, (weights, bias, normalization) in self.models.items():
+            arrays[f'{model_type}_weights'] = weights
+            arrays[f'{model_type}_bias'] = bias
+            arrays[f'{model_type}_normalization'] = np.array(normalization)
+
+        with open(path, 'wb') as f:
+            np.savez(f, **arrays)
+
+    @classmethod
+    def load(cls, path):
+        """Load a scorer written by save"""
+        with np.load(path, allow_pickle=False) as data:
+            if int(data['format_version']) != SCORER_FORMAT_VERSION:
+                raise ValueError(f"Unsupported scorer format: {int(data['format_version'])}")
+
+            vocabulary = {str(token): column for column, token in enumerate(data['tokens'])}
+            models = {
+                str(model_type): (
+                    data[f'{model_type}_weights'],
+                    data[f'{model_type}_bias'],
+                    str(data[f'{model_type}_normalization'])
+                )
+                for model_type in data['model_types']
+            }
+            return cls(vocabulary, data['idf'], data['classes'], models)
@@ -0,0 +1,87 @@
+import os
+import sys
+import threading
+
+# Shared batching queue lives in the repository's common/ directory
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'common'))
+from batch_queue import BatchQueue
+
+class MicroBatcher(BatchQueue):
+    """Groups concurrent single predictions into vectorized batches
+
+    Requests are queued and a background thread drains them: a batch closes
+    when it reaches max_batch_size items or max_wait_ms after its first item
+    arrived, whichever comes first, so the added latency is bounded by
+    max_wait_ms plus the batch's own scoring time (see common/batch_queue.py).
+    """
+
+    def __init__(self, score_batch, max_batch_size=64, max_wait_ms=5.0):
+        # score_batch(texts, model_type) must return one result per text, in order
+        self.score_batch = score_batch
+        self._lock = threading.Lock()
+
+        # Histogram buckets are powers of two up to max_batch_size
+        self._bucket_bounds = []
+        bound = 1
+        while bound < max_batch_size:
+            self._bucket_bounds.append(bound)
+            bound *= 2
+        self._bucket_bounds.append(max_batch_size)
+        self._bucket_counts = [0] * len(self._bucket_bounds)
+        self.batches = 0
+        self.items = 0
+        self.max_queue_depth = 0
+
+        super().__init__(max_batch_size, max_wait_ms, name='micro-batcher')
+
+    def submit(self, text, model_type='nb'):
+        """Queue one prediction and return a Future for its result"""
+        future = self._put((text, model_type))
+        depth = self.queue_depth()
+        with self._lock:
+            self.max_queue_depth = max(self.max_queue_depth, depth)
+        return future
+
+    def predict(self, text, model_type='nb', timeout=None):
+        """Queue one prediction and wait for its result"""
+        return self.submit(text, model_type).result(timeout)
+
+    def process_batch(self, items, futures):
+        self._record(len(items))
+
+        # One vectorized call per model type present in the batch
+        by_model = {}
+        for (text, model_type), future in zip(items, futures):
+            texts, model_futures = by_model.setdefault(model_type, ([], []))
+            texts.append(text)
+            model_futures.append(future)
+
+        for model_type, (texts, model_futures) in by_model.items():
+            self.resolve(model_futures, lambda: self.score_batch(texts, model_type))
+
+    def _record(self, batch_size):
+        with self._lock:
+            self.batches += 1
+            self.items += batch_size
+            for i, bound in enumerate(self._bucket_bounds):
+                if batch_size <= bound:
+                    self._bucket_counts[i] += 1
+                    break
+
+    def stats(self):
+        """Return queue depth and batch-size distribution"""
+        with self._lock:
+            return {
+                'queue_depth': self.queue_depth(),
+                'max_queue_depth': self.max_queue_depth,
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': self.max_wait * 1000.0,
+                'batches': self.batches,
+                'items': self.items,
+                'mean_batch_size': self.items / self.batches if self.batches else 0.0,
+                # Non-cumulative: each count covers sizes above the previous bound up to 'le'
+                'batch_size_histogram': [
+                    {'le': bound, 'count': count}
+                    for bound, count in zip(self._bucket_bounds, self._bucket_counts)
+                ]
+            }
@@ -1,117 +1,301 @@
-import pandas as pd
 import numpy as np
-from sklearn.model_selection import train_test_split
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.naive_bayes import MultinomialNB
-from sklearn.linear_model import LogisticRegression
-from sklearn.metrics import accuracy_score, classification_report
-import re
-import pickle
-import warnings
-warnings.filterwarnings('ignore')
+from compiled_scorer import CompiledSentimentScorer
+from prediction_cache import PredictionCache
+from text_processing import TextPreprocessor, preprocess_text
+import hashlib
+import json
+import os
+import shutil
+import time
+import uuid
+
+# Training needs pandas and the sklearn estimator stack, which take far longer
+# to import than serving does. Both are loaded on first use only: training
+# methods import sentiment_training lazily, and bundles are only unpickled
+# (importing sklearn) when the compiled scorer is not serving them.
+
+# Bumped whenever the layout of a saved artifact bundle changes
+ARTIFACT_FORMAT_VERSION = 1
+BUNDLE_FILENAME = 'bundle.joblib'
+MANIFEST_FILENAME = 'manifest.json'
+SCORER_FILENAME = 'scorer.npz'
+
+def _file_sha256(path, block_size=1 << 20):
+    """Hash a file in blocks so large bundles are never read into memory at once"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def bundle_is_incremental(bundle_dir):
+    """Whether a saved bundle holds hashing-featurized models that train_incremental can update"""
+    with open(os.path.join(bundle_dir, MANIFEST_FILENAME)) as f:
+        manifest = json.load(f)
+    return manifest.get('metadata', {}).get('mode') == 'incremental'
+
+def find_latest_bundle(model_dir):
+    """Return the path of the newest artifact bundle in model_dir, or None"""
+    if not os.path.isdir(model_dir):
+        return None
+    
+    # Bundle directories are named '<timestamp>-<hash>', so name order is age order.
+    # Dot-prefixed directories are bundles still being written.
+    versions = sorted(
+        name for name in os.listdir(model_dir)
+        if not name.startswith('.')
+        and os.path.isfile(os.path.join(model_dir, name, MANIFEST_FILENAME))
+    )
+    if not versions:
+        return None
+    return os.path.join(model_dir, versions[-1])
 
 class SentimentAnalysisPipeline:
-    def __init__(self):
-        self.vectorizer = TfidfVectorizer(max_features=5000, stop_words='english')
-        self.nb_model = MultinomialNB()
-        self.lr_model = LogisticRegression(max_iter=1000)
+    def __init__(self, cache_size=0, cache_ttl=None, preprocess_workers=1, preprocess_chunk_size=2000,
+                 use_compiled_scorer=False):
+        # Fitted estimators are created by the training methods or loaded from a bundle
+        self.vectorizer = None
+        self.nb_model = None
+        self.lr_model = None
+        self.is_trained = False
+        self.model_version = None
+        self.training_metadata = {}
+        self.text_preprocessor = TextPreprocessor(preprocess_workers, preprocess_chunk_size)
+        # When enabled, bundles are served by their numpy-only compiled scorer
+        self.use_compiled_scorer = use_compiled_scorer
+        self.compiled_scorer = None
+        # Opt-in prediction cache keyed on (preprocessed text, model type, model version)
+        self.cache = PredictionCache(cache_size, cache_ttl) if cache_size > 0 else None
+        # Optional observe(stage, seconds) hook for per-stage serving latency
+        self.stage_observer = None
     
     def preprocess_text(self, text):
         """Simple preprocessing without NLTK"""
-        # Convert to lowercase
-        text = text.lower()
-        
-        # Remove special characters and digits
-        text = re.sub(r'[^a-zA-Z\s]', '', text)
-        
-        # Remove extra whitespace
-        text = ' '.join(text.split())
-        
-        return text
+        return preprocess_text(text)
     
     def load_and_prepare_data(self):
         """Load sample dataset"""
-        sample_data = {
-            'text': [
-                "I love this product, it's amazing!",
-                "This is the worst experience ever",
-                "The movie was okay, nothing special",
-                "Absolutely fantastic service!",
-                "I hate waiting in long queues",
-                "The food was decent",
-                "Outstanding performance by the team",
-                "This is terrible quality",
-                "Not bad, could be better",
-                "Excellent customer support!",
-                "The app crashes frequently",
-                "Average experience overall",
-                "I'm so happy with my purchase",
-                "Disappointing results",
-                "It's alright, nothing extraordinary",
-                "Brilliant implementation!",
-                "Poor customer service",
-                "Satisfactory but not great",
-                "Love the new features!",
-                "Waste of time and money"
-            ],
-            'sentiment': [
-                'positive', 'negative', 'neutral', 'positive', 'negative',
-                'neutral', 'positive', 'negative', 'neutral', 'positive',
-                'negative', 'neutral', 'positive', 'negative', 'neutral',
-                'positive', 'negative', 'neutral', 'positive', 'negative'
-            ]
-        }
-        return pd.DataFrame(sample_data)
+        from sentiment_training import load_and_prepare_data
+        return load_and_prepare_data()
     
     def train_models(self, df):
         """Train both models"""
-        print("Preprocessing text data...")
-        df['processed_text'] = df['text'].apply(self.preprocess_text)
-        
-        X_train, X_test, y_train, y_test = train_test_split(
-            df['processed_text'], df['sentiment'], test_size=0.2, random_state=42
-        )
-        
-        print("Vectorizing text using TF-IDF...")
-        X_train_tfidf = self.vectorizer.fit_transform(X_train)
-        X_test_tfidf = self.vectorizer.transform(X_test)
-        
-        print("Training Naive Bayes model...")
-        self.nb_model.fit(X_train_tfidf, y_train)
-        nb_predictions = self.nb_model.predict(X_test_tfidf)
-        nb_accuracy = accuracy_score(y_test, nb_predictions)
+        from sentiment_training import train_models
+        return train_models(self, df)
+    
+    @property
+    def incremental(self):
+        """Whether the pipeline uses the out-of-core hashing featurizer"""
+        # Checked by name so serving never has to import sklearn
+        return type(self.vectorizer).__name__ == 'HashingVectorizer'
+    
+    def train_incremental(self, path, chunk_size=10000):
+        """Train or update both models from a corpus on disk, one chunk at a time"""
+        from sentiment_training import train_incremental
+        return train_incremental(self, path, chunk_size)
+    
+    def _mark_trained(self, metadata):
+        """Record a finished training run and drop predictions from older models"""
+        self.is_trained = True
+        self.model_version = None
+        self.compiled_scorer = None
+        if self.cache is not None:
+            self.cache.clear()
+        self.training_metadata = dict(metadata, trained_at=time.strftime('%Y-%m-%dT%H:%M:%S'))
+    
+    def _timed(self, stage, func, *args):
+        """Call func(*args), reporting its duration to stage_observer if one is set"""
+        observe = self.stage_observer
+        if observe is None:
+            return func(*args)
+        start = time.perf_counter()
+        result = func(*args)
+        observe(stage, time.perf_counter() - start)
+        return result
+    
+    def _score_processed(self, processed_texts, model_type):
+        """Score already-preprocessed texts; returns (label, confidence) pairs"""
+        if self.compiled_scorer is not None:
+            return self._timed('compiled_score', self.compiled_scorer.score,
+                               processed_texts, 'nb' if model_type == 'nb' else 'lr')
         
-        print("Training Logistic Regression model...")
-        self.lr_model.fit(X_train_tfidf, y_train)
-        lr_predictions = self.lr_model.predict(X_test_tfidf)
-        lr_accuracy = accuracy_score(y_test, lr_predictions)
+        model = self.nb_model if model_type == 'nb' else self.lr_model
+        text_tfidf = self._timed('featurize', self.text_preprocessor.featurize, self.vectorizer, processed_texts)
         
-        print(f"\nNaive Bayes Accuracy: {nb_accuracy:.4f}")
-        print(f"Logistic Regression Accuracy: {lr_accuracy:.4f}")
+        # Labels come from the argmax of the probabilities, so the model runs once
+        probabilities = self._timed('model', model.predict_proba, text_tfidf)
+        best = np.argmax(probabilities, axis=1)
+        labels = model.classes_[best]
+        confidences = probabilities[np.arange(len(processed_texts)), best]
         
-        return {
-            'nb_accuracy': nb_accuracy,
-            'lr_accuracy': lr_accuracy
-        }
+        return [(str(label), float(confidence)) for label, confidence in zip(labels, confidences)]
     
     def predict_sentiment(self, text, model_type='nb'):
         """Predict sentiment"""
-        processed_text = self.preprocess_text(text)
-        text_tfidf = self.vectorizer.transform([processed_text])
+        return self.predict_batch([text], model_type)[0]
+    
+    def predict_batch(self, texts, model_type='nb', chunk_size=1000):
+        """Predict sentiment for many texts with one vectorized pass per chunk"""
+        processed_texts = self._timed('preprocess', self.text_preprocessor.preprocess, texts)
+        scores = [None] * len(texts)
         
-        if model_type == 'nb':
-            prediction = self.nb_model.predict(text_tfidf)[0]
-            confidence = np.max(self.nb_model.predict_proba(text_tfidf))
-        else:
-            prediction = self.lr_model.predict(text_tfidf)[0]
-            confidence = np.max(self.lr_model.predict_proba(text_tfidf))
+        # Serve what we can from the cache and collect the distinct misses
+        misses = {}
+        for i, processed_text in enumerate(processed_texts):
+            cached = None
+            if self.cache is not None:
+                cached = self.cache.get((processed_text, model_type, self.model_version))
+            if cached is not None:
+                scores[i] = cached
+            else:
+                misses.setdefault(processed_text, []).append(i)
+        
+        # Chunking keeps the sparse matrix and probability array bounded
+        miss_texts = list(misses)
+        for start in range(0, len(miss_texts), chunk_size):
+            chunk = miss_texts[start:start + chunk_size]
+            for processed_text, score in zip(chunk, self._score_processed(chunk, model_type)):
+                if self.cache is not None:
+                    self.cache.put((processed_text, model_type, self.model_version), score)
+                for i in misses[processed_text]:
+                    scores[i] = score
         
-        return {
+        return [{
             'text': text,
-            'sentiment': prediction,
+            'sentiment': label,
             'confidence': confidence,
             'model': model_type
-        }
+        } for text, (label, confidence) in zip(texts, scores)]
+    
+    def cache_stats(self):
+        """Return prediction cache counters, or None when caching is off"""
+        if self.cache is None:
+            return None
+        return self.cache.stats()
+    
+    def compile_scorer(self):
+        """Compile the fitted TF-IDF vocabulary and models into a numpy-only scorer"""
+        self._require_estimators()
+        from sentiment_training import compile_scorer
+        return compile_scorer(self)
+    
+    def check_scorer_parity(self, scorer, texts=None, atol=1e-9):
+        """Raise if the compiled scorer disagrees with sklearn on texts"""
+        self._require_estimators()
+        from sentiment_training import check_scorer_parity
+        check_scorer_parity(self, scorer, texts, atol)
+    
+    def export_compiled_scorer(self, path, parity_texts=None):
+        """Compile, parity-check against sklearn, and save the numpy-only scorer"""
+        scorer = self.compile_scorer()
+        self.check_scorer_parity(scorer, parity_texts)
+        scorer.save(path)
+        print(f"Compiled scorer saved to: {path}")
+        return scorer
+    
+    def _require_estimators(self):
+        if not self.is_trained:
+            raise ValueError("Models not trained yet. Call train_models() first.")
+        if self.vectorizer is None:
+            raise ValueError("Pipeline was loaded for inference only; reload it with "
+                             "use_compiled_scorer=False to access the sklearn models")
+    
+    def save_artifacts(self, model_dir):
+        """Save the fitted vectorizer and models as one versioned bundle"""
+        self._require_estimators()
+        import joblib
+        import sklearn
+        
+        # Write into a hidden directory first so readers never see a partial bundle
+        os.makedirs(model_dir, exist_ok=True)
+        tmp_dir = os.path.join(model_dir, f'.tmp-{uuid.uuid4().hex}')
+        os.makedirs(tmp_dir)
+        try:
+            bundle_path = os.path.join(tmp_dir, BUNDLE_FILENAME)
+            # Uncompressed on purpose: only plain dumps can be memory-mapped on load
+            joblib.dump({
+                'vectorizer': self.vectorizer,
+                'nb_model': self.nb_model,
+                'lr_model': self.lr_model
+            }, bundle_path)
+            
+            content_hash = _file_sha256(bundle_path)
+            version = f"{time.strftime('%Y%m%d%H%M%S')}-{content_hash[:8]}"
+            manifest = {
+                'format_version': ARTIFACT_FORMAT_VERSION,
+                'version': version,
+                'sha256': content_hash,
+                'sklearn_version': sklearn.__version__,
+                'metadata': self.training_metadata
+            }
+            
+            # Hashing-featurized (incremental) models have no vocabulary to compile
+            if not self.incremental:
+                scorer_path = os.path.join(tmp_dir, SCORER_FILENAME)
+                self.export_compiled_scorer(scorer_path)
+                manifest['scorer'] = {
+                    'file': SCORER_FILENAME,
+                    'sha256': _file_sha256(scorer_path)
+                }
+            with open(os.path.join(tmp_dir, MANIFEST_FILENAME), 'w') as f:
+                json.dump(manifest, f, indent=2)
+            
+            bundle_dir = os.path.join(model_dir, version)
+            os.rename(tmp_dir, bundle_dir)
+        except Exception:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+        
+        self.model_version = version
+        print(f"Model bundle saved to: {bundle_dir}")
+        return bundle_dir
+    
+    def load_artifacts(self, bundle_dir, mmap=True, verify=True):
+        """Load a bundle written by save_artifacts"""
+        with open(os.path.join(bundle_dir, MANIFEST_FILENAME)) as f:
+            manifest = json.load(f)
+        
+        if manifest.get('format_version') != ARTIFACT_FORMAT_VERSION:
+            raise ValueError(f"Unsupported artifact format: {manifest.get('format_version')}")
+        
+        self.compiled_scorer = None
+        if self.use_compiled_scorer and 'scorer' in manifest:
+            # Inference-only load: the numpy scorer serves every prediction,
+            # so the sklearn objects are never unpickled (or imported)
+            scorer_path = os.path.join(bundle_dir, manifest['scorer']['file'])
+            if verify and _file_sha256(scorer_path) != manifest['scorer']['sha256']:
+                raise ValueError(f"Compiled scorer in {bundle_dir} failed its content hash check")
+            self.compiled_scorer = CompiledSentimentScorer.load(scorer_path)
+            self.vectorizer = self.nb_model = self.lr_model = None
+        else:
+            import joblib
+            
+            bundle_path = os.path.join(bundle_dir, BUNDLE_FILENAME)
+            if verify and _file_sha256(bundle_path) != manifest['sha256']:
+                raise ValueError(f"Artifact bundle {bundle_dir} failed its content hash check")
+            
+            # With mmap_mode='r' the coefficient and IDF arrays stay backed by the
+            # file, so forked workers share the same pages instead of private copies
+            bundle = joblib.load(bundle_path, mmap_mode='r' if mmap else None)
+            self.vectorizer = bundle['vectorizer']
+            self.nb_model = bundle['nb_model']
+            self.lr_model = bundle['lr_model']
+        
+        if self.cache is not None:
+            self.cache.clear()
+        
+        self.is_trained = True
+        self.model_version = manifest['version']
+        self.training_metadata = manifest.get('metadata', {})
+        print(f"Model bundle loaded from: {bundle_dir}")
+        return manifest
+    
+    def load_latest_artifacts(self, model_dir, mmap=True, verify=True):
+        """Load the newest bundle in model_dir; returns its manifest or None"""
+        bundle_dir = find_latest_bundle(model_dir)
+        if bundle_dir is None:
+            return None
+        return self.load_artifacts(bundle_dir, mmap=mmap, verify=verify)
 
 if __name__ == "__main__":
     pipeline = SentimentAnalysisPipeline()
@@ -0,0 +1,242 @@
+# Training path for SentimentAnalysisPipeline. Everything that needs pandas or
+# the sklearn estimator stack lives here so inference-only workers never
+# import it; the pipeline loads this module on the first training call.
+import os
+import warnings
+
+import numpy as np
+import pandas as pd
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfVectorizer
+from sklearn.linear_model import LogisticRegression, SGDClassifier
+from sklearn.metrics import accuracy_score
+from sklearn.model_selection import train_test_split
+from sklearn.naive_bayes import MultinomialNB
+
+from compiled_scorer import CompiledSentimentScorer
+
+# Label set and feature space for out-of-core training; partial_fit needs
+# every class up front, and the hashing featurizer needs no fitted vocabulary
+SENTIMENT_CLASSES = ['negative', 'neutral', 'positive']
+HASHING_FEATURES = 2 ** 20
+
+def iter_corpus_chunks(path, chunk_size=10000):
+    """Yield a labelled corpus from disk as DataFrames of at most chunk_size rows"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.csv':
+        yield from pd.read_csv(path, chunksize=chunk_size)
+    elif extension in ('.jsonl', '.ndjson'):
+        yield from pd.read_json(path, lines=True, chunksize=chunk_size)
+    elif extension == '.parquet':
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        raise ValueError(f"Unsupported corpus format: {extension or path}")
+
+def load_and_prepare_data():
+    """Load sample dataset"""
+    sample_data = {
+        'text': [
+            "I love this product, it's amazing!",
+            "This is the worst experience ever",
+            "The movie was okay, nothing special",
+            "Absolutely fantastic service!",
+            "I hate waiting in long queues",
+            "The food was decent",
+            "Outstanding performance by the team",
+            "This is terrible quality",
+            "Not bad, could be better",
+            "Excellent customer support!",
+            "The app crashes frequently",
+            "Average experience overall",
+            "I'm so happy with my purchase",
+            "Disappointing results",
+            "It's alright, nothing extraordinary",
+            "Brilliant implementation!",
+            "Poor customer service",
+            "Satisfactory but not great",
+            "Love the new features!",
+            "Waste of time and money"
+        ],
+        'sentiment': [
+            'positive', 'negative', 'neutral', 'positive', 'negative',
+            'neutral', 'positive', 'negative', 'neutral', 'positive',
+            'negative', 'neutral', 'positive', 'negative', 'neutral',
+            'positive', 'negative', 'neutral', 'positive', 'negative'
+        ]
+    }
+    return pd.DataFrame(sample_data)
+
+def train_models(pipeline, df):
+    """Train both models"""
+    pipeline.vectorizer = TfidfVectorizer(max_features=5000, stop_words='english')
+    pipeline.nb_model = MultinomialNB()
+    pipeline.lr_model = LogisticRegression(max_iter=1000)
+
+    print("Preprocessing text data...")
+    df['processed_text'] = pipeline.text_preprocessor.preprocess(df['text'].tolist())
+
+    X_train, X_test, y_train, y_test = train_test_split(
+        df['processed_text'], df['sentiment'], test_size=0.2, random_state=42
+    )
+
+    # Convergence and ill-defined metric warnings are expected on small
+    # datasets; silence them for the fit only instead of process-wide
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+
+        print("Vectorizing text using TF-IDF...")
+        X_train_tfidf = pipeline.vectorizer.fit_transform(X_train)
+        X_test_tfidf = pipeline.vectorizer.transform(X_test)
+
+        print("Training Naive Bayes model...")
+        pipeline.nb_model.fit(X_train_tfidf, y_train)
+        nb_predictions = pipeline.nb_model.predict(X_test_tfidf)
+        nb_accuracy = accuracy_score(y_test, nb_predictions)
+
+        print("Training Logistic Regression model...")
+        pipeline.lr_model.fit(X_train_tfidf, y_train)
+        lr_predictions = pipeline.lr_model.predict(X_test_tfidf)
+        lr_accuracy = accuracy_score(y_test, lr_predictions)
+
+    print(f"\nNaive Bayes Accuracy: {nb_accuracy:.4f}")
+    print(f"Logistic Regression Accuracy: {lr_accuracy:.4f}")
+
+    pipeline._mark_trained({
+        'mode': 'batch',
+        'dataset_size': len(df),
+        'nb_accuracy': float(nb_accuracy),
+        'lr_accuracy': float(lr_accuracy)
+    })
+
+    return {
+        'nb_accuracy': nb_accuracy,
+        'lr_accuracy': lr_accuracy
+    }
+
+def train_incremental(pipeline, path, chunk_size=10000):
+    """Train or update both models from a corpus on disk, one chunk at a time
+
+    An untrained pipeline starts new hashing-featurized models; a trained
+    one must already be hashing-featurized. A TF-IDF model's vocabulary is
+    fixed at fit time, so new labels can't be folded into it, and replacing
+    it with a fresh model would silently discard it.
+    """
+    if pipeline.is_trained and not pipeline.incremental:
+        raise ValueError("The current model uses a fitted TF-IDF vocabulary and can't be updated "
+                         "incrementally; retrain it in full, or start an incremental model from an "
+                         "empty model directory")
+    if not pipeline.is_trained:
+        # Stateless featurizer plus partial_fit-capable estimators, so RAM
+        # use is bounded by chunk_size rather than by the corpus
+        pipeline.vectorizer = HashingVectorizer(
+            n_features=HASHING_FEATURES, stop_words='english', alternate_sign=False
+        )
+        pipeline.nb_model = MultinomialNB()
+        pipeline.lr_model = SGDClassifier(loss='log_loss', random_state=42)
+        pipeline.training_metadata = {}
+
+    samples = 0
+    evaluated = 0
+    nb_correct = 0
+    lr_correct = 0
+
+    print(f"Streaming training data from {path}...")
+    for chunk in iter_corpus_chunks(path, chunk_size):
+        processed_texts = pipeline.text_preprocessor.preprocess(chunk['text'].astype(str).tolist())
+        labels = chunk['sentiment'].astype(str).values
+        X_chunk = pipeline.text_preprocessor.featurize(pipeline.vectorizer, processed_texts)
+
+        # Progressive validation: each chunk is scored before the models
+        # learn from it, which gives a held-out accuracy without a split
+        if hasattr(pipeline.nb_model, 'classes_'):
+            nb_correct += int(np.sum(pipeline.nb_model.predict(X_chunk) == labels))
+            lr_correct += int(np.sum(pipeline.lr_model.predict(X_chunk) == labels))
+            evaluated += len(labels)
+
+        pipeline.nb_model.partial_fit(X_chunk, labels, classes=SENTIMENT_CLASSES)
+        pipeline.lr_model.partial_fit(X_chunk, labels, classes=SENTIMENT_CLASSES)
+        samples += len(labels)
+        print(f"Trained on {samples} samples...")
+
+    if samples == 0:
+        raise ValueError(f"No training data found in {path}")
+
+    # A single-chunk corpus leaves nothing to validate against
+    nb_accuracy = nb_correct / evaluated if evaluated else None
+    lr_accuracy = lr_correct / evaluated if evaluated else None
+    if evaluated:
+        print(f"\nNaive Bayes Progressive Accuracy: {nb_accuracy:.4f}")
+        print(f"Logistic Regression Progressive Accuracy: {lr_accuracy:.4f}")
+
+    pipeline._mark_trained({
+        'mode': 'incremental',
+        'dataset_size': pipeline.training_metadata.get('dataset_size', 0) + samples,
+        'nb_accuracy': nb_accuracy,
+        'lr_accuracy': lr_accuracy
+    })
+
+    return {
+        'nb_accuracy': nb_accuracy,
+        'lr_accuracy': lr_accuracy,
+        'samples': samples
+    }
+
+def compile_scorer(pipeline):
+    """Compile the fitted TF-IDF vocabulary and models into a numpy-only scorer"""
+    if not isinstance(pipeline.vectorizer, TfidfVectorizer):
+        raise ValueError("Compiled scoring requires a fitted TfidfVectorizer")
+
+    # The scorer reimplements only the default word-unigram TF-IDF settings
+    params = pipeline.vectorizer.get_params()
+    expected = {'analyzer': 'word', 'ngram_range': (1, 1), 'binary': False, 'use_idf': True,
+                'norm': 'l2', 'sublinear_tf': False, 'strip_accents': None,
+                'token_pattern': r"(?u)\b\w\w+\b", 'tokenizer': None, 'preprocessor': None}
+    unsupported = [name for name, value in expected.items() if params.get(name) != value]
+    if unsupported:
+        raise ValueError(f"Compiled scoring does not support vectorizer settings: {unsupported}")
+    if list(pipeline.nb_model.classes_) != list(pipeline.lr_model.classes_):
+        raise ValueError("Both models must share the same classes")
+
+    nb_weights = np.asarray(pipeline.nb_model.feature_log_prob_, dtype=np.float64).T
+    nb_bias = np.asarray(pipeline.nb_model.class_log_prior_, dtype=np.float64)
+
+    lr_model = pipeline.lr_model
+    lr_weights = np.asarray(lr_model.coef_, dtype=np.float64).T
+    lr_bias = np.asarray(lr_model.intercept_, dtype=np.float64)
+    multi_class = getattr(lr_model, 'multi_class', 'auto')
+    if lr_weights.shape[1] == 1:
+        # Binary models: softmax over [0, d] equals [1 - sigmoid(d), sigmoid(d)]
+        lr_weights = np.hstack([np.zeros_like(lr_weights), lr_weights])
+        lr_bias = np.concatenate([[0.0], lr_bias])
+        lr_normalization = 'softmax'
+    elif (isinstance(lr_model, SGDClassifier) or multi_class == 'ovr'
+          or (multi_class == 'auto' and lr_model.solver == 'liblinear')):
+        lr_normalization = 'ovr'
+    else:
+        lr_normalization = 'softmax'
+
+    vocabulary = {str(token): int(column) for token, column in pipeline.vectorizer.vocabulary_.items()}
+    return CompiledSentimentScorer(
+        vocabulary,
+        pipeline.vectorizer.idf_,
+        pipeline.nb_model.classes_,
+        {
+            'nb': (nb_weights, nb_bias, 'softmax'),
+            'lr': (lr_weights, lr_bias, lr_normalization)
+        }
+    )
+
+def check_scorer_parity(pipeline, scorer, texts=None, atol=1e-9):
+    """Raise if the compiled scorer disagrees with sklearn on texts"""
+    if texts is None:
+        texts = load_and_prepare_data()['text'].tolist()
+    processed_texts = pipeline.text_preprocessor.preprocess(texts)
+    text_tfidf = pipeline.vectorizer.transform(processed_texts)
+
+    for model_type, model in (('nb', pipeline.nb_model), ('lr', pipeline.lr_model)):
+        expected = model.predict_proba(text_tfidf)
+        actual = scorer.predict_proba(processed_texts, model_type)
+        if not np.allclose(actual, expected, rtol=0, atol=atol):
+            worst = float(np.max(np.abs(actual - expected)))
+            raise ValueError(f"Compiled {model_type} scorer differs from sklearn by up to {worst:.3g}")
@@ -0,0 +1,118 @@
+"""The compiled numpy scorer must reproduce sklearn's predict_proba.
+
+Run from backend/ with: python -m pytest -q tests
+"""
+from itertools import islice, product
+import os
+from string import ascii_lowercase
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS
+from sklearn.model_selection import train_test_split
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from compiled_scorer import CompiledSentimentScorer
+from sentiment_pipeline import SentimentAnalysisPipeline
+from sentiment_training import load_and_prepare_data
+
+EDGE_CASE_TEXTS = [
+    '',
+    '   ',
+    '!!! 123 ???',
+    # Only stop words, which the vectorizer drops
+    'the and of it is to',
+    'This is not what it was',
+    # Only words the vectorizer has never seen
+    'zyxwv qwertyuiop blorptastic',
+    'a',
+    'love love love love love',
+    'Waste of time, hate it... but the FOOD was decent!',
+]
+
+def binary_data():
+    df = load_and_prepare_data()
+    return df[df['sentiment'] != 'neutral'].reset_index(drop=True)
+
+@pytest.fixture(scope='module', params=['three_class', 'binary'])
+def pipeline(request):
+    df = load_and_prepare_data() if request.param == 'three_class' else binary_data()
+    pipeline = SentimentAnalysisPipeline()
+    pipeline.train_models(df)
+    return pipeline
+
+def parity_texts():
+    return load_and_prepare_data()['text'].tolist() + EDGE_CASE_TEXTS
+
+def sklearn_proba(pipeline, processed_texts, model_type):
+    model = pipeline.nb_model if model_type == 'nb' else pipeline.lr_model
+    return model.predict_proba(pipeline.vectorizer.transform(processed_texts))
+
+@pytest.mark.parametrize('model_type', ['nb', 'lr'])
+def test_compiled_probabilities_match_sklearn(pipeline, model_type):
+    scorer = pipeline.compile_scorer()
+    processed_texts = pipeline.text_preprocessor.preprocess(parity_texts())
+
+    expected = sklearn_proba(pipeline, processed_texts, model_type)
+    actual = scorer.predict_proba(processed_texts, model_type)
+    np.testing.assert_allclose(actual, expected, rtol=0, atol=1e-9)
+    assert scorer.classes == [str(label) for label in pipeline.nb_model.classes_]
+
+@pytest.mark.parametrize('model_type', ['nb', 'lr'])
+def test_texts_without_known_words_score_as_priors(pipeline, model_type):
+    scorer = pipeline.compile_scorer()
+    processed_texts = pipeline.text_preprocessor.preprocess(['', 'the and of', 'zyxwv blorptastic'])
+
+    actual = scorer.predict_proba(processed_texts, model_type)
+    np.testing.assert_allclose(actual, sklearn_proba(pipeline, processed_texts, model_type), rtol=0, atol=1e-9)
+    # No features, so every text gets the same bias-only probabilities
+    np.testing.assert_allclose(actual, np.tile(actual[0], (len(actual), 1)), rtol=0, atol=1e-12)
+
+def test_saved_scorer_matches_sklearn(pipeline, tmp_path):
+    path = str(tmp_path / 'scorer.npz')
+    pipeline.export_compiled_scorer(path, parity_texts())
+    scorer = CompiledSentimentScorer.load(path)
+    processed_texts = pipeline.text_preprocessor.preprocess(parity_texts())
+
+    for model_type in ('nb', 'lr'):
+        np.testing.assert_allclose(scorer.predict_proba(processed_texts, model_type),
+                                   sklearn_proba(pipeline, processed_texts, model_type), rtol=0, atol=1e-9)
+        labels = [label for label, _ in scorer.score(processed_texts, model_type)]
+        model = pipeline.nb_model if model_type == 'nb' else pipeline.lr_model
+        assert labels == [str(label) for label in model.predict(pipeline.vectorizer.transform(processed_texts))]
+
+def test_parity_check_rejects_a_wrong_scorer(pipeline):
+    scorer = pipeline.compile_scorer()
+    weights, bias, normalization = scorer.models['lr']
+    scorer.models['lr'] = (weights, bias + np.arange(len(bias)), normalization)
+    with pytest.raises(ValueError):
+        pipeline.check_scorer_parity(scorer, parity_texts())
+
+def test_parity_holds_on_a_larger_vocabulary():
+    # Purely alphabetic tokens: preprocessing strips digits, so 'word1' and
+    # 'word2' would both collapse to 'word'
+    words = [''.join(letters) for letters in islice(product(ascii_lowercase, repeat=3), 3000)]
+    words = [word for word in words if word not in ENGLISH_STOP_WORDS]
+    rng = np.random.RandomState(0)
+    texts = [' '.join(rng.choice(words, rng.randint(1, 15))) for _ in range(2000)]
+    labels = rng.choice(['negative', 'neutral', 'positive'], len(texts))
+    df = pd.DataFrame({'text': texts, 'sentiment': labels})
+    pipeline = SentimentAnalysisPipeline()
+    pipeline.train_models(df)
+
+    # The vectorizer is fitted on the same 80% split train_models makes; every
+    # distinct token in it must survive preprocessing into the vocabulary
+    train_texts, _ = train_test_split(df['processed_text'], test_size=0.2, random_state=42)
+    training_words = {word for text in train_texts for word in text.split()}
+    assert training_words <= set(words)
+    assert len(pipeline.vectorizer.vocabulary_) == len(training_words) > 2500
+
+    scorer = pipeline.compile_scorer()
+    assert len(scorer.vocabulary) == len(pipeline.vectorizer.vocabulary_)
+    processed_texts = pipeline.text_preprocessor.preprocess(texts[:200] + EDGE_CASE_TEXTS)
+    for model_type in ('nb', 'lr'):
+        np.testing.assert_allclose(scorer.predict_proba(processed_texts, model_type),
+                                   sklearn_proba(pipeline, processed_texts, model_type), rtol=0, atol=1e-9)
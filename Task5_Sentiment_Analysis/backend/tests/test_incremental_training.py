@@ -0,0 +1,75 @@
+"""Incremental training must update hashing models and refuse TF-IDF ones.
+
+Run from backend/ with: python -m pytest -q tests
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from sentiment_pipeline import SentimentAnalysisPipeline, bundle_is_incremental
+from sentiment_training import load_and_prepare_data
+
+@pytest.fixture
+def corpus(tmp_path):
+    path = tmp_path / 'corpus.csv'
+    load_and_prepare_data().to_csv(path, index=False)
+    return str(path)
+
+def test_tfidf_model_is_not_replaced(corpus):
+    pipeline = SentimentAnalysisPipeline()
+    pipeline.train_models(load_and_prepare_data())
+    vectorizer, nb_model, lr_model = pipeline.vectorizer, pipeline.nb_model, pipeline.lr_model
+
+    with pytest.raises(ValueError, match='TF-IDF'):
+        pipeline.train_incremental(corpus)
+    assert pipeline.vectorizer is vectorizer
+    assert pipeline.nb_model is nb_model
+    assert pipeline.lr_model is lr_model
+    assert pipeline.training_metadata['mode'] == 'batch'
+
+def test_hashing_model_is_updated_in_place(corpus):
+    pipeline = SentimentAnalysisPipeline()
+    pipeline.train_incremental(corpus, chunk_size=8)
+    nb_model = pipeline.nb_model
+    samples = pipeline.training_metadata['dataset_size']
+
+    pipeline.train_incremental(corpus, chunk_size=8)
+    assert pipeline.nb_model is nb_model
+    assert pipeline.training_metadata['dataset_size'] == 2 * samples
+
+def test_bundle_mode_is_detected(tmp_path):
+    batch = SentimentAnalysisPipeline()
+    batch.train_models(load_and_prepare_data())
+    assert not bundle_is_incremental(batch.save_artifacts(str(tmp_path / 'batch')))
+
+    incremental = SentimentAnalysisPipeline()
+    path = tmp_path / 'corpus.csv'
+    load_and_prepare_data().to_csv(path, index=False)
+    incremental.train_incremental(str(path))
+    assert bundle_is_incremental(incremental.save_artifacts(str(tmp_path / 'incremental')))
+
+def test_incremental_request_on_a_tfidf_bundle_is_rejected(tmp_path, monkeypatch):
+    model_dir = tmp_path / 'models'
+    pipeline = SentimentAnalysisPipeline()
+    pipeline.train_models(load_and_prepare_data())
+    pipeline.save_artifacts(str(model_dir))
+    load_and_prepare_data().to_csv(tmp_path / 'corpus.csv', index=False)
+
+    monkeypatch.setenv('SENTIMENT_MODEL_DIR', str(model_dir))
+    monkeypatch.setenv('SENTIMENT_DATA_ROOT', str(tmp_path))
+    sys.modules.pop('app', None)
+    import app
+    submitted = []
+    monkeypatch.setattr(app.training_jobs, 'submit', lambda options: submitted.append(options) or {})
+
+    client = app.app.test_client()
+    response = client.post('/train', json={'data_path': 'corpus.csv', 'incremental': True})
+    assert response.status_code == 409
+    assert response.get_json()['status'] == 'error'
+    assert submitted == []
+
+    assert client.post('/train', json={'data_path': 'corpus.csv'}).status_code == 202
+    assert len(submitted) == 1
@@ -0,0 +1,45 @@
+"""Every queued prediction must resolve, whatever the batch function does.
+
+Run from backend/ with: python -m pytest -q tests
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from micro_batching import MicroBatcher
+
+def run_batch(score_batch, texts):
+    batcher = MicroBatcher(score_batch, max_batch_size=len(texts), max_wait_ms=200)
+    try:
+        futures = [batcher.submit(text) for text in texts]
+        return [future.exception(timeout=5) or future.result() for future in futures]
+    finally:
+        batcher.close()
+
+def test_results_are_matched_in_order():
+    assert run_batch(lambda texts, model_type: [text.upper() for text in texts], ['a', 'b', 'c']) == ['A', 'B', 'C']
+
+@pytest.mark.parametrize('count', [0, 2, 4])
+def test_wrong_result_count_fails_every_future(count):
+    outcomes = run_batch(lambda texts, model_type: ['x'] * count, ['a', 'b', 'c'])
+    assert all(isinstance(outcome, RuntimeError) for outcome in outcomes)
+
+def test_worker_survives_a_failing_batch():
+    calls = []
+
+    def score_batch(texts, model_type):
+        calls.append(texts)
+        if len(calls) == 1:
+            raise ValueError('boom')
+        return texts
+
+    batcher = MicroBatcher(score_batch, max_batch_size=1, max_wait_ms=1)
+    try:
+        with pytest.raises(ValueError):
+            batcher.predict('a', timeout=5)
+        assert batcher.predict('b', timeout=5) == 'b'
+    finally:
+        batcher.close()
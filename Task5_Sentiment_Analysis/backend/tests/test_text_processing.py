@@ -0,0 +1,58 @@
+"""Parallel featurization must match the vectorizer and reuse its worker pools.
+
+Run from backend/ with: python -m pytest -q tests
+"""
+import os
+import sys
+
+import pytest
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import text_processing
+from text_processing import TextPreprocessor
+
+TEXTS = ['good great movie', 'bad awful plot', 'fine okay acting', 'great plot bad acting'] * 50
+
+@pytest.fixture
+def preprocessor():
+    yield TextPreprocessor(workers=2, chunk_size=40, min_parallel_size=1)
+    with text_processing._pools_lock:
+        for _, pool in text_processing._feature_pools.values():
+            pool.shutdown(wait=True)
+        text_processing._feature_pools.clear()
+
+def pools():
+    return {key: pool for key, (_, pool) in text_processing._feature_pools.items()}
+
+def test_parallel_featurize_matches_transform(preprocessor):
+    vectorizer = TfidfVectorizer().fit(TEXTS)
+    assert abs(preprocessor.featurize(vectorizer, TEXTS) - vectorizer.transform(TEXTS)).max() == 0
+
+def test_alternating_vectorizers_reuse_their_pools(preprocessor):
+    first = TfidfVectorizer().fit(TEXTS)
+    second = TfidfVectorizer(ngram_range=(1, 2)).fit(TEXTS)
+    preprocessor.featurize(first, TEXTS)
+    preprocessor.featurize(second, TEXTS)
+    created = pools()
+    assert len(created) == 2
+
+    for _ in range(3):
+        for vectorizer in (first, second):
+            assert abs(preprocessor.featurize(vectorizer, TEXTS) - vectorizer.transform(TEXTS)).max() == 0
+    assert pools() == created
+
+def test_least_recently_used_pool_is_shut_down(preprocessor):
+    vectorizers = [TfidfVectorizer(max_features=n).fit(TEXTS) for n in range(2, 3 + text_processing.MAX_FEATURE_POOLS)]
+    preprocessor.featurize(vectorizers[0], TEXTS)
+    oldest = next(iter(pools().values()))
+    for vectorizer in vectorizers[1:]:
+        preprocessor.featurize(vectorizer, TEXTS)
+
+    assert len(pools()) == text_processing.MAX_FEATURE_POOLS
+    assert oldest not in pools().values()
+    with pytest.raises(RuntimeError):
+        oldest.submit(len, [])
+    # An evicted vectorizer just gets a new pool
+    assert abs(preprocessor.featurize(vectorizers[0], TEXTS) - vectorizers[0].transform(TEXTS)).max() == 0
@@ -0,0 +1,71 @@
+"""Cancelling a training job must never publish its model.
+
+Run from backend/ with: python -m pytest -q tests
+"""
+from concurrent.futures import ThreadPoolExecutor
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import training_jobs
+from training_jobs import STAGING_DIRNAME, TrainingJobManager
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    release = threading.Event()
+    started = threading.Event()
+
+    def run_training_job(model_dir, options=None):
+        started.set()
+        release.wait(5)
+        bundle_dir = os.path.join(model_dir, STAGING_DIRNAME, 'bundle')
+        os.makedirs(bundle_dir)
+        return {'bundle_dir': bundle_dir, 'model_version': 'bundle'}
+
+    monkeypatch.setattr(training_jobs, 'run_training_job', run_training_job)
+    published = []
+    manager = TrainingJobManager(str(tmp_path), published.append)
+    manager._executor = ThreadPoolExecutor(max_workers=1)
+    manager.published, manager.started, manager.release = published, started, release
+    yield manager
+    release.set()
+    manager._executor.shutdown(wait=True)
+
+def wait_until_finished(manager, job_id):
+    manager._executor.shutdown(wait=True)
+    return manager.get(job_id)
+
+def test_running_job_is_cancelling_until_its_model_is_discarded(manager, tmp_path):
+    job_id = manager.submit()['job_id']
+    assert manager.started.wait(5)
+
+    assert manager.cancel(job_id)['state'] == 'cancelling'
+    assert manager.get(job_id)['state'] == 'cancelling'
+
+    manager.release.set()
+    job = wait_until_finished(manager, job_id)
+    assert job['state'] == 'cancelled'
+    assert manager.published == []
+    assert os.listdir(tmp_path / STAGING_DIRNAME) == []
+    assert not (tmp_path / 'bundle').exists()
+
+def test_queued_job_is_cancelled_at_once(manager):
+    running = manager.submit()['job_id']
+    queued = manager.submit()['job_id']
+    assert manager.cancel(queued)['state'] == 'cancelled'
+
+    manager.release.set()
+    assert wait_until_finished(manager, running)['state'] == 'succeeded'
+    assert len(manager.published) == 1
+
+def test_published_job_stays_succeeded(manager, tmp_path):
+    job_id = manager.submit()['job_id']
+    manager.release.set()
+    wait_until_finished(manager, job_id)
+
+    assert manager.cancel(job_id)['state'] == 'succeeded'
+    assert manager.published == [str(tmp_path / 'bundle')]
@@ -0,0 +1,112 @@
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+import os
+import re
+import threading
+
+_NON_ALPHA = re.compile(r'[^a-zA-Z\s]')
+
+# One worker pool per process and worker count, shared by every pipeline so
+# swapping in a newly trained pipeline never leaks a pool
+_pools = {}
+_pools_lock = threading.Lock()
+
+# Featurizing pools keyed by (worker count, vectorizer identity). Each worker
+# receives its pool's vectorizer once through the pool initializer, so only
+# the text chunks cross the process boundary per call. A few pools are kept
+# so pipelines that alternate (old and new during a hot swap, a training
+# job's parity check) don't rebuild them on every call; beyond
+# MAX_FEATURE_POOLS the least recently used pool is shut down.
+MAX_FEATURE_POOLS = 3
+# key -> (vectorizer, pool); holding the vectorizer keeps its id() unique
+_feature_pools = OrderedDict()
+_worker_vectorizer = None
+
+def preprocess_text(text):
+    """Simple preprocessing without NLTK"""
+    # Convert to lowercase
+    text = text.lower()
+
+    # Remove special characters and digits
+    text = _NON_ALPHA.sub('', text)
+
+    # Remove extra whitespace
+    text = ' '.join(text.split())
+
+    return text
+
+def _preprocess_chunk(texts):
+    return [preprocess_text(text) for text in texts]
+
+def _init_featurize_worker(vectorizer):
+    global _worker_vectorizer
+    _worker_vectorizer = vectorizer
+
+def _transform_chunk(texts):
+    return _worker_vectorizer.transform(texts)
+
+def _get_pool(workers):
+    with _pools_lock:
+        pool = _pools.get(workers)
+        if pool is None:
+            pool = ProcessPoolExecutor(max_workers=workers)
+            _pools[workers] = pool
+        return pool
+
+def _map_features(workers, vectorizer, chunks):
+    """Submit every chunk to the featurizing pool for vectorizer; returns the result iterator"""
+    key = (workers, id(vectorizer))
+    with _pools_lock:
+        entry = _feature_pools.get(key)
+        if entry is None:
+            pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_featurize_worker,
+                                       initargs=(vectorizer,))
+            _feature_pools[key] = (vectorizer, pool)
+            while len(_feature_pools) > MAX_FEATURE_POOLS:
+                _, (_, evicted) = _feature_pools.popitem(last=False)
+                # Calls already submitted to the evicted pool still finish
+                evicted.shutdown(wait=False)
+        else:
+            _feature_pools.move_to_end(key)
+            pool = entry[1]
+        # map() submits every chunk up front, so doing it under the lock
+        # means an eviction can never shut the pool down in between
+        return pool.map(_transform_chunk, chunks)
+
+class TextPreprocessor:
+    """Preprocesses and featurizes large text lists across worker processes"""
+
+    def __init__(self, workers=1, chunk_size=2000, min_parallel_size=10000):
+        self.workers = workers if workers else os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        # Below this many texts the pool round trip costs more than it saves
+        self.min_parallel_size = min_parallel_size
+
+    def _parallel(self, texts):
+        return self.workers > 1 and len(texts) >= self.min_parallel_size
+
+    def _chunks(self, texts):
+        return [texts[start:start + self.chunk_size] for start in range(0, len(texts), self.chunk_size)]
+
+    def preprocess(self, texts):
+        """Apply preprocess_text to every text, preserving order"""
+        texts = list(texts)
+        if not self._parallel(texts):
+            return _preprocess_chunk(texts)
+
+        processed = []
+        for chunk in _get_pool(self.workers).map(_preprocess_chunk, self._chunks(texts)):
+            processed.extend(chunk)
+        return processed
+
+    def featurize(self, vectorizer, processed_texts):
+        """Transform preprocessed texts with a fitted vectorizer, chunk by chunk"""
+        processed_texts = list(processed_texts)
+        if not self._parallel(processed_texts):
+            return vectorizer.transform(processed_texts)
+
+        import scipy.sparse as sp
+
+        chunks = self._chunks(processed_texts)
+        matrices = _map_features(self.workers, vectorizer, chunks)
+        return sp.vstack(list(matrices), format='csr')
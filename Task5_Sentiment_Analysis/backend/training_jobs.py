@@ -0,0 +1,183 @@
+from concurrent.futures import ProcessPoolExecutor
+from collections import OrderedDict
+import os
+import shutil
+import threading
+import time
+import uuid
+
+# Finished jobs kept around for status polling before the oldest are dropped
+MAX_JOB_HISTORY = 100
+STAGING_DIRNAME = '.staging'
+FINISHED_STATES = ('succeeded', 'failed', 'cancelled')
+
+def run_training_job(model_dir, options=None):
+    """Train a fresh pipeline and stage its bundle; runs in a worker process"""
+    from sentiment_pipeline import SentimentAnalysisPipeline
+    from sentiment_training import iter_corpus_chunks
+    import pandas as pd
+
+    options = options or {}
+    data_path = options.get('data_path')
+    chunk_size = options.get('chunk_size', 10000)
+    pipeline = SentimentAnalysisPipeline(
+        preprocess_workers=options.get('preprocess_workers', 1),
+        preprocess_chunk_size=options.get('preprocess_chunk_size', 2000)
+    )
+
+    if options.get('incremental'):
+        # Fold new labels into the current model rather than refitting. The
+        # bundle is loaded without mmap because partial_fit updates arrays in place.
+        pipeline.load_latest_artifacts(model_dir, mmap=False)
+        results = pipeline.train_incremental(data_path, chunk_size=chunk_size)
+        dataset_size = results['samples']
+    else:
+        if data_path:
+            df = pd.concat(iter_corpus_chunks(data_path, chunk_size), ignore_index=True)
+        else:
+            df = pipeline.load_and_prepare_data()
+        results = pipeline.train_models(df)
+        dataset_size = len(df)
+
+    # Bundles are staged under a hidden directory and only published to
+    # model_dir once the parent accepts them, so a cancelled job leaves no trace
+    bundle_dir = pipeline.save_artifacts(os.path.join(model_dir, STAGING_DIRNAME))
+
+    return {
+        'bundle_dir': bundle_dir,
+        'model_version': pipeline.model_version,
+        'naive_bayes_accuracy': _optional_float(results['nb_accuracy']),
+        'logistic_regression_accuracy': _optional_float(results['lr_accuracy']),
+        'dataset_size': dataset_size
+    }
+
+def _optional_float(value):
+    return None if value is None else float(value)
+
+class TrainingJobManager:
+    """Runs training jobs on a process pool and publishes finished models"""
+
+    def __init__(self, model_dir, on_model_ready, max_workers=1):
+        self.model_dir = model_dir
+        self.on_model_ready = on_model_ready
+        self.max_workers = max_workers
+        self.jobs = OrderedDict()
+        self._futures = {}
+        self._executor = None
+        self._lock = threading.Lock()
+        # Held while a finished job is published or discarded
+        self._publish_lock = threading.Lock()
+
+    def _get_executor(self):
+        # Created lazily so importing the app never forks worker processes
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._executor
+
+    def submit(self, options=None):
+        """Queue a training job and return its status record"""
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            job = {
+                'job_id': job_id,
+                'state': 'queued',
+                'options': options or {},
+                'submitted_at': time.time(),
+                'finished_at': None,
+                'cancel_requested': False,
+                'results': None,
+                'error': None
+            }
+            self.jobs[job_id] = job
+            self._trim_history()
+
+            future = self._get_executor().submit(run_training_job, self.model_dir, options)
+            self._futures[job_id] = future
+
+        future.add_done_callback(lambda f: self._on_job_done(job_id, f))
+        return self.get(job_id)
+
+    def get(self, job_id):
+        """Return a snapshot of a job's status, or None for unknown ids"""
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return None
+            future = self._futures.get(job_id)
+            if job['state'] == 'queued' and future is not None and future.running():
+                job['state'] = 'running'
+            return dict(job)
+
+    def cancel(self, job_id):
+        """Cancel a job
+
+        A queued job is dropped at once. A running job can't be interrupted,
+        so it moves to 'cancelling' and becomes 'cancelled' only once its
+        staged model has been discarded; a job whose model was already
+        published stays 'succeeded'.
+        """
+        # Taken with the publish lock so a job is either published or
+        # cancelled, never both
+        with self._publish_lock, self._lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return None
+            if job['state'] in FINISHED_STATES:
+                return dict(job)
+
+            job['cancel_requested'] = True
+            job['state'] = 'cancelling'
+            future = self._futures.get(job_id)
+
+        # A pending future is dropped from the queue outright and its done
+        # callback records the cancellation
+        if future is not None:
+            future.cancel()
+        return self.get(job_id)
+
+    def _on_job_done(self, job_id, future):
+        with self._lock:
+            job = self.jobs.get(job_id)
+            self._futures.pop(job_id, None)
+        if job is None:
+            return
+
+        with self._publish_lock:
+            state, results, error = 'succeeded', None, None
+            if future.cancelled():
+                state = 'cancelled'
+            elif future.exception() is not None:
+                state, error = 'failed', str(future.exception())
+            else:
+                results = future.result()
+                staged_dir = results.pop('bundle_dir')
+                # cancel() sets the flag under the publish lock, so this check
+                # and the swap below can't interleave with it
+                if job['cancel_requested']:
+                    shutil.rmtree(staged_dir, ignore_errors=True)
+                    state = 'cancelled'
+                else:
+                    try:
+                        bundle_dir = os.path.join(self.model_dir, os.path.basename(staged_dir))
+                        os.rename(staged_dir, bundle_dir)
+                        self.on_model_ready(bundle_dir)
+                    except Exception as e:
+                        state, error = 'failed', str(e)
+
+            with self._lock:
+                job['state'] = state
+                job['results'] = results if state == 'succeeded' else None
+                job['error'] = error
+                job['finished_at'] = time.time()
+
+    def _trim_history(self):
+        # Only finished jobs are evicted; queued and running jobs stay visible
+        finished = [job_id for job_id, job in self.jobs.items()
+                    if job['state'] in FINISHED_STATES]
+        for job_id in finished[:max(0, len(self.jobs) - MAX_JOB_HISTORY)]:
+            del self.jobs[job_id]
+
+    def shutdown(self):
+        """Stop the worker pool, cancelling jobs that have not started"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
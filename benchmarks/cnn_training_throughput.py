@@ -0,0 +1,135 @@
+"""Training throughput benchmark for the Task 4 CNN.
+
+Trains CNNClassifier on synthetic CIFAR-shaped uint8 data through the
+tf.data input pipeline and reports images/sec for the default float32 graph
+(the baseline) and for each part of the opt-in performance mode: XLA
+(jit_compile), mixed bfloat16, and both together. Every configuration runs in
+a fresh interpreter, because the precision policy and TensorFlow's thread
+pools are process-wide. Steps before --warmup-steps (which include tracing
+and XLA compilation) are excluded from the timing.
+
+    python benchmarks/cnn_training_throughput.py --steps 200 --intra-op 8 --inter-op 2 --output cnn.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Task4_Image_Classification', 'src')
+
+# name -> (mixed_precision, jit_compile)
+CONFIGS = {
+    'baseline': (False, False),
+    'xla': (False, True),
+    'bf16': (True, False),
+    'bf16+xla': (True, True),
+}
+
+# Runs inside a fresh interpreter; prints one JSON line of results
+CHILD_SCRIPT = r'''
+import json, sys, time
+import numpy as np
+config = json.loads(sys.argv[1])
+from model import CNNClassifier, bfloat16_supported, configure_threading
+threads = configure_threading(config['intra_op_threads'], config['inter_op_threads'])
+import keras
+from data_preprocessing import DataPreprocessor
+
+rng = np.random.RandomState(config['seed'])
+n_images = config['batch_size'] * config['steps']
+images = rng.randint(0, 256, size=(n_images, 32, 32, 3), dtype=np.uint8)
+labels = rng.randint(0, 10, size=n_images).astype('int32')
+dataset = DataPreprocessor().make_dataset(images, labels, batch_size=config['batch_size'], training=True,
+                                          shuffle_buffer=1000, seed=config['seed'])
+
+classifier = CNNClassifier()
+model = classifier.build_model(mixed_precision=config['mixed_precision'])
+classifier.compile_model(sparse_labels=True, jit_compile=config['jit_compile'])
+
+class StepTimer(keras.callbacks.Callback):
+    def on_train_batch_end(self, batch, logs=None):
+        times.append(time.perf_counter())
+
+times = []
+start = time.perf_counter()
+history = model.fit(dataset, epochs=1, verbose=0, callbacks=[StepTimer()])
+warmup = config['warmup_steps']
+timed_steps = len(times) - warmup - 1
+elapsed = times[-1] - times[warmup]
+print(json.dumps({
+    'precision': classifier.precision,
+    'bf16_supported': bfloat16_supported(),
+    'jit_compile': config['jit_compile'],
+    'threads': {'intra_op': threads[0], 'inter_op': threads[1]},
+    'images_per_sec': timed_steps * config['batch_size'] / elapsed,
+    'step_ms': elapsed / timed_steps * 1000,
+    'first_steps_s': times[warmup] - start,
+    'final_loss': float(history.history['loss'][-1])
+}))
+'''
+
+def run_config(name, args):
+    mixed_precision, jit_compile = CONFIGS[name]
+    config = {
+        'mixed_precision': mixed_precision,
+        'jit_compile': jit_compile,
+        # The baseline keeps TensorFlow's default thread pools
+        'intra_op_threads': None if name == 'baseline' else args.intra_op,
+        'inter_op_threads': None if name == 'baseline' else args.inter_op,
+        'batch_size': args.batch_size,
+        'steps': args.steps,
+        'warmup_steps': args.warmup_steps,
+        'seed': args.seed
+    }
+    result = subprocess.run(
+        [sys.executable, '-c', CHILD_SCRIPT, json.dumps(config)], cwd=SRC_DIR,
+        check=True, capture_output=True, text=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def summarize(runs):
+    summary = dict(runs[0])
+    for key in ('images_per_sec', 'step_ms', 'first_steps_s'):
+        values = [run[key] for run in runs]
+        summary[key] = {'median': statistics.median(values), 'min': min(values), 'max': max(values)}
+    return summary
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--configs', nargs='+', choices=list(CONFIGS), default=list(CONFIGS))
+    parser.add_argument('--batch-size', type=int, default=128)
+    parser.add_argument('--steps', type=int, default=100, help='training steps per run')
+    parser.add_argument('--warmup-steps', type=int, default=10, help='leading steps excluded from timing')
+    parser.add_argument('--runs', type=int, default=1, help='fresh processes per configuration')
+    parser.add_argument('--intra-op', type=int, default=None, help='intra-op threads for non-baseline configs')
+    parser.add_argument('--inter-op', type=int, default=None, help='inter-op threads for non-baseline configs')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='write results as JSON to this path')
+    args = parser.parse_args()
+    if args.steps <= args.warmup_steps + 1:
+        parser.error('--steps must be larger than --warmup-steps + 1')
+
+    results = {}
+    for name in args.configs:
+        print(f"Running {name}...")
+        results[name] = summarize([run_config(name, args) for _ in range(args.runs)])
+
+    baseline = results.get('baseline')
+    print(f"\n{'config':10s} {'precision':15s} {'images/s':>10s} {'step ms':>9s} {'warmup s':>9s} {'speedup':>8s}")
+    for name, summary in results.items():
+        speed = summary['images_per_sec']['median']
+        speedup = f"{speed / baseline['images_per_sec']['median']:.2f}x" if baseline else '-'
+        print(f"{name:10s} {summary['precision']:15s} {speed:10.1f} {summary['step_ms']['median']:9.1f} "
+              f"{summary['first_steps_s']['median']:9.2f} {speedup:>8s}")
+    if any(CONFIGS[name][0] for name in results) and not next(iter(results.values()))['bf16_supported']:
+        print("\nNote: this CPU has no native bfloat16 support, so bf16 configs ran in float32")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to: {args.output}")
+
+if __name__ == '__main__':
+    main()
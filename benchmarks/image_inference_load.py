@@ -0,0 +1,241 @@
+"""Load benchmark for the Task 4 CNN image classification API.
+
+Starts serve.py as a real HTTP server on localhost, drives POST /predict
+with a fixed number of concurrent clients uploading synthetic PNG images
+(multipart, several images per request), and reports images/sec,
+requests/sec, p50/p95/p99 latency, the error rate and the server's
+micro-batching counters. Without --model-path an untrained CNNClassifier is
+saved to a temporary file: the weights don't change the serving cost.
+
+    python benchmarks/image_inference_load.py --concurrency 16 --images-mix 1:0.8,8:0.2 --output cnn_serving.json
+    python benchmarks/image_inference_load.py --env CNN_MAX_BATCH_SIZE=1   # micro-batching off, for comparison
+"""
+import argparse
+import http.client
+import io
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+TASK_DIR = os.path.join(BENCHMARK_DIR, '..', 'Task4_Image_Classification')
+
+sys.path.insert(0, BENCHMARK_DIR)
+from load_test import parse_mix, percentile
+
+def save_untrained_model(path):
+    """Build the default CNNClassifier and save it without training"""
+    script = (
+        'from model import CNNClassifier\n'
+        'classifier = CNNClassifier()\n'
+        'classifier.build_model()\n'
+        f'classifier.save_model({path!r})\n'
+    )
+    subprocess.run([sys.executable, '-c', script], cwd=os.path.join(TASK_DIR, 'src'), check=True,
+                   stdout=subprocess.DEVNULL)
+
+def make_images(count, sizes, seed):
+    """Encode count random-noise PNGs with side lengths drawn from sizes"""
+    from PIL import Image
+
+    rng = np.random.RandomState(seed)
+    images = []
+    for _ in range(count):
+        side = sizes[rng.randint(len(sizes))]
+        buffer = io.BytesIO()
+        Image.fromarray(rng.randint(0, 256, size=(side, side, 3), dtype=np.uint8)).save(buffer, format='PNG')
+        images.append(buffer.getvalue())
+    return images
+
+def multipart_body(images, boundary):
+    parts = []
+    for i, data in enumerate(images):
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="images"; filename="image{i}.png"\r\n'
+            f'Content-Type: image/png\r\n\r\n'.encode() + data + b'\r\n'
+        )
+    parts.append(f'--{boundary}--\r\n'.encode())
+    return b''.join(parts)
+
+class Server:
+    """serve.py in a child process"""
+
+    def __init__(self, env, port, startup_timeout=120.0):
+        self.port = port
+        self.process = subprocess.Popen(
+            [sys.executable, '-c', f"import serve; serve.app.run(host='127.0.0.1', port={port}, threaded=True)"],
+            cwd=TASK_DIR, env=dict(os.environ, **env), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        deadline = time.monotonic() + startup_timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"serve.py exited with status {self.process.returncode}")
+            try:
+                if self.get('/')[0] == 200:
+                    return
+            except OSError:
+                pass
+            time.sleep(0.5)
+        self.stop()
+        raise RuntimeError(f"serve.py did not start within {startup_timeout:.0f}s")
+
+    def get(self, path):
+        connection = http.client.HTTPConnection('127.0.0.1', self.port, timeout=5)
+        connection.request('GET', path)
+        response = connection.getresponse()
+        return response.status, response.read()
+
+    def memory_high_water_mb(self):
+        with open(f'/proc/{self.process.pid}/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024.0
+        return None
+
+    def stop(self):
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+
+def run_load(server, images, args, images_mix):
+    """Drive /predict with args.concurrency clients and summarize the run"""
+    start = time.monotonic()
+    measure_from = start + args.warmup
+    stop_at = measure_from + args.duration
+    latencies = []
+    counts = {'requests': 0, 'errors': 0, 'images': 0}
+    lock = threading.Lock()
+
+    def worker(seed):
+        rng = random.Random(seed)
+        connection = http.client.HTTPConnection('127.0.0.1', server.port, timeout=60)
+        boundary = f'benchmark{seed}'
+        headers = {'Content-Type': f'multipart/form-data; boundary={boundary}'}
+        local_latencies = []
+        requests = errors = n_images = 0
+        while True:
+            batch = rng.sample(images, rng.choices(*images_mix)[0])
+            body = multipart_body(batch, boundary)
+            sent = time.monotonic()
+            if sent >= stop_at:
+                break
+            try:
+                connection.request('POST', f'/predict?top_k={args.top_k}', body=body, headers=headers)
+                response = connection.getresponse()
+                response.read()
+                ok = response.status == 200
+            except Exception:
+                ok = False
+                connection.close()
+            if sent < measure_from:
+                continue
+            requests += 1
+            if ok:
+                local_latencies.append(time.monotonic() - sent)
+                n_images += len(batch)
+            else:
+                errors += 1
+        with lock:
+            latencies.extend(local_latencies)
+            counts['requests'] += requests
+            counts['errors'] += errors
+            counts['images'] += n_images
+
+    threads = [threading.Thread(target=worker, args=(args.seed + i,)) for i in range(args.concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = max(time.monotonic(), stop_at) - measure_from
+
+    latencies.sort()
+    return {
+        'requests': counts['requests'],
+        'errors': counts['errors'],
+        'error_rate': counts['errors'] / counts['requests'] if counts['requests'] else 0.0,
+        'throughput_rps': (counts['requests'] - counts['errors']) / elapsed,
+        'images_per_s': counts['images'] / elapsed,
+        'latency_ms': {
+            'p50': percentile(latencies, 0.50) * 1000 if latencies else None,
+            'p95': percentile(latencies, 0.95) * 1000 if latencies else None,
+            'p99': percentile(latencies, 0.99) * 1000 if latencies else None,
+            'mean': sum(latencies) / len(latencies) * 1000 if latencies else None
+        },
+        'memory_high_water_mb': server.memory_high_water_mb()
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--model-path', help='saved model to serve (default: an untrained CNNClassifier)')
+    parser.add_argument('--concurrency', type=int, default=8, help='concurrent clients')
+    parser.add_argument('--duration', type=float, default=10.0, help='measured seconds')
+    parser.add_argument('--warmup', type=float, default=2.0, help='unmeasured seconds before measuring')
+    parser.add_argument('--images-mix', default='1:0.8,8:0.15,32:0.05',
+                        help='images per request and weights')
+    parser.add_argument('--image-sizes', default='32,64,224', help='side lengths of the uploaded images')
+    parser.add_argument('--pool', type=int, default=256, help='distinct synthetic images to upload')
+    parser.add_argument('--top-k', type=int, default=5)
+    parser.add_argument('--env', action='append', default=[], metavar='KEY=VALUE',
+                        help='environment for serve.py, e.g. CNN_MAX_WAIT_MS=2')
+    parser.add_argument('--port', type=int, default=18090)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='write results as JSON to this path')
+    args = parser.parse_args()
+
+    images_mix = parse_mix(args.images_mix)
+    if max(images_mix[0]) > args.pool:
+        parser.error('--pool must be at least the largest request size in --images-mix')
+    images = make_images(args.pool, [int(size) for size in args.image_sizes.split(',')], args.seed)
+    env = dict(item.split('=', 1) for item in args.env)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        model_path = os.path.abspath(args.model_path) if args.model_path else os.path.join(tmp_dir, 'cnn_model.h5')
+        if not args.model_path:
+            print("Saving an untrained model...")
+            save_untrained_model(model_path)
+        env['CNN_MODEL_PATH'] = model_path
+
+        print("Starting serve.py...")
+        server = Server(env, args.port)
+        try:
+            result = run_load(server, images, args, images_mix)
+            result['batching'] = json.loads(server.get('/model_info')[1])['info']['batching']
+        finally:
+            server.stop()
+
+    results = {
+        'meta': {
+            'concurrency': args.concurrency,
+            'duration_s': args.duration,
+            'images_mix': args.images_mix,
+            'image_sizes': args.image_sizes,
+            'env': env,
+            'cpu_count': os.cpu_count()
+        },
+        'result': result
+    }
+
+    latency = result['latency_ms']
+    print(f"\nimages/s {result['images_per_s']:.1f}, requests/s {result['throughput_rps']:.1f}, "
+          f"errors {result['error_rate']:.2%}")
+    if latency['p50'] is not None:
+        print(f"latency ms p50 {latency['p50']:.1f}, p95 {latency['p95']:.1f}, p99 {latency['p99']:.1f}")
+    print(f"mean micro-batch size {result['batching']['mean_batch_size']:.1f} "
+          f"over {result['batching']['batches']} batches")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to: {args.output}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,399 @@
+"""Load test and latency benchmark for the sentiment and churn APIs.
+
+Drives the sentiment /predict and /batch_predict endpoints and the churn
+/predict and /predict/batch endpoints with a fixed number of concurrent
+clients for a fixed duration, then reports throughput, p50/p95/p99 latency,
+error rate and the memory high-water mark of the process serving requests.
+
+The apps run either in-process (Flask test client / FastAPI TestClient, so
+no sockets are involved) or as real servers on localhost:
+
+    python benchmarks/load_test.py --mode inprocess --duration 10 --output run.json
+    python benchmarks/load_test.py --mode server --concurrency 16 \\
+        --batch-mix 10:0.7,100:0.25,1000:0.05 --baseline baseline.json --tolerance 0.2
+
+Results are written as JSON. With --baseline the run is compared against a
+previous results file and the script exits with status 1 if throughput
+drops, latency or memory grows, or the error rate rises beyond tolerance.
+"""
+import argparse
+import http.client
+import importlib.util
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.join(BENCHMARK_DIR, '..')
+SERVICE_DIRS = {
+    'sentiment': os.path.join(REPO_ROOT, 'Task5_Sentiment_Analysis', 'backend'),
+    'churn': os.path.join(REPO_ROOT, 'Task3_Customer_Churn', 'ml-backend')
+}
+
+WORDS = ("love great amazing terrible awful okay decent product service support quality "
+         "experience delivery price fast slow broken happy disappointed recommend never "
+         "again excellent poor average team app crashes features waiting money").split()
+
+CHURN_CHOICES = {
+    'gender': ['Male', 'Female'],
+    'internet_service': ['DSL', 'Fiber optic', 'No'],
+    'contract': ['Month-to-month', 'One year', 'Two year'],
+    'payment_method': ['Electronic check', 'Mailed check', 'Bank transfer (automatic)', 'Credit card (automatic)'],
+    'paperless_billing': ['Yes', 'No'],
+    'tech_support': ['Yes', 'No'],
+    'online_backup': ['Yes', 'No']
+}
+
+def parse_mix(spec):
+    """Parse 'value:weight,value:weight' into ([values], [weights])"""
+    values, weights = [], []
+    for part in spec.split(','):
+        value, _, weight = part.partition(':')
+        values.append(int(value))
+        weights.append(float(weight) if weight else 1.0)
+    return values, weights
+
+def random_text(rng, text_mix):
+    n_words = rng.choices(*text_mix)[0]
+    return ' '.join(rng.choice(WORDS) for _ in range(n_words))
+
+def random_customer(rng):
+    customer = {field: rng.choice(choices) for field, choices in CHURN_CHOICES.items()}
+    customer['age'] = rng.randint(18, 80)
+    customer['tenure'] = rng.randint(0, 72)
+    customer['monthly_charges'] = round(rng.uniform(20, 120), 2)
+    customer['total_charges'] = round(customer['monthly_charges'] * max(customer['tenure'], 1), 2)
+    return customer
+
+# Each payload builder returns (JSON body, number of items scored)
+def sentiment_predict_payload(rng, mixes):
+    return {'text': random_text(rng, mixes['text']), 'model': 'nb'}, 1
+
+def sentiment_batch_payload(rng, mixes):
+    size = rng.choices(*mixes['batch'])[0]
+    return {'texts': [random_text(rng, mixes['text']) for _ in range(size)], 'model': 'nb'}, size
+
+def churn_predict_payload(rng, mixes):
+    return random_customer(rng), 1
+
+def churn_batch_payload(rng, mixes):
+    size = rng.choices(*mixes['batch'])[0]
+    customers = [random_customer(rng) for _ in range(size)]
+    return {field: [customer[field] for customer in customers] for field in customers[0]}, size
+
+TARGETS = {
+    'sentiment-predict': {'service': 'sentiment', 'path': '/predict', 'payload': sentiment_predict_payload},
+    'sentiment-batch': {'service': 'sentiment', 'path': '/batch_predict', 'payload': sentiment_batch_payload},
+    'churn-predict': {'service': 'churn', 'path': '/predict', 'payload': churn_predict_payload},
+    'churn-batch': {'service': 'churn', 'path': '/predict/batch', 'payload': churn_batch_payload}
+}
+
+class InProcessService:
+    """Imports a service's app.py into this process and calls it without sockets"""
+
+    def __init__(self, name, env):
+        self.name = name
+        os.environ.update(env)
+        service_dir = os.path.abspath(SERVICE_DIRS[name])
+        sys.path.insert(0, service_dir)
+        # Both services name their module app.py, so load each under its own name
+        spec = importlib.util.spec_from_file_location(f'{name}_app', os.path.join(service_dir, 'app.py'))
+        self.module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(self.module)
+
+    def client(self):
+        if self.name == 'sentiment':
+            flask_client = self.module.app.test_client()
+            return lambda path, body: flask_client.post(path, json=body).status_code
+        from fastapi.testclient import TestClient
+        test_client = TestClient(self.module.app)
+        return lambda path, body: test_client.post(path, json=body).status_code
+
+    def memory_high_water_mb(self):
+        # ru_maxrss is in KiB on Linux; covers the harness as well as the app
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+    def stop(self):
+        pass
+
+class ServerService:
+    """Runs a service as a real HTTP server on localhost in a child process"""
+
+    def __init__(self, name, env, port, startup_timeout=60.0):
+        self.name = name
+        self.port = port
+        if name == 'sentiment':
+            command = [sys.executable, '-c',
+                       f"import app; app.app.run(host='127.0.0.1', port={port}, threaded=True)"]
+        else:
+            command = [sys.executable, '-m', 'uvicorn', 'app:app', '--host', '127.0.0.1',
+                       '--port', str(port), '--log-level', 'warning']
+        self.process = subprocess.Popen(
+            command, cwd=SERVICE_DIRS[name], env=dict(os.environ, **env),
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        self._wait_until_ready(startup_timeout)
+
+    def _wait_until_ready(self, timeout):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"{self.name} server exited with status {self.process.returncode}")
+            try:
+                connection = http.client.HTTPConnection('127.0.0.1', self.port, timeout=1)
+                connection.request('GET', '/')
+                if connection.getresponse().status == 200:
+                    return
+            except OSError:
+                pass
+            time.sleep(0.2)
+        self.stop()
+        raise RuntimeError(f"{self.name} server did not start within {timeout:.0f}s")
+
+    def client(self):
+        # One keep-alive connection per client thread
+        connection = http.client.HTTPConnection('127.0.0.1', self.port, timeout=60)
+        headers = {'Content-Type': 'application/json'}
+
+        def post(path, body):
+            connection.request('POST', path, body=json.dumps(body), headers=headers)
+            response = connection.getresponse()
+            response.read()
+            return response.status
+        return post
+
+    def memory_high_water_mb(self):
+        with open(f'/proc/{self.process.pid}/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024.0
+        return None
+
+    def stop(self):
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+def run_target(name, service, args, mixes):
+    """Drive one endpoint with args.concurrency clients and summarize the run"""
+    target = TARGETS[name]
+    start = time.monotonic()
+    measure_from = start + args.warmup
+    stop_at = measure_from + args.duration
+    latencies = []
+    counts = {'requests': 0, 'errors': 0, 'items': 0}
+    lock = threading.Lock()
+
+    def worker(seed):
+        rng = random.Random(seed)
+        post = service.client()
+        local_latencies = []
+        requests = errors = items = 0
+        while True:
+            body, n_items = target['payload'](rng, mixes)
+            sent = time.monotonic()
+            if sent >= stop_at:
+                break
+            try:
+                ok = 200 <= post(target['path'], body) < 300
+            except Exception:
+                ok = False
+            if sent < measure_from:
+                continue
+            requests += 1
+            if ok:
+                local_latencies.append(time.monotonic() - sent)
+                items += n_items
+            else:
+                errors += 1
+        with lock:
+            latencies.extend(local_latencies)
+            counts['requests'] += requests
+            counts['errors'] += errors
+            counts['items'] += items
+
+    threads = [threading.Thread(target=worker, args=(args.seed + i,)) for i in range(args.concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # Requests still in flight at stop_at finish late; count the real window
+    elapsed = max(time.monotonic(), stop_at) - measure_from
+
+    latencies.sort()
+    latency_ms = {
+        'p50': percentile(latencies, 0.50),
+        'p95': percentile(latencies, 0.95),
+        'p99': percentile(latencies, 0.99),
+        'mean': sum(latencies) / len(latencies) if latencies else None,
+        'max': latencies[-1] if latencies else None
+    }
+    return {
+        'requests': counts['requests'],
+        'errors': counts['errors'],
+        'error_rate': counts['errors'] / counts['requests'] if counts['requests'] else 0.0,
+        'throughput_rps': (counts['requests'] - counts['errors']) / elapsed,
+        'items_per_s': counts['items'] / elapsed,
+        'latency_ms': {key: value * 1000 if value is not None else None for key, value in latency_ms.items()},
+        'memory_high_water_mb': service.memory_high_water_mb()
+    }
+
+# (metric path, True if higher is better)
+COMPARED_METRICS = [
+    ('throughput_rps', True),
+    ('latency_ms.p50', False),
+    ('latency_ms.p95', False),
+    ('latency_ms.p99', False),
+    ('memory_high_water_mb', False)
+]
+
+def _metric(result, path):
+    value = result
+    for key in path.split('.'):
+        value = value.get(key) if isinstance(value, dict) else None
+    return value
+
+def compare_to_baseline(results, baseline, tolerance):
+    """Return a list of regression messages; empty if the run is within tolerance"""
+    regressions = []
+    for name, current in results['targets'].items():
+        previous = baseline.get('targets', {}).get(name)
+        if previous is None:
+            print(f"  {name}: not in baseline, skipped")
+            continue
+        for path, higher_is_better in COMPARED_METRICS:
+            now, before = _metric(current, path), _metric(previous, path)
+            if now is None or not before:
+                continue
+            change = (now - before) / before
+            worse = change < -tolerance if higher_is_better else change > tolerance
+            print(f"  {name:18s} {path:22s} {before:10.2f} -> {now:10.2f} ({change:+.1%})"
+                  f"{'  REGRESSION' if worse else ''}")
+            if worse:
+                regressions.append(f"{name} {path}: {before:.2f} -> {now:.2f} ({change:+.1%})")
+        # Error rates are usually zero, so compare them absolutely
+        if current['error_rate'] > previous.get('error_rate', 0.0) + 0.01:
+            regressions.append(f"{name} error_rate: {previous.get('error_rate', 0.0):.2%} -> {current['error_rate']:.2%}")
+    return regressions
+
+def train_sentiment_bundle(model_dir):
+    sys.path.insert(0, BENCHMARK_DIR)
+    from sentiment_startup import train_bundle
+    train_bundle(model_dir)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--mode', choices=['inprocess', 'server'], default='inprocess')
+    parser.add_argument('--targets', default=','.join(TARGETS), help='comma-separated subset of: ' + ', '.join(TARGETS))
+    parser.add_argument('--concurrency', type=int, default=8, help='concurrent clients per target')
+    parser.add_argument('--duration', type=float, default=10.0, help='measured seconds per target')
+    parser.add_argument('--warmup', type=float, default=2.0, help='unmeasured seconds before each target')
+    parser.add_argument('--batch-mix', default='10:0.7,100:0.25,1000:0.05',
+                        help='batch sizes and weights for the batch endpoints')
+    parser.add_argument('--text-mix', default='5:0.6,30:0.3,200:0.1',
+                        help='words per text and weights for sentiment payloads')
+    parser.add_argument('--env', action='append', default=[], metavar='KEY=VALUE',
+                        help='environment for the services, e.g. SENTIMENT_COMPILED_SCORER=1')
+    parser.add_argument('--sentiment-model-dir', help='bundle directory to serve (default: train a sample bundle)')
+    parser.add_argument('--port', type=int, default=18080, help='first localhost port in server mode')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='write results as JSON to this path')
+    parser.add_argument('--baseline', help='results JSON to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed relative change vs baseline')
+    args = parser.parse_args()
+
+    names = [name.strip() for name in args.targets.split(',') if name.strip()]
+    unknown = [name for name in names if name not in TARGETS]
+    if unknown:
+        parser.error(f"unknown targets: {', '.join(unknown)}")
+    mixes = {'batch': parse_mix(args.batch_mix), 'text': parse_mix(args.text_mix)}
+    env = dict(item.split('=', 1) for item in args.env)
+
+    results = {
+        'meta': {
+            'mode': args.mode,
+            'concurrency': args.concurrency,
+            'duration_s': args.duration,
+            'warmup_s': args.warmup,
+            'batch_mix': args.batch_mix,
+            'text_mix': args.text_mix,
+            'env': env,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'started_at': time.strftime('%Y-%m-%dT%H:%M:%S')
+        },
+        'targets': {}
+    }
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        services = {}
+        try:
+            for name in names:
+                service_name = TARGETS[name]['service']
+                if service_name not in services:
+                    service_env = dict(env)
+                    if service_name == 'sentiment':
+                        if args.sentiment_model_dir:
+                            model_dir = os.path.abspath(args.sentiment_model_dir)
+                        else:
+                            print("Training a sample sentiment model bundle...")
+                            model_dir = tmp_dir
+                            train_sentiment_bundle(model_dir)
+                        service_env['SENTIMENT_MODEL_DIR'] = model_dir
+                    if args.mode == 'server':
+                        services[service_name] = ServerService(service_name, service_env, args.port + len(services))
+                    else:
+                        services[service_name] = InProcessService(service_name, service_env)
+
+                print(f"Running {name} for {args.duration:.0f}s with {args.concurrency} clients...")
+                result = run_target(name, services[service_name], args, mixes)
+                results['targets'][name] = result
+                latency = result['latency_ms']
+                print(f"  {result['throughput_rps']:9.1f} req/s  {result['items_per_s']:10.1f} items/s  "
+                      f"p50 {latency['p50'] or 0:7.2f} ms  p95 {latency['p95'] or 0:7.2f} ms  "
+                      f"p99 {latency['p99'] or 0:7.2f} ms  errors {result['errors']}  "
+                      f"memory {result['memory_high_water_mb'] or 0:.0f} MB")
+        finally:
+            for service in services.values():
+                service.stop()
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to: {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        print(f"\nComparing against {args.baseline} (tolerance {args.tolerance:.0%}):")
+        for key in ('mode', 'concurrency', 'duration_s', 'batch_mix', 'text_mix', 'env'):
+            if baseline.get('meta', {}).get(key) != results['meta'][key]:
+                print(f"  warning: baseline {key} was {baseline.get('meta', {}).get(key)!r}, "
+                      f"this run used {results['meta'][key]!r}")
+        regressions = compare_to_baseline(results, baseline, args.tolerance)
+        if regressions:
+            print("\nRegressions:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print("\nNo regressions.")
+
+if __name__ == '__main__':
+    main()
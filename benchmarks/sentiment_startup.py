@@ -0,0 +1,103 @@
+"""Cold-start benchmark for the sentiment backend.
+
+Measures, in fresh interpreters, how long it takes to import the pipeline
+module, import the Flask app (which loads the newest model bundle), and
+serve the first /predict request, for both the sklearn and the compiled
+scorer serving paths. Also records whether sklearn/pandas were imported.
+
+    python benchmarks/sentiment_startup.py --runs 5 --output startup.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Task5_Sentiment_Analysis', 'backend')
+
+# Runs inside a fresh interpreter; prints one JSON line of timings
+CHILD_SCRIPT = r'''
+import json, sys, time
+start = time.perf_counter()
+import sentiment_pipeline
+pipeline_import = time.perf_counter() - start
+import app
+app_import = time.perf_counter() - start
+response = app.app.test_client().post('/predict', json={'text': 'I love this product'})
+first_prediction = time.perf_counter() - start
+assert response.status_code == 200, response.get_json()
+print(json.dumps({
+    'pipeline_import_s': pipeline_import,
+    'app_import_s': app_import,
+    'time_to_first_prediction_s': first_prediction,
+    'sklearn_imported': 'sklearn' in sys.modules,
+    'pandas_imported': 'pandas' in sys.modules
+}))
+'''
+
+def train_bundle(model_dir):
+    """Train and save a bundle with the sample dataset"""
+    script = (
+        'from sentiment_pipeline import SentimentAnalysisPipeline\n'
+        'pipeline = SentimentAnalysisPipeline()\n'
+        'pipeline.train_models(pipeline.load_and_prepare_data())\n'
+        f'pipeline.save_artifacts({model_dir!r})\n'
+    )
+    subprocess.run([sys.executable, '-c', script], cwd=BACKEND_DIR, check=True, stdout=subprocess.DEVNULL)
+
+def run_once(model_dir, compiled):
+    env = dict(os.environ, SENTIMENT_MODEL_DIR=model_dir, SENTIMENT_COMPILED_SCORER='1' if compiled else '0')
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, '-c', CHILD_SCRIPT], cwd=BACKEND_DIR, env=env,
+        check=True, capture_output=True, text=True
+    )
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    # Includes interpreter startup, which the in-process timers cannot see
+    timings['process_wall_s'] = time.perf_counter() - start
+    return timings
+
+def summarize(runs):
+    summary = {}
+    for key, value in runs[0].items():
+        if isinstance(value, bool):
+            summary[key] = value
+        else:
+            values = [run[key] for run in runs]
+            summary[key] = {'median': statistics.median(values), 'min': min(values), 'max': max(values)}
+    return summary
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5, help='fresh processes per serving mode')
+    parser.add_argument('--model-dir', help='bundle directory to load (default: train a sample bundle)')
+    parser.add_argument('--output', help='write results as JSON to this path')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        model_dir = os.path.abspath(args.model_dir) if args.model_dir else tmp_dir
+        if not args.model_dir:
+            print("Training a sample model bundle...")
+            train_bundle(model_dir)
+
+        results = {}
+        for mode, compiled in (('sklearn', False), ('compiled', True)):
+            runs = [run_once(model_dir, compiled) for _ in range(args.runs)]
+            results[mode] = summarize(runs)
+
+    for mode, summary in results.items():
+        print(f"\n[{mode}] sklearn imported: {summary['sklearn_imported']}, "
+              f"pandas imported: {summary['pandas_imported']}")
+        for key in ('pipeline_import_s', 'app_import_s', 'time_to_first_prediction_s', 'process_wall_s'):
+            print(f"  {key:28s} median {summary[key]['median'] * 1000:8.1f} ms")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to: {args.output}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""Micro-batching queue shared by the Task 4 and Task 5 serving backends.
+
+BatchQueue groups items submitted by concurrent requests into batches on a
+background thread: a batch closes when it reaches max_batch_size items or
+max_wait_ms after its first item arrived, whichever comes first, so the
+added latency is bounded by max_wait_ms plus the batch's own run time.
+Subclasses implement process_batch() and hand each batch function to
+resolve(), which gives every future exactly one outcome.
+
+Modules import this by appending the repository's common/ directory to
+sys.path, like metrics.py.
+"""
+from concurrent.futures import Future
+import queue
+import threading
+import time
+
+class BatchQueue:
+    """Drains (item, Future) pairs from a queue in bounded-latency batches"""
+
+    def __init__(self, max_batch_size=64, max_wait_ms=5.0, name='batch-queue'):
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = queue.Queue()
+        self._closed = False
+        self._worker = threading.Thread(target=self._run, name=name, daemon=True)
+        self._worker.start()
+
+    def _put(self, item):
+        """Queue one item and return a Future for its result"""
+        if self._closed:
+            raise RuntimeError(f"{type(self).__name__} is closed")
+        future = Future()
+        self._queue.put((item, future))
+        return future
+
+    def _collect(self):
+        first = self._queue.get()
+        if first is None:
+            return None
+
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                # Put the shutdown marker back so the loop exits after this batch
+                self._queue.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                return
+            futures = [future for _, future in batch]
+            # The worker must survive any error, or every later result()
+            # would wait forever; whatever is still pending fails instead
+            try:
+                self.process_batch([item for item, _ in batch], futures)
+            except Exception as e:
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def process_batch(self, items, futures):
+        """Compute results for one batch; override and call resolve()"""
+        raise NotImplementedError
+
+    @staticmethod
+    def resolve(futures, compute):
+        """Set each future from compute(), which returns one result per future, in order
+
+        An exception from compute(), or a result count that doesn't match,
+        fails every future in the group.
+        """
+        try:
+            results = list(compute())
+            if len(results) != len(futures):
+                # zip() would leave the unmatched futures waiting forever
+                raise RuntimeError(f"Batch function returned {len(results)} results for {len(futures)} inputs")
+        except Exception as e:
+            for future in futures:
+                future.set_exception(e)
+            return
+        for future, result in zip(futures, results):
+            future.set_result(result)
+
+    def queue_depth(self):
+        return self._queue.qsize()
+
+    def close(self):
+        """Stop the worker once already queued items have been processed"""
+        self._closed = True
+        self._queue.put(None)
+        self._worker.join()
@@ -0,0 +1,272 @@
+"""Minimal Prometheus-style metrics shared by the Task 3 and Task 5 backends.
+
+Counters, gauges and histograms with labels, rendered in the Prometheus text
+exposition format for a /metrics endpoint. Collectors registered with
+register_collector() are called at scrape time for values that already live
+elsewhere (cache counters, model versions), so the hot path never updates them.
+
+Backends import this module by appending the repository's common/ directory
+to sys.path, the same way Task 4's main.py picks up src/.
+"""
+from bisect import bisect_left
+import math
+import threading
+import time
+
+# Seconds; fine resolution at the low end for per-stage timings
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+                   0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BATCH_SIZE_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    if value == -math.inf:
+        return '-Inf'
+    if isinstance(value, float) and value.is_integer():
+        return f'{value:.1f}'
+    return repr(value) if isinstance(value, float) else str(value)
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels) + '}'
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values, **kwargs):
+        """Child for one label combination; cache it when used on a hot path"""
+        if kwargs:
+            values = tuple(kwargs[name] for name in self.labelnames)
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}")
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _default(self):
+        # Metrics without labels act as their own single child
+        return self.labels()
+
+    def samples(self):
+        """Yield (suffix, labels, value) tuples for rendering"""
+        for key, child in list(self._children.items()):
+            labels = list(zip(self.labelnames, key))
+            for suffix, extra_labels, value in child.samples():
+                yield suffix, labels + extra_labels, value
+
+class _CounterChild:
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1.0):
+        with self._lock:
+            self.value += amount
+
+    def samples(self):
+        yield '_total', [], self.value
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount=1.0):
+        self._default().inc(amount)
+
+class _GaugeChild:
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def set(self, value):
+        self.value = float(value)
+
+    def inc(self, amount=1.0):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount=1.0):
+        self.inc(-amount)
+
+    def samples(self):
+        yield '', [], self.value
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value):
+        self._default().set(value)
+
+    def inc(self, amount=1.0):
+        self._default().inc(amount)
+
+    def dec(self, amount=1.0):
+        self._default().dec(amount)
+
+class _Timer:
+    __slots__ = ('child', 'start')
+
+    def __init__(self, child):
+        self.child = child
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.child.observe(time.perf_counter() - self.start)
+
+class _HistogramChild:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        # One extra slot for observations above the last bound (+Inf)
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    def time(self):
+        """Context manager that observes the elapsed seconds of its block"""
+        return _Timer(self)
+
+    def samples(self):
+        with self._lock:
+            counts = list(self.counts)
+            total = self.sum
+        cumulative = 0
+        for bound, count in zip(self.buckets + (math.inf,), counts):
+            cumulative += count
+            yield '_bucket', [('le', _format_value(float(bound)))], cumulative
+        yield '_sum', [], total
+        yield '_count', [], cumulative
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(float(bound) for bound in buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value):
+        self._default().observe(value)
+
+    def time(self):
+        return self._default().time()
+
+class MetricsRegistry:
+    """Holds metrics and scrape-time collectors and renders them as text"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name, documentation, labelnames, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = cls(name, documentation, labelnames, **kwargs)
+                self._metrics[name] = metric
+            elif not isinstance(metric, cls) or metric.labelnames != tuple(labelnames):
+                raise ValueError(f"Metric {name} is already registered with a different type or labels")
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._get_or_create(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def register_collector(self, collect):
+        """Register collect() -> iterable of (name, kind, help, [(labels dict, value)])"""
+        with self._lock:
+            self._collectors.append(collect)
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format (version 0.0.4)"""
+        # name -> (kind, help, [lines]) so collectors can add to a shared family
+        families = {}
+        for metric in list(self._metrics.values()):
+            # In the 0.0.4 format a counter's HELP/TYPE lines name its _total samples
+            family = metric.name + '_total' if metric.kind == 'counter' else metric.name
+            lines = families.setdefault(family, (metric.kind, metric.documentation, []))[2]
+            for suffix, labels, value in metric.samples():
+                lines.append(f'{metric.name}{suffix}{_format_labels(labels)} {_format_value(value)}')
+
+        for collect in list(self._collectors):
+            try:
+                collected = list(collect())
+            except Exception as e:
+                print(f"Metrics collector failed: {e}")
+                continue
+            for name, kind, documentation, samples in collected:
+                lines = families.setdefault(name, (kind, documentation, []))[2]
+                for labels, value in samples:
+                    if value is None:
+                        continue
+                    lines.append(f'{name}{_format_labels(sorted(labels.items()))} {_format_value(value)}')
+
+        output = []
+        for name, (kind, documentation, lines) in families.items():
+            output.append(f'# HELP {name} {_escape(documentation)}')
+            output.append(f'# TYPE {name} {kind}')
+            output.extend(lines)
+        return '\n'.join(output) + '\n'
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Process-wide registry used by both backends
+REGISTRY = MetricsRegistry()
+
+# Shared metric families; each backend labels its samples with service=
+REQUESTS = REGISTRY.counter(
+    'http_requests', 'HTTP requests handled', ('service', 'endpoint', 'method', 'status'))
+REQUEST_LATENCY = REGISTRY.histogram(
+    'http_request_duration_seconds', 'HTTP request latency', ('service', 'endpoint'))
+STAGE_LATENCY = REGISTRY.histogram(
+    'inference_stage_duration_seconds', 'Time spent in each inference stage', ('service', 'stage'))
+BATCH_SIZE = REGISTRY.histogram(
+    'inference_batch_size', 'Items scored per request or batch', ('service', 'endpoint'),
+    buckets=BATCH_SIZE_BUCKETS)
+
+def stage_observer(service):
+    """Return observe(stage, seconds) that records into STAGE_LATENCY for service"""
+    children = {}
+
+    def observe(stage, seconds):
+        child = children.get(stage)
+        if child is None:
+            child = children[stage] = STAGE_LATENCY.labels(service, stage)
+        child.observe(seconds)
+    return observe